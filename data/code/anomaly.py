@@ -0,0 +1,489 @@
+"""
+Session Anomaly Detection
+Rolling z-scores per exercise and an isolation forest over sessions.
+
+Set level: every set's volume and weight_lbs is compared with the previous
+ZSCORE_WINDOW sets of the same exercise (per athlete when the sets have
+athlete_id), z = (x - mean) / std over that trailing window, computed for
+all exercises at once with a groupby-rolling. The std is floored at
+MIN_RELATIVE_STD of the mean so a jump after identical sets (5 x 225)
+gets a large but finite z.
+
+Session level: each session gets its totals (volume, avg weight/reps, sets,
+exercises) and the mean and largest |z| of its sets. An isolation forest
+(Liu, Ting & Zhou 2008) of NUM_TREES trees, each grown on SUBSAMPLE random
+sessions, scores them: anomaly_score = 2^(-E[path length] / c(SUBSAMPLE)),
+above 0.5 for sessions that are isolated in fewer splits than usual. Trees
+are stored as flat node arrays, so scoring walks every tree for a whole
+batch of sessions one depth level at a time; batches can be spread over a
+process pool.
+
+The fitted forest, the score threshold and, per exercise, the trailing
+window of values are saved to one .npz model. score_new_sets() scores new
+sessions against it, the z-scores continuing from the stored windows, and
+appends their sets to the windows, so new logs are scored without a refit
+and give the same z-scores as a full recompute.
+
+Usage:
+    python anomaly.py [SETS_FILE] [--sessions FILE] [--model NPZ] [--workers N] [--output CSV]
+    python anomaly.py --new NEW_SETS_FILE [--model NPZ] [--no-update] [--output CSV]
+"""
+
+import argparse
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from streaming_stats import RunningStats
+from training_io import iter_table_chunks, read_table
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+
+MODEL_VERSION = 1
+
+# Set columns scored with rolling z-scores
+ZSCORE_COLUMNS = ['volume', 'weight_lbs']
+
+# Trailing sets per exercise in the z-score window, and the fewest that give a z-score
+ZSCORE_WINDOW = 20
+ZSCORE_MIN_PERIODS = 5
+
+# Lower bound on the window std, as a fraction of the window mean
+MIN_RELATIVE_STD = 0.05
+
+SESSION_FEATURES = ['total_volume', 'avg_weight', 'avg_reps', 'num_sets', 'num_exercises',
+                    'mean_z_volume', 'max_abs_z_volume', 'mean_z_weight_lbs', 'max_abs_z_weight_lbs']
+
+NUM_TREES = 100
+SUBSAMPLE = 256
+
+# Share of the fitted sessions flagged as anomalies
+DEFAULT_CONTAMINATION = 0.02
+
+# Sessions scored per batch (and per pool task)
+SCORE_BATCH = 50_000
+
+SET_COLUMNS = ['date', 'workout_type', 'exercise_standard', 'weight_lbs', 'reps', 'volume']
+
+
+def exercise_keys(df):
+    """Columns identifying one exercise's history."""
+    return (['athlete_id'] if 'athlete_id' in df.columns else []) + ['exercise_standard']
+
+
+def session_keys(df):
+    """Columns identifying one session."""
+    return (['athlete_id'] if 'athlete_id' in df.columns else []) + ['date', 'workout_type']
+
+
+def _zscore(values, mean, std):
+    """(values - mean) / std with std floored at MIN_RELATIVE_STD x |mean|; NaN without a spread."""
+    floor = np.maximum(std, MIN_RELATIVE_STD * np.abs(mean))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (values - mean) / floor
+    return np.where(floor > 0, z, np.where(values == mean, 0.0, np.nan))
+
+
+# ============================================================================
+# ROLLING Z-SCORES
+# ============================================================================
+
+def rolling_zscores(sets_df, window=ZSCORE_WINDOW, min_periods=ZSCORE_MIN_PERIODS):
+    """
+    z_<column> for each of ZSCORE_COLUMNS: the set against the previous
+    window sets of the same exercise, in date order (file order within a
+    day). NaN until the exercise has min_periods earlier values. Returns a
+    frame aligned with sets_df.
+    """
+    keys = exercise_keys(sets_df)
+    dates = pd.to_datetime(sets_df['date'], errors='coerce')
+    order = np.argsort(dates.to_numpy(), kind='stable')
+    frame = sets_df.iloc[order][keys].copy()
+    for col in ZSCORE_COLUMNS:
+        frame[col] = pd.to_numeric(sets_df[col].iloc[order], errors='coerce').astype(float)
+    frame = frame.reset_index(drop=True)
+
+    # Window of earlier sets only: shift within each exercise, then roll
+    prior = frame.groupby(keys, sort=False)[ZSCORE_COLUMNS].shift(1)
+    prior[keys] = frame[keys]
+    rolling = prior.groupby(keys, sort=False)[ZSCORE_COLUMNS].rolling(window, min_periods=min_periods)
+    mean = rolling.mean().reset_index(level=list(range(len(keys))), drop=True).sort_index()
+    std = rolling.std().reset_index(level=list(range(len(keys))), drop=True).sort_index()
+
+    result = pd.DataFrame(index=sets_df.index)
+    for col in ZSCORE_COLUMNS:
+        z = np.empty(len(frame))
+        z[order] = _zscore(frame[col].to_numpy(), mean[col].to_numpy(), std[col].to_numpy())
+        result[f"z_{col}"] = z
+    return result
+
+
+class ExerciseWindows:
+    """Trailing window of ZSCORE_COLUMNS values per exercise, for scoring sets as they arrive."""
+
+    def __init__(self, window=ZSCORE_WINDOW, min_periods=ZSCORE_MIN_PERIODS):
+        self.window = window
+        self.min_periods = min_periods
+        self.values = {}
+
+    def zscores(self, sets_df, update=True):
+        """
+        z-scores of new sets (same columns as rolling_zscores), continuing
+        from the stored windows; with update the sets are appended to them.
+        """
+        keys = exercise_keys(sets_df)
+        dates = pd.to_datetime(sets_df['date'], errors='coerce')
+        order = np.argsort(dates.to_numpy(), kind='stable')
+        values = np.column_stack([pd.to_numeric(sets_df[col], errors='coerce').to_numpy(dtype=float)
+                                  for col in ZSCORE_COLUMNS])
+        exercises = list(zip(*(sets_df[key].astype(str) for key in keys)))
+        windows = self.values if update else {}
+
+        z = np.full((len(sets_df), len(ZSCORE_COLUMNS)), np.nan)
+        for row in order:
+            key = exercises[row]
+            tail = windows.get(key)
+            if tail is None:
+                stored = self.values.get(key, ())
+                tail = windows[key] = deque(stored, maxlen=self.window)
+            for j in range(len(ZSCORE_COLUMNS)):
+                stats = RunningStats().update(np.array([t[j] for t in tail], dtype=float))
+                if stats.n >= self.min_periods:
+                    z[row, j] = _zscore(values[row, j], stats.mean, stats.std if stats.n > 1 else math.nan)
+            tail.append(tuple(values[row]))
+        return pd.DataFrame(z, index=sets_df.index, columns=[f"z_{col}" for col in ZSCORE_COLUMNS])
+
+    @classmethod
+    def from_sets(cls, sets_df, window=ZSCORE_WINDOW, min_periods=ZSCORE_MIN_PERIODS):
+        """Windows holding the last window sets of every exercise in sets_df."""
+        windows = cls(window, min_periods)
+        keys = exercise_keys(sets_df)
+        dates = pd.to_datetime(sets_df['date'], errors='coerce')
+        ordered = sets_df.iloc[np.argsort(dates.to_numpy(), kind='stable')]
+        tails = ordered.groupby(keys, sort=False).tail(window)
+        columns = [pd.to_numeric(tails[col], errors='coerce').astype(float) for col in ZSCORE_COLUMNS]
+        exercise = zip(*(tails[key].astype(str) for key in keys))
+        for key, *row in zip(exercise, *columns):
+            windows.values.setdefault(key, deque(maxlen=window)).append(tuple(row))
+        return windows
+
+
+# ============================================================================
+# SESSION FEATURES
+# ============================================================================
+
+def session_features(sets_df, zscores):
+    """One row per session (session_keys columns + SESSION_FEATURES) from its sets and their z-scores."""
+    keys = session_keys(sets_df)
+    frame = sets_df[keys + ['exercise_standard']].copy()
+    for col in ('volume', 'weight_lbs', 'reps'):
+        frame[col] = pd.to_numeric(sets_df[col], errors='coerce')
+    for col in ZSCORE_COLUMNS:
+        frame[f"z_{col}"] = zscores[f"z_{col}"]
+        frame[f"abs_z_{col}"] = zscores[f"z_{col}"].abs()
+
+    aggregations = {
+        'total_volume': ('volume', 'sum'),
+        'avg_weight': ('weight_lbs', 'mean'),
+        'avg_reps': ('reps', 'mean'),
+        'num_sets': ('exercise_standard', 'size'),
+        'num_exercises': ('exercise_standard', 'nunique'),
+    }
+    for col in ZSCORE_COLUMNS:
+        aggregations[f"mean_z_{col}"] = (f"z_{col}", 'mean')
+        aggregations[f"max_abs_z_{col}"] = (f"abs_z_{col}", 'max')
+    return frame.groupby(keys, sort=True, dropna=False).agg(**aggregations).reset_index()
+
+
+def feature_matrix(features, fill_values):
+    """SESSION_FEATURES as float64, NaNs replaced by fill_values (the fitted medians)."""
+    X = features[SESSION_FEATURES].to_numpy(dtype=float)
+    return np.where(np.isnan(X), fill_values, X)
+
+
+# ============================================================================
+# ISOLATION FOREST
+# ============================================================================
+
+def average_path_length(n):
+    """c(n): average path length of an unsuccessful BST search over n points (0 for n <= 1)."""
+    n = np.asarray(n, dtype=float)
+    safe = np.maximum(n, 2)
+    c = 2.0 * (np.log(safe - 1) + np.euler_gamma) - 2.0 * (safe - 1) / safe
+    return np.where(n > 2, c, np.where(n == 2, 1.0, 0.0))
+
+
+class IsolationForest:
+    """
+    Isolation forest with all trees in flat node arrays: feature (-1 for a
+    leaf), threshold, left, right and size (points that reached the node).
+    """
+
+    def __init__(self, num_trees=NUM_TREES, subsample=SUBSAMPLE, seed=0):
+        self.num_trees = num_trees
+        self.subsample = subsample
+        self.seed = seed
+
+    def fit(self, X):
+        rng = np.random.default_rng(self.seed)
+        X = np.asarray(X, dtype=float)
+        psi = min(self.subsample, len(X))
+        max_depth = max(1, math.ceil(math.log2(max(psi, 2))))
+        feature, threshold, left, right, size, roots = [], [], [], [], [], []
+
+        for _ in range(self.num_trees):
+            roots.append(len(feature))
+            # Nodes waiting to be split: (node id, sample rows, depth)
+            stack = [(len(feature), rng.choice(len(X), psi, replace=False), 0)]
+            feature.append(-1); threshold.append(0.0); left.append(-1); right.append(-1); size.append(psi)
+            while stack:
+                node, rows, depth = stack.pop()
+                if depth >= max_depth or len(rows) <= 1:
+                    continue
+                points = X[rows]
+                low, high = points.min(axis=0), points.max(axis=0)
+                splittable = np.flatnonzero(high > low)
+                if not len(splittable):
+                    continue
+                j = rng.choice(splittable)
+                cut = rng.uniform(low[j], high[j])
+                goes_left = points[:, j] < cut
+                feature[node], threshold[node] = int(j), float(cut)
+                for child_rows, side in ((rows[goes_left], left), (rows[~goes_left], right)):
+                    side[node] = len(feature)
+                    stack.append((len(feature), child_rows, depth + 1))
+                    feature.append(-1); threshold.append(0.0); left.append(-1); right.append(-1)
+                    size.append(len(child_rows))
+
+        self.feature_ = np.array(feature, dtype=np.int32)
+        self.threshold_ = np.array(threshold)
+        self.left_ = np.array(left, dtype=np.int32)
+        self.right_ = np.array(right, dtype=np.int32)
+        self.size_ = np.array(size, dtype=np.int32)
+        self.roots_ = np.array(roots, dtype=np.int32)
+        self.psi_ = psi
+        self.max_depth_ = max_depth
+        return self
+
+    def score(self, X):
+        """anomaly score in (0, 1] for every row: higher is more isolated."""
+        X = np.asarray(X, dtype=float)
+        rows = np.arange(len(X))
+        # (trees, rows) grid of current nodes, moved down one level per step
+        node = np.repeat(self.roots_[:, None], len(X), axis=1)
+        depth = np.zeros(node.shape)
+        for _ in range(self.max_depth_):
+            feature = self.feature_[node]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            value = X[rows[None, :], np.maximum(feature, 0)]
+            child = np.where(value < self.threshold_[node], self.left_[node], self.right_[node])
+            node = np.where(internal, child, node)
+            depth += internal
+        path = depth + average_path_length(self.size_[node])
+        return 2.0 ** (-path.mean(axis=0) / max(float(average_path_length(self.psi_)), 1.0))
+
+    def to_arrays(self):
+        return {'feature': self.feature_, 'threshold': self.threshold_, 'left': self.left_,
+                'right': self.right_, 'size': self.size_, 'roots': self.roots_,
+                'psi': np.array(self.psi_), 'max_depth': np.array(self.max_depth_)}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        forest = cls(num_trees=len(arrays['roots']), subsample=int(arrays['psi']))
+        forest.feature_, forest.threshold_ = arrays['feature'], arrays['threshold']
+        forest.left_, forest.right_, forest.size_ = arrays['left'], arrays['right'], arrays['size']
+        forest.roots_, forest.psi_, forest.max_depth_ = arrays['roots'], int(arrays['psi']), int(arrays['max_depth'])
+        return forest
+
+
+def _score_batch(forest, X):
+    return forest.score(X)
+
+
+def score_sessions(forest, X, workers=1, batch_size=SCORE_BATCH):
+    """forest.score over X in batches of batch_size rows, in a process pool when workers > 1."""
+    batches = [X[start:start + batch_size] for start in range(0, len(X), batch_size)]
+    if not batches:
+        return np.empty(0)
+    if workers <= 1 or len(batches) == 1:
+        return np.concatenate([forest.score(batch) for batch in batches])
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+        return np.concatenate(list(pool.map(_score_batch, [forest] * len(batches), batches)))
+
+
+# ============================================================================
+# MODEL
+# ============================================================================
+
+class AnomalyModel:
+    """Fitted forest, feature fill values, score threshold and per-exercise z-score windows."""
+
+    def __init__(self, forest, fill_values, threshold, windows):
+        self.forest = forest
+        self.fill_values = np.asarray(fill_values, dtype=float)
+        self.threshold = float(threshold)
+        self.windows = windows
+
+    @classmethod
+    def fit(cls, sets_df, contamination=DEFAULT_CONTAMINATION, num_trees=NUM_TREES, subsample=SUBSAMPLE,
+            seed=0, workers=1):
+        """
+        Fit on a training_sets frame. Returns (model, sessions) where sessions
+        holds every session's features, anomaly_score and is_anomaly.
+        """
+        zscores = rolling_zscores(sets_df)
+        sessions = session_features(sets_df, zscores)
+        fill_values = sessions[SESSION_FEATURES].median().fillna(0).to_numpy(dtype=float)
+        X = feature_matrix(sessions, fill_values)
+        forest = IsolationForest(num_trees, subsample, seed).fit(X)
+        scores = score_sessions(forest, X, workers)
+        threshold = np.quantile(scores, 1 - contamination) if len(scores) else 1.0
+        model = cls(forest, fill_values, threshold, ExerciseWindows.from_sets(sets_df))
+        sessions['anomaly_score'] = scores
+        sessions['is_anomaly'] = scores >= threshold
+        return model, sessions
+
+    def score_new_sets(self, sets_df, update=True, workers=1):
+        """
+        Session features, anomaly_score and is_anomaly for the sessions in
+        sets_df, which should be later than the sets the model has seen. With
+        update their sets are added to the per-exercise windows.
+        """
+        zscores = self.windows.zscores(sets_df, update=update)
+        sessions = session_features(sets_df, zscores)
+        scores = score_sessions(self.forest, feature_matrix(sessions, self.fill_values), workers)
+        sessions['anomaly_score'] = scores
+        sessions['is_anomaly'] = scores >= self.threshold
+        return sessions
+
+    def save(self, path):
+        """Write to path (.npz), atomically."""
+        path = Path(path)
+        keys = list(self.windows.values)
+        tails = [self.windows.values[key] for key in keys]
+        width = max((len(key) for key in keys), default=1)
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, version=np.array(MODEL_VERSION), fill_values=self.fill_values,
+                     threshold=np.array(self.threshold),
+                     window=np.array(self.windows.window), min_periods=np.array(self.windows.min_periods),
+                     window_keys=np.array(keys, dtype=str).reshape(len(keys), width),
+                     window_indptr=np.concatenate([[0], np.cumsum([len(tail) for tail in tails])]),
+                     window_values=np.array([row for tail in tails for row in tail],
+                                            dtype=float).reshape(-1, len(ZSCORE_COLUMNS)),
+                     **{f"forest_{name}": value for name, value in self.forest.to_arrays().items()})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a model written by save(). Raises ValueError for another model version."""
+        with np.load(path, allow_pickle=False) as npz:
+            if int(npz['version']) != MODEL_VERSION:
+                raise ValueError(f"{path} is an anomaly model of another version; refit it")
+            forest = IsolationForest.from_arrays({name[len('forest_'):]: npz[name]
+                                                  for name in npz.files if name.startswith('forest_')})
+            windows = ExerciseWindows(int(npz['window']), int(npz['min_periods']))
+            indptr, values = npz['window_indptr'], npz['window_values']
+            for i, key in enumerate(npz['window_keys'].tolist()):
+                rows = values[indptr[i]:indptr[i + 1]]
+                windows.values[tuple(key)] = deque(map(tuple, rows.tolist()), maxlen=windows.window)
+            return cls(forest, npz['fill_values'], float(npz['threshold']), windows)
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def load_sets(path):
+    """The columns anomaly detection needs from a training_sets file, read in chunks."""
+    first = next(iter_table_chunks(path, chunksize=1), None)
+    if first is None:
+        return pd.DataFrame(columns=SET_COLUMNS)
+    columns = (['athlete_id'] if 'athlete_id' in first.columns else []) + SET_COLUMNS
+    return pd.concat(iter_table_chunks(path, columns=columns), ignore_index=True)
+
+
+def with_session_columns(scored, sessions_path):
+    """The sessions table with anomaly_score / is_anomaly joined on the session keys."""
+    sessions = read_table(sessions_path)
+    keys = session_keys(sessions)
+    right = scored[keys + ['anomaly_score', 'is_anomaly']].copy()
+    for key in keys:
+        right[key] = right[key].astype(str)
+        sessions[key] = sessions[key].astype(str)
+    return sessions.merge(right, on=keys, how='left')
+
+
+def print_anomalies(sessions, top):
+    """The top sessions by anomaly_score with what stood out."""
+    keys = session_keys(sessions)
+    flagged = int(sessions['is_anomaly'].sum())
+    print(f"Sessions: {len(sessions)} | Flagged: {flagged}")
+    for row in sessions.sort_values('anomaly_score', ascending=False, kind='stable').head(top).itertuples(index=False):
+        label = ' '.join(str(getattr(row, key)) for key in keys)
+        print(f"  {row.anomaly_score:.3f}  {label}: volume {row.total_volume:,.0f}, {row.num_sets} sets, "
+              f"max |z| volume {row.max_abs_z_volume:.1f} / weight {row.max_abs_z_weight_lbs:.1f}")
+
+
+def main(argv=None):
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Score training sessions for anomalies.")
+    parser.add_argument("path", nargs="?", type=Path, default=DATA_DIR / "training_sets.csv",
+                        help="training_sets file to fit on (.csv, .parquet or .feather)")
+    parser.add_argument("--sessions", type=Path, default=None,
+                        help="training_sessions file to attach the scores to (default: next to the sets file)")
+    parser.add_argument("--model", type=Path, default=DATA_DIR / "anomaly_model.npz",
+                        help="Model file written by a fit and read by --new")
+    parser.add_argument("--new", type=Path, default=None,
+                        help="Score the sessions in this sets file with the saved model instead of fitting")
+    parser.add_argument("--no-update", action="store_true",
+                        help="With --new, leave the saved per-exercise windows unchanged")
+    parser.add_argument("--contamination", type=float, default=DEFAULT_CONTAMINATION,
+                        help=f"Share of sessions flagged when fitting (default: {DEFAULT_CONTAMINATION})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for scoring (0 = one per CPU core, default: 1)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=10, help="Sessions to print, by score (default: 10)")
+    parser.add_argument("--output", type=Path, default=None, help="Write the scored sessions to this CSV")
+    args = parser.parse_args(argv)
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+    if not 0 < args.contamination < 1:
+        parser.error("--contamination must be between 0 and 1")
+
+    print("=" * 60)
+    print("SESSION ANOMALIES")
+    print("=" * 60)
+    if args.new:
+        if not args.model.exists():
+            parser.error(f"No model at {args.model}; fit one first")
+        model = AnomalyModel.load(args.model)
+        scored = model.score_new_sets(load_sets(args.new), update=not args.no_update, workers=args.workers)
+        if not args.no_update:
+            model.save(args.model)
+        result = scored
+    else:
+        model, scored = AnomalyModel.fit(load_sets(args.path), args.contamination, seed=args.seed,
+                                         workers=args.workers)
+        model.save(args.model)
+        print(f"Model written to {args.model}")
+        sessions_path = args.sessions or args.path.with_name(args.path.name.replace('training_sets', 'training_sessions'))
+        result = with_session_columns(scored, sessions_path) if sessions_path.exists() else scored
+
+    print_anomalies(scored, args.top)
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"\nScored sessions written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""
+Association Rule Mining
+Frequent exercise itemsets and association rules over training sessions.
+
+Each session in training_sessions is a transaction whose items are the
+exercises in its exercises_list. The miner is Apriori on packed bitsets:
+every exercise gets a row of uint64 words with one bit per session, so the
+support count of an itemset is the popcount of the AND of its members' rows.
+Candidates of length k are built by joining frequent (k-1)-itemsets that
+share their first k-2 items (and pruned unless every (k-1)-subset is
+frequent); the bitset of a candidate is the parent's bitset ANDed with the
+new item's row. So each candidate costs one vectorized AND + popcount over
+n_sessions / 64 words, and itemsets of any length are supported.
+
+apriori() and association_rules() return the same frames as mlxtend's
+apriori(use_colnames=True) and association_rules(): the same itemsets in
+the same order, with support, confidence, lift, leverage and conviction
+computed by the same float expressions, so the values are identical.
+
+Usage:
+    python association_mining.py [SESSIONS_FILE] [--min-support S] [--min-confidence C]
+                                 [--min-lift L] [--max-len K] [--top N] [--output CSV]
+    python association_mining.py --sets [SETS_FILE] ...
+
+With --sets the transactions come from the cached session x exercise
+matrix of a training_sets file (session_matrix.py) instead of the
+exercises_list strings.
+"""
+
+import argparse
+import sys
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from training_io import iter_table_chunks
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+
+# Defaults from the association rule analysis (M2)
+MIN_SUPPORT = 0.05
+MIN_CONFIDENCE = 0.50
+MIN_LIFT = 1.0
+
+# Bytes of candidate bitsets ANDed at once
+BATCH_BYTES = 64 * 1024 * 1024
+
+RULE_METRICS = ['support', 'confidence', 'lift', 'leverage', 'conviction']
+
+
+# ============================================================================
+# TRANSACTIONS
+# ============================================================================
+
+def parse_exercises(exercises_str):
+    """Exercise names in a comma-separated exercises_list (blank items dropped)."""
+    if pd.isna(exercises_str):
+        return []
+    return [name for name in (ex.strip() for ex in str(exercises_str).split(',')) if name]
+
+
+def load_transactions(path, chunksize=100_000):
+    """One exercise list per session with at least one exercise, read in chunks."""
+    transactions = []
+    for chunk in iter_table_chunks(path, chunksize=chunksize, columns=['exercises_list']):
+        for exercises in chunk['exercises_list']:
+            items = parse_exercises(exercises)
+            if items:
+                transactions.append(items)
+    return transactions
+
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words):
+        """Number of set bits in each row of a uint64 array."""
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Number of set bits in each row of a uint64 array."""
+        as_bytes = np.ascontiguousarray(words).view(np.uint8)
+        return _BYTE_COUNTS[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+class TransactionBitsets:
+    """
+    Transactions as packed bitsets: bits[i] has bit t set when transaction t
+    contains items[i]. Items are sorted, like TransactionEncoder.columns_.
+    """
+
+    def __init__(self, transactions):
+        lengths = np.fromiter((len(t) for t in transactions), dtype=np.int64, count=len(transactions))
+        flat = [item for t in transactions for item in t]
+        codes, items = pd.factorize(pd.Series(flat, dtype=object), sort=True)
+        rows = np.repeat(np.arange(len(transactions), dtype=np.int64), lengths)
+        self._pack(rows, codes, list(items), len(transactions))
+
+    @classmethod
+    def from_codes(cls, rows, codes, items, num_transactions):
+        """Bitsets from parallel (transaction row, item code) arrays, codes indexing the sorted items."""
+        encoded = cls.__new__(cls)
+        encoded._pack(np.asarray(rows, dtype=np.int64), np.asarray(codes), list(items), num_transactions)
+        return encoded
+
+    def _pack(self, rows, codes, items, num_transactions):
+        self.items = items
+        self.num_transactions = num_transactions
+        self.num_words = max(1, -(-num_transactions // 64))
+        self.bits = np.zeros((len(items), self.num_words), dtype=np.uint64)
+        np.bitwise_or.at(self.bits, (codes, rows >> 6),
+                         np.left_shift(np.uint64(1), (rows & 63).astype(np.uint64)))
+        self.counts = popcount(self.bits)
+
+    def __len__(self):
+        return self.num_transactions
+
+
+# ============================================================================
+# FREQUENT ITEMSETS
+# ============================================================================
+
+def _candidate_pairs(itemsets):
+    """
+    (i, j) row pairs of a lexicographically sorted (m, k-1) itemset array
+    that share their first k-2 items, i < j, in lexicographic order.
+    """
+    m, width = itemsets.shape
+    if width == 1:
+        return np.triu_indices(m, k=1)
+    prefix = itemsets[:, :-1]
+    starts = np.flatnonzero(np.r_[True, (prefix[1:] != prefix[:-1]).any(axis=1)])
+    ends = np.r_[starts[1:], m]
+    left, right = [], []
+    for start, end in zip(starts, ends):
+        if end - start > 1:
+            i, j = np.triu_indices(end - start, k=1)
+            left.append(i + start)
+            right.append(j + start)
+    if not left:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(left), np.concatenate(right)
+
+
+def _prune(candidates, frequent):
+    """Mask of candidates whose (k-1)-subsets are all frequent (only the ones not implied by the join)."""
+    k = candidates.shape[1]
+    keep = np.ones(len(candidates), dtype=bool)
+    for n, candidate in enumerate(candidates.tolist()):
+        for drop in range(k - 2):
+            if tuple(candidate[:drop] + candidate[drop + 1:]) not in frequent:
+                keep[n] = False
+                break
+    return keep
+
+
+def frequent_itemsets(encoded, min_support=MIN_SUPPORT, max_len=None):
+    """
+    Frequent itemsets of an encoded TransactionBitsets as a list of
+    (item index tuple, support count), by length then lexicographic order.
+    """
+    n = len(encoded)
+    if not n:
+        return []
+    # Same test as mlxtend: support as a float fraction against min_support
+    single = np.flatnonzero(encoded.counts / n >= min_support)
+    results = [((int(i),), int(encoded.counts[i])) for i in single]
+    itemsets = single[:, None]
+    bits = encoded.bits[single]
+    batch = max(1, BATCH_BYTES // (encoded.num_words * 8))
+
+    k = 2
+    while len(itemsets) > 1 and (max_len is None or k <= max_len):
+        left, right = _candidate_pairs(itemsets)
+        if not len(left):
+            break
+        candidates = np.column_stack([itemsets[left], itemsets[right, -1]])
+        if k > 2:
+            keep = _prune(candidates, {tuple(s) for s in itemsets.tolist()})
+            candidates, left = candidates[keep], left[keep]
+            if not len(candidates):
+                break
+
+        kept_rows, kept_counts, kept_bits = [], [], []
+        for start in range(0, len(candidates), batch):
+            stop = start + batch
+            cand_bits = bits[left[start:stop]] & encoded.bits[candidates[start:stop, -1]]
+            counts = popcount(cand_bits)
+            ok = np.flatnonzero(counts / n >= min_support)
+            kept_rows.append(ok + start)
+            kept_counts.append(counts[ok])
+            kept_bits.append(cand_bits[ok])
+
+        rows = np.concatenate(kept_rows)
+        if not len(rows):
+            break
+        itemsets = candidates[rows]
+        bits = np.concatenate(kept_bits)
+        counts = np.concatenate(kept_counts)
+        results.extend((tuple(s), int(c)) for s, c in zip(itemsets.tolist(), counts))
+        k += 1
+    return results
+
+
+def apriori(transactions, min_support=MIN_SUPPORT, max_len=None):
+    """
+    Frequent itemsets as a DataFrame with columns support and itemsets
+    (frozensets of exercise names), like mlxtend's
+    apriori(TransactionEncoder-encoded frame, use_colnames=True).
+    transactions is a list of item lists or a TransactionBitsets.
+    """
+    # Anything carrying packed bits is already encoded (e.g. SessionMatrix.to_bitsets())
+    encoded = transactions if hasattr(transactions, 'bits') else TransactionBitsets(transactions)
+    found = frequent_itemsets(encoded, min_support=min_support, max_len=max_len)
+    n = len(encoded)
+    return pd.DataFrame({
+        'support': np.array([count for _, count in found], dtype=float) / max(n, 1),
+        'itemsets': [frozenset(encoded.items[i] for i in itemset) for itemset, _ in found],
+    }, columns=['support', 'itemsets'])
+
+
+# ============================================================================
+# ASSOCIATION RULES
+# ============================================================================
+
+def _rule_metrics(sA, sC, sAC):
+    """Rule metrics from antecedent, consequent and rule supports (mlxtend's formulas)."""
+    confidence = sAC / sA
+    conviction = np.full(len(confidence), np.inf)
+    below = confidence < 1.0
+    conviction[below] = (1.0 - sC[below]) / (1.0 - confidence[below])
+    return {
+        'support': sAC,
+        'confidence': confidence,
+        'lift': confidence / sC,
+        'leverage': sAC - sA * sC,
+        'conviction': conviction,
+    }
+
+
+def association_rules(itemsets, metric='confidence', min_threshold=0.8):
+    """
+    Rules A -> C for every frequent itemset of two or more items split into
+    non-empty antecedent A and consequent C, kept when metric >= min_threshold.
+    itemsets is the frame returned by apriori(); the result has the columns
+    of mlxtend's association_rules (antecedents, consequents, antecedent
+    support, consequent support, support, confidence, lift, leverage,
+    conviction).
+    """
+    if metric not in RULE_METRICS:
+        raise ValueError(f"Unknown metric {metric!r} (expected one of {RULE_METRICS})")
+    support_of = dict(zip(itemsets['itemsets'], itemsets['support']))
+
+    antecedents, consequents, sA, sC, sAC = [], [], [], [], []
+    for itemset, support in support_of.items():
+        if len(itemset) < 2:
+            continue
+        items = sorted(itemset)
+        for size in range(len(items) - 1, 0, -1):
+            for combo in combinations(items, size):
+                antecedent = frozenset(combo)
+                consequent = itemset.difference(antecedent)
+                antecedents.append(antecedent)
+                consequents.append(consequent)
+                sA.append(support_of[antecedent])
+                sC.append(support_of[consequent])
+                sAC.append(support)
+
+    sA, sC, sAC = (np.array(values, dtype=float) for values in (sA, sC, sAC))
+    metrics = _rule_metrics(sA, sC, sAC)
+    keep = metrics[metric] >= min_threshold
+    rules = pd.DataFrame({
+        'antecedents': pd.Series(antecedents, dtype=object)[keep].tolist(),
+        'consequents': pd.Series(consequents, dtype=object)[keep].tolist(),
+        'antecedent support': sA[keep],
+        'consequent support': sC[keep],
+    })
+    for name in RULE_METRICS:
+        rules[name] = metrics[name][keep]
+    return rules
+
+
+def mine_rules(transactions, min_support=MIN_SUPPORT, min_confidence=MIN_CONFIDENCE,
+               min_lift=MIN_LIFT, max_len=None):
+    """Frequent itemsets and the rules passing the confidence and lift thresholds."""
+    itemsets = apriori(transactions, min_support=min_support, max_len=max_len)
+    rules = association_rules(itemsets, metric='confidence', min_threshold=min_confidence)
+    rules = rules[rules['lift'] >= min_lift].reset_index(drop=True)
+    return itemsets, rules
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def format_items(items):
+    return ', '.join(sorted(items))
+
+
+def main(argv=None):
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Mine exercise co-occurrence rules from training sessions.")
+    parser.add_argument("path", nargs="?", type=Path, default=None,
+                        help="training_sessions file, or training_sets file with --sets "
+                             "(.csv, .parquet or .feather; default: the one in the data folder)")
+    parser.add_argument("--sets", action="store_true",
+                        help="Mine the cached session x exercise matrix of a training_sets file")
+    parser.add_argument("--min-support", type=float, default=MIN_SUPPORT)
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+    parser.add_argument("--min-lift", type=float, default=MIN_LIFT)
+    parser.add_argument("--max-len", type=int, default=None, help="Longest itemset to mine (default: no limit)")
+    parser.add_argument("--top", type=int, default=10, help="Rules to print, by lift (default: 10)")
+    parser.add_argument("--output", type=Path, default=None, help="Write all rules to this CSV")
+    args = parser.parse_args(argv)
+
+    if args.sets:
+        from session_matrix import load_session_matrix
+        matrix, _ = load_session_matrix(args.path or DATA_DIR / "training_sets.csv")
+        transactions = matrix.to_bitsets()
+    else:
+        transactions = load_transactions(args.path or DATA_DIR / "training_sessions.csv")
+    itemsets, rules = mine_rules(transactions, args.min_support, args.min_confidence,
+                                 args.min_lift, args.max_len)
+
+    print("=" * 60)
+    print("ASSOCIATION RULE MINING")
+    print("=" * 60)
+    print(f"Transactions: {len(transactions)}")
+    print(f"Frequent itemsets: {len(itemsets)} "
+          f"(longest: {itemsets['itemsets'].map(len).max() if len(itemsets) else 0})")
+    print(f"Rules: {len(rules)}")
+
+    rules = rules.sort_values('lift', ascending=False, kind='stable')
+    for i, (_, row) in enumerate(rules.head(args.top).iterrows()):
+        print(f"\nRule {i + 1}:")
+        print(f"  {format_items(row['antecedents'])}")
+        print(f"    -> {format_items(row['consequents'])}")
+        print(f"  Support: {row['support']:.3f} | Confidence: {row['confidence']:.3f} | Lift: {row['lift']:.2f}")
+
+    if args.output:
+        export = rules.copy()
+        export['antecedents'] = export['antecedents'].map(format_items)
+        export['consequents'] = export['consequents'].map(format_items)
+        export.to_csv(args.output, index=False)
+        print(f"\nRules written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
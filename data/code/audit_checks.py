@@ -0,0 +1,465 @@
+"""
+Training Session Audit Checks
+Importable audit of a training_sessions table.
+
+    report = audit(df)                      # every check
+    report = audit(df, checks='hot')        # the cheap ingest-time subset
+    report = audit(df, checks=['duplicate_dates', 'missing_values'])
+    print(report.to_json())
+
+audit() returns an AuditReport with, per check, the number of problems,
+the offending row indices as a NumPy array and the time the check took.
+audit_training_sessions.py is the command-line front end.
+
+The row-level checks return the same findings the original iterrows()
+loops produced, but do the work with pandas/NumPy column operations. Only
+rows that fail a fast vectorized test fall back to per-row Python, so the
+cost is proportional to the number of findings.
+"""
+
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from streaming_stats import DEFAULT_K, EXACT_LIMIT, ColumnSummary
+from training_io import iter_table_chunks, read_table
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+ISO_DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}$'
+
+# Two commas with only whitespace between them (an empty exercises_list item)
+EMPTY_ITEM_PATTERN = r',\s*,'
+
+
+def as_str(series):
+    """
+    str() of every value as an object Series, like the row loops did
+    (missing values become 'nan'). Only mixed-type columns need a per-value str().
+    """
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return series.astype(str).astype(object)
+    values = series.astype(object)
+    values = values.where(values.notna(), 'nan')
+    if pd.api.types.infer_dtype(values, skipna=False) != 'string':
+        values = values.map(str)
+    return values
+
+
+def find_bad_date_format(df):
+    """CHECK 3: rows whose date is not a valid YYYY-MM-DD string -> [(index, date)]."""
+    dates = as_str(df['date'])
+
+    # Fast path: strict pattern plus a coerced parse with the exact format
+    strict = dates.str.match(ISO_DATE_PATTERN)
+    parsed = pd.to_datetime(dates.where(strict), format='%Y-%m-%d', errors='coerce')
+    suspect = np.flatnonzero(parsed.isna().to_numpy())
+
+    # Anything the fast path rejects is re-checked exactly as before
+    bad = []
+    for pos in suspect:
+        try:
+            datetime.strptime(dates.iat[pos], '%Y-%m-%d')
+        except Exception:
+            bad.append((df.index[pos], df['date'].iat[pos]))
+    return bad
+
+
+def find_day_of_week_mismatches(df, parsed_dates):
+    """CHECK 3: rows whose day_of_week differs from the calendar day -> [(index, date, reported, actual)]."""
+    valid = parsed_dates.notna().to_numpy()
+    weekday = parsed_dates.dt.weekday.to_numpy()
+    actual = np.full(len(df), '', dtype=object)
+    actual[valid] = np.array(DAY_NAMES, dtype=object)[weekday[valid].astype(int)]
+    reported = as_str(df['day_of_week']).str.strip().to_numpy(dtype=object)
+
+    positions = np.flatnonzero(valid & (reported != actual))
+    return [
+        (df.index[pos], df['date'].iat[pos], df['day_of_week'].iat[pos], actual[pos])
+        for pos in positions
+    ]
+
+
+def days_since_last_mismatch_positions(dfs):
+    """
+    Positions in a date-sorted frame (with a _dp column) whose days_since_last
+    disagrees with the gap to the previous row. Returns (positions, reported, expected).
+    """
+    current = dfs['_dp']
+    previous = current.shift(1)
+    expected = (current - previous).dt.days.to_numpy()
+    reported = pd.to_numeric(dfs['days_since_last'], errors='coerce').to_numpy(dtype=float)
+
+    check = current.notna().to_numpy() & previous.notna().to_numpy() & ~np.isnan(reported)
+    check[:1] = False
+    positions = np.flatnonzero(check)
+    positions = positions[np.trunc(reported[positions]) != expected[positions]]
+    return positions, reported, expected
+
+
+def find_days_since_last_mismatches(df, parsed_dates):
+    """
+    CHECK 6: gaps between consecutive sessions (sorted by date) that disagree
+    with days_since_last. Returns (sorted_df, [(date, reported, expected)]).
+    """
+    dfs = df.assign(_dp=parsed_dates).sort_values('_dp', kind='stable').reset_index(drop=True)
+    positions, reported, expected = days_since_last_mismatch_positions(dfs)
+    mismatches = [
+        (dfs['date'].iat[pos], int(reported[pos]), int(expected[pos]))
+        for pos in positions
+    ]
+    return dfs, mismatches
+
+
+def count_list_items(exercises_list):
+    """Number of non-blank comma-separated items per exercises_list value ('nan' / blank -> 0)."""
+    lists = as_str(exercises_list)
+    counted = lists.str.count(',').to_numpy() + 1
+
+    # Blank items (leading/trailing/doubled commas, blank strings) need the
+    # exact split; everything else is commas + 1
+    stripped = lists.str.strip()
+    irregular = (
+        (stripped == '')
+        | stripped.str.startswith(',')
+        | stripped.str.endswith(',')
+        | lists.str.contains(EMPTY_ITEM_PATTERN, regex=True)
+    )
+    irregular = np.flatnonzero(irregular.to_numpy())
+    for pos in irregular:
+        counted[pos] = len([x.strip() for x in lists.iat[pos].split(',') if x.strip()])
+    counted[(lists == 'nan').to_numpy()] = 0
+    return counted
+
+
+def find_exercise_count_mismatches(df):
+    """CHECK 7: num_exercises vs exercises_list item count -> [(index, date, reported, counted, list[:80])]."""
+    counted = count_list_items(df['exercises_list'])
+    reported = pd.to_numeric(df['num_exercises'], errors='coerce').to_numpy(dtype=float)
+
+    check = ~np.isnan(reported)
+    positions = np.flatnonzero(check)
+    positions = positions[np.trunc(reported[positions]) != counted[positions]]
+    return [
+        (df.index[pos], df['date'].iat[pos], int(reported[pos]), int(counted[pos]),
+         str(df['exercises_list'].iat[pos])[:80])
+        for pos in positions
+    ]
+
+
+# ============================================================================
+# AUDIT API
+# ============================================================================
+
+# CHECK 4 flags session dates after this day
+FUTURE_CUTOFF = pd.Timestamp('2026-02-28')
+
+# Thresholds for the reasonableness checks
+MAX_DURATION_MIN = 300
+MAX_NUM_SETS = 30
+MAX_AVG_REPS = 30
+
+
+# Columns summarized by the distribution checks (CHECK 11-13)
+DISTRIBUTION_COLUMNS = ['num_sets', 'avg_reps', 'session_duration_est']
+
+# Distribution-check flags: name -> (column, comparison, bound)
+DISTRIBUTION_FLAGS = {
+    'num_sets_over_max': ('num_sets', np.greater, MAX_NUM_SETS),
+    'num_sets_under_1': ('num_sets', np.less, 1),
+    'avg_reps_over_max': ('avg_reps', np.greater, MAX_AVG_REPS),
+    'avg_reps_under_1': ('avg_reps', np.less, 1),
+}
+
+
+def normalize_sessions(df):
+    """Typed (parquet/feather) input -> the representation the CSV holds."""
+    if pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype(df[c].cat.categories.dtype)
+    return df
+
+
+def distribution_checks_chunked(path, chunksize=100_000, k=DEFAULT_K, exact_limit=EXACT_LIMIT):
+    """
+    CHECK 11-13 in one streaming pass over the table. Returns
+    ({column: ColumnSummary}, {flag name: DataFrame of flagged rows}). Only
+    one chunk plus the flagged rows is held in memory.
+    """
+    columns = ['date', 'workout_type'] + DISTRIBUTION_COLUMNS
+    summaries = {col: ColumnSummary(k=k, exact_limit=exact_limit) for col in DISTRIBUTION_COLUMNS}
+    flagged = {name: [] for name in DISTRIBUTION_FLAGS}
+    for chunk in iter_table_chunks(path, chunksize, columns=columns):
+        chunk = normalize_sessions(chunk)
+        for col in DISTRIBUTION_COLUMNS:
+            summaries[col].update(chunk[col])
+        for name, (col, op, bound) in DISTRIBUTION_FLAGS.items():
+            hits = chunk[op(_numeric(chunk, col), bound)]
+            if len(hits):
+                flagged[name].append(hits)
+    flagged = {
+        name: pd.concat(parts) if parts else pd.DataFrame(columns=columns)
+        for name, parts in flagged.items()
+    }
+    return summaries, flagged
+
+
+def load_sessions_table(path):
+    """
+    Read training_sessions (.csv, .parquet or .feather) in the representation
+    the audit expects: date as YYYY-MM-DD strings and no categoricals.
+    """
+    return normalize_sessions(read_table(path, parse_dates=False))
+
+
+class CheckResult:
+    """Outcome of one audit check: problem count, offending row indices, timing."""
+
+    def __init__(self, name, label, count, rows, seconds, details=None):
+        self.name = name
+        self.label = label
+        self.count = count
+        self.rows = rows
+        self.seconds = seconds
+        self.details = details or {}
+
+    @property
+    def ok(self):
+        return self.count == 0
+
+    def __repr__(self):
+        return f"CheckResult({self.name!r}, count={self.count}, seconds={self.seconds:.4f})"
+
+    def to_dict(self):
+        return {
+            'label': self.label,
+            'count': self.count,
+            'rows': self.rows.tolist(),
+            'seconds': self.seconds,
+            'details': self.details,
+        }
+
+
+class AuditReport:
+    """Results of audit(): one CheckResult per check that ran, in check order."""
+
+    def __init__(self, num_rows, results, seconds):
+        self.num_rows = num_rows
+        self.results = results
+        self.seconds = seconds
+
+    @property
+    def issues(self):
+        """Total problem count across checks."""
+        return sum(r.count for r in self.results.values())
+
+    @property
+    def checks_ok(self):
+        """Number of checks with no problems."""
+        return sum(r.ok for r in self.results.values())
+
+    def __getitem__(self, name):
+        return self.results[name]
+
+    def __iter__(self):
+        return iter(self.results.values())
+
+    def __repr__(self):
+        return (f"AuditReport(num_rows={self.num_rows}, checks={len(self.results)}, "
+                f"issues={self.issues})")
+
+    def to_dict(self):
+        return {
+            'num_rows': self.num_rows,
+            'issues': self.issues,
+            'checks_ok': self.checks_ok,
+            'seconds': self.seconds,
+            'checks': {name: r.to_dict() for name, r in self.results.items()},
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent, default=_json_default)
+
+
+def _json_default(value):
+    """JSON encoding for NumPy scalars in check details."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, tuple):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _labels(df, mask):
+    """Index labels of the rows where mask is True."""
+    return df.index.to_numpy()[np.asarray(mask, dtype=bool)]
+
+
+def _numeric(df, col):
+    return pd.to_numeric(df[col], errors='coerce')
+
+
+def _check_bad_date_format(df, dp):
+    bad = find_bad_date_format(df)
+    return np.array([m[0] for m in bad], dtype=df.index.dtype), {'findings': bad}
+
+
+def _check_day_of_week(df, dp):
+    mismatches = find_day_of_week_mismatches(df, dp)
+    return np.array([m[0] for m in mismatches], dtype=df.index.dtype), {'findings': mismatches}
+
+
+def _check_future_dates(df, dp):
+    return _labels(df, dp > FUTURE_CUTOFF), {'cutoff': FUTURE_CUTOFF.strftime('%Y-%m-%d')}
+
+
+def _check_duplicate_dates(df, dp):
+    dup = df['date'].duplicated(keep=False).to_numpy()
+    counts = df.loc[dup].groupby('date').size()
+    return _labels(df, dup), {'dates': {str(d): int(n) for d, n in counts.items()}}
+
+
+def _check_days_since_last(df, dp):
+    dfs = df.assign(_dp=dp).sort_values('_dp', kind='stable')
+    order = dfs.index.to_numpy()
+    dfs = dfs.reset_index(drop=True)
+    positions, reported, expected = days_since_last_mismatch_positions(dfs)
+    findings = [(dfs['date'].iat[pos], int(reported[pos]), int(expected[pos])) for pos in positions]
+    details = {'findings': findings}
+    if len(dfs):
+        details['first'] = {'date': dfs['date'].iat[0], 'days_since_last': dfs['days_since_last'].iat[0]}
+    return order[positions], details
+
+
+def _check_exercise_count(df, dp):
+    mismatches = find_exercise_count_mismatches(df)
+    return np.array([m[0] for m in mismatches], dtype=df.index.dtype), {'findings': mismatches}
+
+
+def _threshold_check(col, op, bound):
+    def check(df, dp):
+        return _labels(df, op(_numeric(df, col), bound)), {}
+    return check
+
+
+def _check_is_synthetic(df, dp):
+    return _labels(df, ~df['is_synthetic'].isin({True, False, 'True', 'False'})), {}
+
+
+def _check_missing_values(df, dp):
+    """Counts missing cells (not rows); rows are those with any missing cell."""
+    cols = [c for c in df.columns if not c.startswith('_')]
+    missing = df[cols].isnull()
+    per_column = missing.sum()
+    return _labels(df, missing.any(axis=1)), {
+        'count': int(per_column.sum()),
+        'per_column': {c: int(v) for c, v in per_column.items()},
+    }
+
+
+# name -> (summary label, groups, check). A check takes (df, parsed_dates) and
+# returns (offending row indices, details); the problem count is the number of
+# rows unless details carries a 'count'. "hot" checks are cheap structural
+# checks meant for every ingest; "full" is the whole suite.
+CHECKS = {
+    'bad_date_format': ('Bad date format', ('hot', 'full'), _check_bad_date_format),
+    'day_of_week_mismatch': ('day_of_week mismatches', ('full',), _check_day_of_week),
+    'future_dates': ('Future dates beyond Feb 2026', ('hot', 'full'), _check_future_dates),
+    'duplicate_dates': ('Duplicate dates', ('hot', 'full'), _check_duplicate_dates),
+    'days_since_last_mismatch': ('days_since_last mismatches', ('hot', 'full'), _check_days_since_last),
+    'exercise_count_mismatch': ('num_exercises vs exercises_list', ('full',), _check_exercise_count),
+    'negative_total_volume': ('Negative total_volume', ('hot', 'full'), _threshold_check('total_volume', np.less, 0)),
+    'negative_avg_weight': ('Negative avg_weight', ('hot', 'full'), _threshold_check('avg_weight', np.less, 0)),
+    'negative_avg_reps': ('Negative avg_reps', ('hot', 'full'), _threshold_check('avg_reps', np.less, 0)),
+    'duration_negative': ('Duration < 0', ('full',), _threshold_check('session_duration_est', np.less, 0)),
+    'duration_over_max': ('Duration > 300', ('full',),
+                          _threshold_check('session_duration_est', np.greater, MAX_DURATION_MIN)),
+    'invalid_is_synthetic': ('Invalid is_synthetic', ('hot', 'full'), _check_is_synthetic),
+    'num_sets_over_max': ('num_sets > 30', ('full',), _threshold_check(*DISTRIBUTION_FLAGS['num_sets_over_max'])),
+    'num_sets_under_1': ('num_sets < 1', ('full',), _threshold_check(*DISTRIBUTION_FLAGS['num_sets_under_1'])),
+    'avg_reps_over_max': ('avg_reps > 30', ('full',), _threshold_check(*DISTRIBUTION_FLAGS['avg_reps_over_max'])),
+    'avg_reps_under_1': ('avg_reps < 1', ('full',), _threshold_check(*DISTRIBUTION_FLAGS['avg_reps_under_1'])),
+    'missing_values': ('Missing values', ('hot', 'full'), _check_missing_values),
+}
+
+CHECK_GROUPS = ('hot', 'full')
+
+
+def select_checks(checks=None):
+    """
+    Resolve a check selection to a list of check names in suite order.
+    checks may be None (all), a group name ('hot' / 'full') or an iterable of names.
+    """
+    if checks is None:
+        return list(CHECKS)
+    if isinstance(checks, str):
+        if checks not in CHECK_GROUPS:
+            raise ValueError(f"Unknown check group {checks!r} (expected one of {CHECK_GROUPS})")
+        return [name for name, (_, groups, _) in CHECKS.items() if checks in groups]
+    unknown = [name for name in checks if name not in CHECKS]
+    if unknown:
+        raise ValueError(f"Unknown audit checks: {', '.join(unknown)}")
+    wanted = set(checks)
+    return [name for name in CHECKS if name in wanted]
+
+
+def audit(df, checks=None, parsed_dates=None):
+    """
+    Run the selected checks over a training_sessions frame and return an AuditReport.
+
+    checks: None for the full suite, 'hot' / 'full', or a list of check names.
+    parsed_dates: optional pre-parsed df['date'] (parsed with errors='coerce' if omitted).
+    """
+    start = time.perf_counter()
+    if parsed_dates is None:
+        parsed_dates = pd.to_datetime(df['date'], errors='coerce')
+
+    results = {}
+    for name in select_checks(checks):
+        label, _, check = CHECKS[name]
+        t0 = time.perf_counter()
+        rows, details = check(df, parsed_dates)
+        count = details.pop('count', len(rows))
+        results[name] = CheckResult(name, label, int(count), rows, time.perf_counter() - t0, details)
+
+    return AuditReport(len(df), results, time.perf_counter() - start)
+
+
+# ============================================================================
+# TABLE PROFILE
+# ============================================================================
+
+# Columns whose zero values the listing shows (CHECK 8)
+ZERO_COLUMNS = ['total_volume', 'avg_weight', 'avg_reps']
+
+# Checks whose offending rows the listing prints in full
+LISTED_CHECKS = ['future_dates', 'negative_total_volume', 'negative_avg_weight', 'negative_avg_reps',
+                 'duration_negative', 'duration_over_max', 'invalid_is_synthetic'] + list(DISTRIBUTION_FLAGS)
+
+
+def table_profile(df, report):
+    """
+    Everything the detailed listing shows beyond the AuditReport: shape,
+    dtypes, date range, printed rows, value counts and the CHECK 11-13
+    column summaries. chunked_audit.audit_chunked() builds the same dict
+    without holding the table in memory.
+    """
+    dp = pd.to_datetime(df['date'], errors='coerce').dropna()
+    return {
+        'num_rows': len(df),
+        'columns': df.columns.tolist(),
+        'dtypes': {c: str(df[c].dtype) for c in df.columns},
+        'date_min': dp.min() if len(dp) else None,
+        'date_max': dp.max() if len(dp) else None,
+        'rows': {name: df.loc[report[name].rows] for name in LISTED_CHECKS},
+        'zero_rows': {col: df[df[col] == 0] for col in ZERO_COLUMNS},
+        'synthetic_values': sorted(str(v) for v in df['is_synthetic'].unique()),
+        'value_counts': {col: df[col].value_counts() for col in ['is_synthetic', 'workout_type']},
+        # Exact summaries of the in-memory columns (no sketching)
+        'summaries': {col: ColumnSummary(exact_limit=np.inf).update(df[col]) for col in DISTRIBUTION_COLUMNS},
+    }
@@ -1,295 +1,408 @@
-import pandas as pd
-import numpy as np
-from datetime import datetime
-import os, warnings
+"""
+Training Sessions Audit
+Command-line front end for audit_checks.audit().
+
+    python audit_training_sessions.py [training_sessions.csv|.parquet|.feather]
+    python audit_training_sessions.py --checks hot
+    python audit_training_sessions.py --checks duplicate_dates missing_values --json
+    python audit_training_sessions.py --incremental audit_state.json
+    python audit_training_sessions.py big_sessions.csv --streaming --chunksize 500000
+    python audit_training_sessions.py big_sessions.csv --chunked --chunksize 200000
+
+The full suite prints the detailed CHECK 1-13 listing followed by the
+summary; a subset of checks prints only the summary. --json prints the
+AuditReport as JSON instead. --incremental audits only the rows appended
+to the CSV since the previous run (see incremental_audit.py). --streaming
+computes CHECK 11-13 in one chunked pass with mergeable sketches (see
+streaming_stats.py) instead of loading the table. --chunked runs the full
+audit out of core, chunksize rows at a time (see chunked_audit.py).
+"""
+
+import argparse
+import json
+import sys
+import warnings
+from pathlib import Path
+
+from audit_checks import (CHECKS, CHECK_GROUPS, DISTRIBUTION_FLAGS, audit, distribution_checks_chunked,
+                          load_sessions_table, select_checks, table_profile)
+from chunked_audit import DEFAULT_CHUNKSIZE, audit_chunked
+from incremental_audit import duration_summary, incremental_audit
+from streaming_stats import DEFAULT_K, EXACT_LIMIT
 warnings.filterwarnings('ignore')
 
-CSV = os.path.join('c:', os.sep, 'Users', 'cruzi', 'OneDrive', 'Desktop', 'GYM Data', 'training_sessions.csv')
-df = pd.read_csv(CSV)
+DATA_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_PATH = DATA_DIR / "training_sessions.csv"
+
 sep = '=' * 80
 
-# CHECK 1
-print(sep)
-print('CHECK 1: BASIC STATS')
-print(sep)
-print(f'  Row count    : {df.shape[0]}')
-print(f'  Column count : {df.shape[1]}')
-print(f'  Columns      : {df.columns.tolist()}')
-df['_dp'] = pd.to_datetime(df['date'], errors='coerce')
-vd = df['_dp'].dropna()
-dmin = vd.min().strftime('%Y-%m-%d')
-dmax = vd.max().strftime('%Y-%m-%d')
-print(f'  Date range   : {dmin} to {dmax}')
-print('  Dtypes:')
-for c in df.columns:
-    if c.startswith('_'): continue
-    print(f'    {c:30s} {str(df[c].dtype)}')
-print()
-
-# CHECK 2
-print(sep)
-print('CHECK 2: MISSING VALUES (per column)')
-print(sep)
-cols_orig = [c for c in df.columns if not c.startswith('_')]
-missing = df[cols_orig].isnull().sum()
-total_missing = missing.sum()
-for c, v in missing.items():
-    flag = ' <-- MISSING' if v > 0 else ''
-    print(f'  {c:30s} {v:>5d}{flag}')
-print(f'  {"TOTAL":30s} {total_missing:>5d}')
-if total_missing == 0: print('  >> No missing values found.')
-print()
-
-# CHECK 3
-print(sep)
-print('CHECK 3: DATE VALIDATION (format + day_of_week match)')
-print(sep)
-bad_format = []
-for i, row in df.iterrows():
+
+def print_details(profile, report):
+    """CHECK 1-13: the detailed audit listing from a table profile and a full-suite report."""
+    r = report.results
+    rows = profile['rows']
+
+    # CHECK 1
+    print(sep)
+    print('CHECK 1: BASIC STATS')
+    print(sep)
+    print(f'  Row count    : {profile["num_rows"]}')
+    print(f'  Column count : {len(profile["columns"])}')
+    print(f'  Columns      : {profile["columns"]}')
+    dmin = profile['date_min'].strftime('%Y-%m-%d')
+    dmax = profile['date_max'].strftime('%Y-%m-%d')
+    print(f'  Date range   : {dmin} to {dmax}')
+    print('  Dtypes:')
+    for c, dtype in profile['dtypes'].items():
+        print(f'    {c:30s} {dtype}')
+    print()
+
+    # CHECK 2
+    print(sep)
+    print('CHECK 2: MISSING VALUES (per column)')
+    print(sep)
+    missing = r['missing_values'].details['per_column']
+    total_missing = r['missing_values'].count
+    for c, v in missing.items():
+        flag = ' <-- MISSING' if v > 0 else ''
+        print(f'  {c:30s} {v:>5d}{flag}')
+    print(f'  {"TOTAL":30s} {total_missing:>5d}')
+    if total_missing == 0: print('  >> No missing values found.')
+    print()
+
+    # CHECK 3
+    print(sep)
+    print('CHECK 3: DATE VALIDATION (format + day_of_week match)')
+    print(sep)
+    bad_format = r['bad_date_format'].details['findings']
+    if bad_format:
+        print(f'  Rows with bad date format: {len(bad_format)}')
+        for idx, val in bad_format:
+            print(f'    Row {idx}: {val}')
+    else:
+        print('  Date format: ALL rows are valid YYYY-MM-DD.')
+
+    mismatches_dow = r['day_of_week_mismatch'].details['findings']
+    if mismatches_dow:
+        print(f'  day_of_week mismatches: {len(mismatches_dow)}')
+        for idx, dt, rep, act in mismatches_dow:
+            print(f'    Row {idx}: date={dt}, reported={rep}, actual={act}')
+    else:
+        print('  day_of_week: ALL rows match the actual calendar day.')
+    print()
+
+    # CHECK 4
+    print(sep)
+    print('CHECK 4: DATE RANGE & FUTURE DATE CHECK')
+    print(sep)
+    print(f'  Min date: {dmin}')
+    print(f'  Max date: {dmax}')
+    future = rows['future_dates']
+    if len(future) > 0:
+        print(f'  FUTURE DATES beyond Feb 2026: {len(future)}')
+        for i, row in future.iterrows():
+            print(f'    Row {i}: {row["date"]}')
+    else:
+        print('  No dates beyond Feb 2026.')
+    print()
+
+    # CHECK 5
+    print(sep)
+    print('CHECK 5: DUPLICATE DATES')
+    print(sep)
+    dup = r['duplicate_dates']
+    if dup.count > 0:
+        print(f'  Duplicate date entries: {len(dup.details["dates"])} dates ({dup.count} total rows)')
+        for dt, cnt in dup.details['dates'].items():
+            print(f'    {dt} appears {cnt} times')
+    else:
+        print('  No duplicate dates found.')
+    print()
+
+    # CHECK 6
+    print(sep)
+    print('CHECK 6: days_since_last VALIDATION')
+    print(sep)
+    dsl = r['days_since_last_mismatch'].details
+    first = dsl['first']
+    print(f'  First row (date={first["date"]}): days_since_last = {first["days_since_last"]}')
+    mismatches_dsl = dsl['findings']
+    if mismatches_dsl:
+        print(f'  Mismatches found: {len(mismatches_dsl)}')
+        for dt, rep, exp in mismatches_dsl:
+            print(f'    date={dt}: reported={rep}, expected={exp}, diff={rep-exp}')
+    else:
+        print('  All days_since_last values match actual gaps.')
+    print()
+
+    # CHECK 7
+    print(sep)
+    print('CHECK 7: num_exercises vs exercises_list ITEM COUNT')
+    print(sep)
+    mismatches_ex = r['exercise_count_mismatch'].details['findings']
+    if mismatches_ex:
+        print(f'  Mismatches found: {len(mismatches_ex)}')
+        for idx, dt, rep, cnt, el in mismatches_ex:
+            print(f'    Row {idx} (date={dt}): reported={rep}, counted={cnt}')
+            print(f'      exercises_list (trunc): {el}...')
+    else:
+        print('  All num_exercises values match comma-separated count.')
+    print()
+
+    # CHECK 8
+    print(sep)
+    print('CHECK 8: NEGATIVE / ZERO / UNREASONABLE VALUES')
+    print(sep)
+    for col in ['total_volume', 'avg_weight', 'avg_reps']:
+        neg = rows[f'negative_{col}']
+        zero = profile['zero_rows'][col]
+        print(f'  {col}:')
+        print(f'    Negative: {len(neg)}')
+        for i, row in neg.iterrows():
+            print(f'      Row {i} (date={row["date"]}): {row[col]}')
+        print(f'    Zero:     {len(zero)}')
+        for i, row in zero.iterrows():
+            print(f'      Row {i} (date={row["date"]}): {row[col]}')
+
+    dur_neg = rows['duration_negative']
+    dur_over = rows['duration_over_max']
+    print('  session_duration_est:')
+    print(f'    Negative (< 0):     {len(dur_neg)}')
+    for i, row in dur_neg.iterrows():
+        print(f'      Row {i} (date={row["date"]}): {row["session_duration_est"]}')
+    print(f'    Over 300 min (>5h): {len(dur_over)}')
+    for i, row in dur_over.iterrows():
+        print(f'      Row {i} (date={row["date"]}): {row["session_duration_est"]}')
+    print()
+
+    # CHECK 9
+    print(sep)
+    print('CHECK 9: is_synthetic VALUES')
+    print(sep)
+    print(f'  Unique values: {profile["synthetic_values"]}')
+    bad_syn = rows['invalid_is_synthetic']
+    if len(bad_syn) > 0:
+        print(f'  INVALID values: {len(bad_syn)}')
+        for i, row in bad_syn.iterrows():
+            print(f'    Row {i}: {repr(row["is_synthetic"])}')
+    else:
+        print('  All values are valid True/False.')
+    sc = profile['value_counts']['is_synthetic']
+    for val, cnt in sc.items():
+        print(f'    {val}: {cnt}')
+    print()
+
+    # CHECK 10
+    print(sep)
+    print('CHECK 10: WORKOUT TYPE CONSISTENCY')
+    print(sep)
+    wc = profile['value_counts']['workout_type']
+    print(f'  Unique workout_type values: {len(wc)}')
+    for wt, cnt in wc.items():
+        pct = cnt / profile['num_rows'] * 100
+        print(f'    {wt:30s} {cnt:>5d}  ({pct:.1f}%)')
+    print()
+
+    print_distribution_checks(profile['summaries'], {name: rows[name] for name in DISTRIBUTION_FLAGS})
+
+
+def print_distribution_checks(summaries, flagged):
+    """CHECK 11-13 from {column: ColumnSummary} and {flag name: flagged rows}."""
+    # CHECK 11
+    print(sep)
+    print('CHECK 11: num_sets REASONABLENESS (flag >30 or <1)')
+    print(sep)
+    sh = flagged['num_sets_over_max']
+    sl2 = flagged['num_sets_under_1']
+    print(f'  num_sets > 30: {len(sh)} rows')
+    for i, row in sh.iterrows():
+        print(f'    Row {i} (date={row["date"]}, type={row["workout_type"]}): num_sets={row["num_sets"]}')
+    print(f'  num_sets < 1:  {len(sl2)} rows')
+    for i, row in sl2.iterrows():
+        print(f'    Row {i} (date={row["date"]}, type={row["workout_type"]}): num_sets={row["num_sets"]}')
+    ns = summaries['num_sets']
+    print(f'  Stats: min={ns.min()}, max={ns.max()}, mean={ns.mean():.2f}, median={ns.median():.1f}')
+    print()
+
+    # CHECK 12
+    print(sep)
+    print('CHECK 12: avg_reps REASONABLENESS (flag >30 or <1)')
+    print(sep)
+    rh = flagged['avg_reps_over_max']
+    rl = flagged['avg_reps_under_1']
+    print(f'  avg_reps > 30: {len(rh)} rows')
+    for i, row in rh.iterrows():
+        print(f'    Row {i} (date={row["date"]}, type={row["workout_type"]}): avg_reps={row["avg_reps"]:.2f}')
+    print(f'  avg_reps < 1:  {len(rl)} rows')
+    for i, row in rl.iterrows():
+        print(f'    Row {i} (date={row["date"]}, type={row["workout_type"]}): avg_reps={row["avg_reps"]:.2f}')
+    ar = summaries['avg_reps']
+    print(f'  Stats: min={ar.min():.2f}, max={ar.max():.2f}, mean={ar.mean():.2f}, median={ar.median():.2f}')
+    print()
+
+    # CHECK 13
+    print(sep)
+    print('CHECK 13: session_duration_est DISTRIBUTION')
+    print(sep)
+    dur = summaries['session_duration_est']
+    print(f'  Min      : {dur.min():.1f}')
+    print(f'  Max      : {dur.max():.1f}')
+    print(f'  Mean     : {dur.mean():.2f}')
+    print(f'  Median   : {dur.median():.1f}')
+    print(f'  Std      : {dur.std():.2f}')
+    print(f'  Zeros    : {dur.zeros}')
+    print(f'  Negatives: {dur.negatives}')
+    print('  Percentiles:')
+    for p in [5, 10, 25, 50, 75, 90, 95]:
+        print(f'    {p:3d}th: {dur.quantile(p / 100):.1f}')
+    print()
+
+
+def print_summary(report):
+    """AUDIT SUMMARY: one line per check that ran, then the totals."""
+    print(sep)
+    print('AUDIT SUMMARY')
+    print(sep)
+    for result in report:
+        if result.count > 0:
+            print(f'  [ISSUE] {result.label}: {result.count} problem(s)')
+        else:
+            print(f'  [  OK ] {result.label}')
+    print()
+    print(f'  Total checks passed : {report.checks_ok}')
+    print(f'  Total issue rows    : {report.issues}')
+    print(sep)
+    print('AUDIT COMPLETE')
+    print(sep)
+
+
+def print_incremental(report, state, rebuilt):
+    """Summary for the newly appended rows, then running totals from the state file."""
+    print(sep)
+    if rebuilt:
+        print(f'INCREMENTAL AUDIT: state rebuilt from a full audit ({state["num_rows"]} rows)')
+    else:
+        print(f'INCREMENTAL AUDIT: {report.num_rows} new row(s), {state["num_rows"]} total')
+    print(f'  Last validated date: {state["last_date"]}')
+    if report.results:
+        print_summary(report)
+    else:
+        print(sep)
+
+    print('RUNNING TOTALS')
+    print(sep)
+    for name, count in state['counts'].items():
+        status = '[ISSUE]' if count else '[  OK ]'
+        print(f'  {status} {CHECKS[name][0]}: {count}')
+    d = duration_summary(state['duration'])
+    print('  session_duration_est (percentiles approximate):')
+    print(f'    Min: {d["min"]:.1f}  Max: {d["max"]:.1f}  Mean: {d["mean"]:.2f}  '
+          f'Median: {d["median"]:.1f}  Std: {d["std"]:.2f}')
+    print('    ' + '  '.join(f'{p}th: {v:.1f}' for p, v in d['percentiles'].items()))
+    print(sep)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Audit a training_sessions table.")
+    parser.add_argument(
+        "path", nargs="?", default=str(DEFAULT_PATH),
+        help="training_sessions .csv, .parquet or .feather (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--checks", nargs="+", metavar="CHECK",
+        help=f"Check group ({', '.join(CHECK_GROUPS)}) or check names to run "
+             f"(default: all). Checks: {', '.join(CHECKS)}",
+    )
+    parser.add_argument(
+        "--incremental", metavar="STATE_FILE",
+        help="Audit only rows appended to the CSV since the last run, keeping "
+             "running totals in STATE_FILE (created on first use)",
+    )
+    parser.add_argument(
+        "--chunked", action="store_true",
+        help="Full audit reading the table in chunks instead of loading it whole",
+    )
+    parser.add_argument(
+        "--streaming", action="store_true",
+        help="CHECK 11-13 only, computed chunk by chunk with streaming statistics",
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+        help="Rows per chunk for --chunked / --streaming; bounds peak memory (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--exact-limit", type=int, default=EXACT_LIMIT,
+        help="Values per column kept for exact CHECK 11-13 quantiles before switching "
+             "to a sketch, with --chunked / --streaming (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--sketch-k", type=int, default=DEFAULT_K,
+        help="KLL accuracy parameter for --streaming quantiles (default: %(default)s, "
+             "about 1.65%% rank error)",
+    )
+    parser.add_argument(
+        "--save-sketches", metavar="FILE",
+        help="With --streaming, write the column summaries as JSON so shards can be merged",
+    )
+    parser.add_argument(
+        "--json", action="store_true",
+        help="Print the audit report as JSON instead of the text listing",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    checks = None
+    if args.checks:
+        checks = args.checks[0] if len(args.checks) == 1 and args.checks[0] in CHECK_GROUPS else args.checks
     try:
-        datetime.strptime(str(row['date']), '%Y-%m-%d')
-    except Exception:
-        bad_format.append((i, row['date']))
-if bad_format:
-    print(f'  Rows with bad date format: {len(bad_format)}')
-    for idx, val in bad_format:
-        print(f'    Row {idx}: {val}')
-else:
-    print('  Date format: ALL rows are valid YYYY-MM-DD.')
-
-dn = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
-mismatches_dow = []
-for i, row in df.iterrows():
-    d = df.loc[i, '_dp']
-    if pd.isna(d): continue
-    actual_day = dn[d.weekday()]
-    if str(row['day_of_week']).strip() != actual_day:
-        mismatches_dow.append((i, row['date'], row['day_of_week'], actual_day))
-if mismatches_dow:
-    print(f'  day_of_week mismatches: {len(mismatches_dow)}')
-    for idx, dt, rep, act in mismatches_dow:
-        print(f'    Row {idx}: date={dt}, reported={rep}, actual={act}')
-else:
-    print('  day_of_week: ALL rows match the actual calendar day.')
-print()
-
-# CHECK 4
-print(sep)
-print('CHECK 4: DATE RANGE & FUTURE DATE CHECK')
-print(sep)
-print(f'  Min date: {dmin}')
-print(f'  Max date: {dmax}')
-cutoff = pd.Timestamp('2026-02-28')
-future = df[df['_dp'] > cutoff]
-if len(future) > 0:
-    print(f'  FUTURE DATES beyond Feb 2026: {len(future)}')
-    for i, row in future.iterrows():
-        print(f'    Row {i}: {row["date"]}')
-else:
-    print('  No dates beyond Feb 2026.')
-print()
-
-# CHECK 5
-print(sep)
-print('CHECK 5: DUPLICATE DATES')
-print(sep)
-dup_dates = df[df['date'].duplicated(keep=False)]
-if len(dup_dates) > 0:
-    grouped = dup_dates.groupby('date').size().reset_index(name='count')
-    print(f'  Duplicate date entries: {len(grouped)} dates ({len(dup_dates)} total rows)')
-    for _, r in grouped.iterrows():
-        print(f'    {r["date"]} appears {r["count"]} times')
-else:
-    print('  No duplicate dates found.')
-print()
-
-# CHECK 6
-print(sep)
-print('CHECK 6: days_since_last VALIDATION')
-print(sep)
-dfs = df.sort_values('_dp').reset_index(drop=True)
-mismatches_dsl = []
-for i in range(1, len(dfs)):
-    dc = dfs.loc[i, '_dp']
-    dp2 = dfs.loc[i-1, '_dp']
-    if pd.isna(dc) or pd.isna(dp2): continue
-    eg = (dc - dp2).days
-    rep = dfs.loc[i, 'days_since_last']
-    if not np.isnan(rep) and int(rep) != eg:
-        mismatches_dsl.append((dfs.loc[i, 'date'], int(rep), eg))
-fdsl = dfs.loc[0, 'days_since_last']
-print(f'  First row (date={dfs.loc[0, "date"]}): days_since_last = {fdsl}')
-if mismatches_dsl:
-    print(f'  Mismatches found: {len(mismatches_dsl)}')
-    for dt, rep, exp in mismatches_dsl:
-        print(f'    date={dt}: reported={rep}, expected={exp}, diff={rep-exp}')
-else:
-    print('  All days_since_last values match actual gaps.')
-print()
-
-# CHECK 7
-print(sep)
-print('CHECK 7: num_exercises vs exercises_list ITEM COUNT')
-print(sep)
-mismatches_ex = []
-for i, row in df.iterrows():
-    el = str(row['exercises_list'])
-    if el == 'nan' or el.strip() == '':
-        counted = 0
+        selected = select_checks(checks)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    if args.incremental:
+        try:
+            report, state, rebuilt = incremental_audit(args.path, args.incremental, checks=selected)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        if args.json:
+            print(json.dumps({'rebuilt': rebuilt, 'report': report.to_dict(), 'state': {
+                k: state[k] for k in ('num_rows', 'last_date', 'counts')}}, indent=2, default=str))
+        else:
+            print_incremental(report, state, rebuilt)
+        return 1 if report.issues else 0
+
+    if args.streaming:
+        summaries, flagged = distribution_checks_chunked(args.path, args.chunksize, k=args.sketch_k,
+                                                         exact_limit=args.exact_limit)
+        if args.save_sketches:
+            with open(args.save_sketches, 'w', encoding='utf-8') as f:
+                json.dump({col: s.to_dict() for col, s in summaries.items()}, f)
+        if not all(s.sketch.is_exact for s in summaries.values()):
+            print(f'  (quantiles from KLL sketches, k={args.sketch_k})')
+        print_distribution_checks(summaries, flagged)
+        return 1 if any(len(rows) for rows in flagged.values()) else 0
+
+    if args.chunked:
+        report, profile = audit_chunked(args.path, args.chunksize, k=args.sketch_k, exact_limit=args.exact_limit)
+        report.results = {name: report.results[name] for name in selected}
     else:
-        counted = len([x.strip() for x in el.split(',') if x.strip()])
-    rep = row['num_exercises']
-    if not np.isnan(rep) and int(rep) != counted:
-        mismatches_ex.append((i, row['date'], int(rep), counted, el[:80]))
-if mismatches_ex:
-    print(f'  Mismatches found: {len(mismatches_ex)}')
-    for idx, dt, rep, cnt, el in mismatches_ex:
-        print(f'    Row {idx} (date={dt}): reported={rep}, counted={cnt}')
-        print(f'      exercises_list (trunc): {el}...')
-else:
-    print('  All num_exercises values match comma-separated count.')
-print()
-
-# CHECK 8
-print(sep)
-print('CHECK 8: NEGATIVE / ZERO / UNREASONABLE VALUES')
-print(sep)
-for col in ['total_volume', 'avg_weight', 'avg_reps']:
-    neg = df[df[col] < 0]
-    zero = df[df[col] == 0]
-    print(f'  {col}:')
-    print(f'    Negative: {len(neg)}')
-    for i, row in neg.iterrows():
-        print(f'      Row {i} (date={row["date"]}): {row[col]}')
-    print(f'    Zero:     {len(zero)}')
-    for i, row in zero.iterrows():
-        print(f'      Row {i} (date={row["date"]}): {row[col]}')
-
-dur_neg = df[df['session_duration_est'] < 0]
-dur_over = df[df['session_duration_est'] > 300]
-print('  session_duration_est:')
-print(f'    Negative (< 0):     {len(dur_neg)}')
-for i, row in dur_neg.iterrows():
-    print(f'      Row {i} (date={row["date"]}): {row["session_duration_est"]}')
-print(f'    Over 300 min (>5h): {len(dur_over)}')
-for i, row in dur_over.iterrows():
-    print(f'      Row {i} (date={row["date"]}): {row["session_duration_est"]}')
-print()
-
-# CHECK 9
-print(sep)
-print('CHECK 9: is_synthetic VALUES')
-print(sep)
-usyn = df['is_synthetic'].unique()
-print(f'  Unique values: {sorted([str(v) for v in usyn])}')
-valid_vals = {True, False, 'True', 'False'}
-bad_syn = df[~df['is_synthetic'].isin(valid_vals)]
-if len(bad_syn) > 0:
-    print(f'  INVALID values: {len(bad_syn)}')
-    for i, row in bad_syn.iterrows():
-        print(f'    Row {i}: {repr(row["is_synthetic"])}')
-else:
-    print('  All values are valid True/False.')
-sc = df['is_synthetic'].value_counts()
-for val, cnt in sc.items():
-    print(f'    {val}: {cnt}')
-print()
-
-# CHECK 10
-print(sep)
-print('CHECK 10: WORKOUT TYPE CONSISTENCY')
-print(sep)
-wc = df['workout_type'].value_counts()
-print(f'  Unique workout_type values: {len(wc)}')
-for wt, cnt in wc.items():
-    pct = cnt / len(df) * 100
-    print(f'    {wt:30s} {cnt:>5d}  ({pct:.1f}%)')
-print()
-
-# CHECK 11
-print(sep)
-print('CHECK 11: num_sets REASONABLENESS (flag >30 or <1)')
-print(sep)
-sh = df[df['num_sets'] > 30]
-sl2 = df[df['num_sets'] < 1]
-print(f'  num_sets > 30: {len(sh)} rows')
-for i, row in sh.iterrows():
-    print(f'    Row {i} (date={row["date"]}, type={row["workout_type"]}): num_sets={row["num_sets"]}')
-print(f'  num_sets < 1:  {len(sl2)} rows')
-for i, row in sl2.iterrows():
-    print(f'    Row {i} (date={row["date"]}, type={row["workout_type"]}): num_sets={row["num_sets"]}')
-ns = df['num_sets']
-print(f'  Stats: min={ns.min()}, max={ns.max()}, mean={ns.mean():.2f}, median={ns.median():.1f}')
-print()
-
-# CHECK 12
-print(sep)
-print('CHECK 12: avg_reps REASONABLENESS (flag >30 or <1)')
-print(sep)
-rh = df[df['avg_reps'] > 30]
-rl = df[df['avg_reps'] < 1]
-print(f'  avg_reps > 30: {len(rh)} rows')
-for i, row in rh.iterrows():
-    print(f'    Row {i} (date={row["date"]}, type={row["workout_type"]}): avg_reps={row["avg_reps"]:.2f}')
-print(f'  avg_reps < 1:  {len(rl)} rows')
-for i, row in rl.iterrows():
-    print(f'    Row {i} (date={row["date"]}, type={row["workout_type"]}): avg_reps={row["avg_reps"]:.2f}')
-ar = df['avg_reps']
-print(f'  Stats: min={ar.min():.2f}, max={ar.max():.2f}, mean={ar.mean():.2f}, median={ar.median():.2f}')
-print()
-
-# CHECK 13
-print(sep)
-print('CHECK 13: session_duration_est DISTRIBUTION')
-print(sep)
-dur = df['session_duration_est']
-print(f'  Min      : {dur.min():.1f}')
-print(f'  Max      : {dur.max():.1f}')
-print(f'  Mean     : {dur.mean():.2f}')
-print(f'  Median   : {dur.median():.1f}')
-print(f'  Std      : {dur.std():.2f}')
-print(f'  Zeros    : {(dur == 0).sum()}')
-print(f'  Negatives: {(dur < 0).sum()}')
-print('  Percentiles:')
-for p in [5, 10, 25, 50, 75, 90, 95]:
-    print(f'    {p:3d}th: {dur.quantile(p / 100):.1f}')
-print()
-
-# SUMMARY
-print(sep)
-print('AUDIT SUMMARY')
-print(sep)
-issues = 0
-checks_ok = 0
-def report(name, count):
-    global issues, checks_ok
-    if count > 0:
-        issues += count
-        print(f'  [ISSUE] {name}: {count} problem(s)')
+        df = load_sessions_table(args.path)
+        report = audit(df, checks=selected)
+        profile = table_profile(df, report) if len(selected) == len(CHECKS) and not args.json else None
+
+    if args.json:
+        print(report.to_json())
     else:
-        checks_ok += 1
-        print(f'  [  OK ] {name}')
-
-report('Bad date format', len(bad_format))
-report('day_of_week mismatches', len(mismatches_dow))
-report('Future dates beyond Feb 2026', len(future))
-report('Duplicate dates', len(dup_dates))
-report('days_since_last mismatches', len(mismatches_dsl))
-report('num_exercises vs exercises_list', len(mismatches_ex))
-report('Negative total_volume', int((df['total_volume'] < 0).sum()))
-report('Negative avg_weight', int((df['avg_weight'] < 0).sum()))
-report('Negative avg_reps', int((df['avg_reps'] < 0).sum()))
-report('Duration < 0', len(dur_neg))
-report('Duration > 300', len(dur_over))
-report('Invalid is_synthetic', len(bad_syn))
-report('num_sets > 30', len(sh))
-report('num_sets < 1', len(sl2))
-report('avg_reps > 30', len(rh))
-report('avg_reps < 1', len(rl))
-report('Missing values', int(total_missing))
-print()
-print(f'  Total checks passed : {checks_ok}')
-print(f'  Total issue rows    : {issues}')
-print(sep)
-print('AUDIT COMPLETE')
-print(sep)
+        if len(selected) == len(CHECKS):
+            print_details(profile, report)
+        print_summary(report)
+    return 1 if report.issues else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
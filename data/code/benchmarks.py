@@ -0,0 +1,1347 @@
+"""
+Parser Benchmarks
+Micro-benchmarks for the hot paths in parse_training_data.py.
+
+Each benchmark keeps a copy of the previous implementation so it can check
+that the optimized code gives identical results on the shipped logs before
+reporting timings.
+
+Usage:
+    python benchmarks.py set-parsing [--data-dir PATH] [--repeat N]
+    python benchmarks.py header-matching [--data-dir PATH] [--repeat N]
+    python benchmarks.py sets-builder [--data-dir PATH] [--repeat N] [--rows N]
+    python benchmarks.py sessions-builder [--data-dir PATH] [--repeat N] [--rows N]
+    python benchmarks.py audit-checks [--data-dir PATH] [--repeat N] [--sizes N [N ...]]
+    python benchmarks.py incremental-audit [--data-dir PATH] [--repeat N] [--sizes N [N ...]]
+    python benchmarks.py alias-resolution [--data-dir PATH] [--repeat N] [--aliases N]
+    python benchmarks.py fuzzy-suggest [--repeat N] [--aliases N]
+    python benchmarks.py association-mining [--data-dir PATH] [--repeat N] [--sessions N]
+    python benchmarks.py session-matrix [--data-dir PATH] [--repeat N] [--sessions N]
+    python benchmarks.py rolling-rules [--data-dir PATH] [--repeat N] [--sessions N]
+    python benchmarks.py athlete-shards [--data-dir PATH] [--repeat N] [--athletes N [N ...]]
+    python benchmarks.py phases [--data-dir PATH] [--repeat N] [--rows N]
+    python benchmarks.py anomaly [--data-dir PATH] [--repeat N] [--rows N]
+    python benchmarks.py progression [--data-dir PATH] [--repeat N] [--rows N]
+    python benchmarks.py workload [--data-dir PATH] [--repeat N] [--rows N]
+"""
+
+import argparse
+import copy
+import difflib
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import anomaly
+import association_mining
+import audit_checks
+import parse_training_data as ptd
+import phases
+import progression
+import rolling_rules
+import workload
+from exercise_aliases import AliasIndex, normalize_alias
+from fuzzy_match import SuggestionIndex
+from session_matrix import SessionMatrix
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent.parent
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def time_call(fn, repeat=5):
+    """Best-of-N wall time in seconds for fn()."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def collect_set_inputs(data_dir):
+    """
+    Return every (set_str, exercise_standard, exercise_raw) the parser hands
+    to parse_set_string while parsing the logs in data_dir.
+    """
+    calls = []
+    original = ptd.parse_set_string
+
+    def recording(set_str, exercise_standard, exercise_raw="", bodyweight=None):
+        calls.append((set_str, exercise_standard, exercise_raw))
+        return original(set_str, exercise_standard, exercise_raw, bodyweight)
+
+    ptd.parse_set_string = recording
+    try:
+        for filepath in sorted(Path(data_dir).glob("*.txt")):
+            ptd.parse_workout_file(filepath)
+    finally:
+        ptd.parse_set_string = original
+    return calls
+
+
+def split_set_inputs(calls):
+    """Split recorded set strings into the weight and reps tokens parse_set_string sees."""
+    weights, reps = [], []
+    for set_str, exercise_standard, exercise_raw in calls:
+        set_str = str(set_str).strip()
+        match = re.search(r'x(\d+)$', set_str)
+        if match:
+            set_str = set_str[:match.start()]
+        parts = set_str.split('/')
+        if len(parts) < 2:
+            continue
+        weights.append((parts[0], exercise_standard, exercise_raw))
+        reps.append(parts[1])
+    return weights, reps
+
+
+def synthetic_sessions(data_dir, num_sets):
+    """
+    Parsed sessions from data_dir, repeated with shifted dates until they
+    hold at least num_sets sets.
+    """
+    from datetime import timedelta
+
+    base = [s for fp in sorted(Path(data_dir).glob("*.txt")) for s in ptd.parse_workout_file(fp)]
+    base_sets = sum(len(ex['sets']) for s in base for ex in s['exercises'])
+    sessions = []
+    offset = 0
+    while len(sessions) // max(len(base), 1) * base_sets < num_sets:
+        for session in base:
+            sessions.append(dict(session, date=session['date'] + timedelta(days=offset)))
+        offset += 7 * 110  # next copy lands after the real history
+    return sessions
+
+
+def frames_equivalent(expected, actual):
+    """True if two frames hold the same values, ignoring dtypes (e.g. object vs categorical)."""
+    try:
+        pd.testing.assert_frame_equal(expected.astype(object), actual.astype(object), check_dtype=False)
+    except AssertionError as exc:
+        print(f"  frames differ: {exc}")
+        return False
+    return True
+
+
+def synthetic_sessions_table(data_dir, num_rows, seed=0):
+    """
+    A training_sessions frame of num_rows rows built from the shipped logs,
+    with a sprinkling of injected defects (bad dates, wrong day names, gaps
+    and exercise counts, blank list items, missing values) so the audit
+    checks have findings to agree on.
+    """
+    sets_df = ptd.build_training_sets_df(synthetic_sessions(data_dir, 1))
+    base = ptd.build_training_sessions_df(sets_df).reset_index(drop=True)
+    base['date'] = base['date'].astype(object)
+    reps = -(-num_rows // len(base))
+    df = pd.concat([base] * reps, ignore_index=True).iloc[:num_rows].copy()
+
+    # Shift each copy past the previous one so dates keep increasing
+    copy_number = np.arange(len(df)) // len(base)
+    dates = pd.to_datetime(df['date']) + pd.to_timedelta(copy_number * 7 * 110, unit='D')
+    df['date'] = dates.dt.strftime('%Y-%m-%d').astype(object)
+    df['day_of_week'] = np.array(ptd.DAY_NAMES, dtype=object)[dates.dt.weekday]
+    df['days_since_last'] = dates.diff().dt.days.fillna(0).astype(int)
+    for col in ['day_of_week', 'workout_type', 'exercises_list']:
+        df[col] = df[col].astype(object)
+
+    rng = np.random.default_rng(seed)
+    def pick(fraction):
+        return rng.choice(len(df), size=max(1, int(len(df) * fraction)), replace=False)
+
+    df.loc[pick(0.001), 'date'] = '2024/01/05'
+    df.loc[pick(0.001), 'date'] = '2024-1-5'
+    df.loc[pick(0.001), 'date'] = np.nan
+    df.loc[pick(0.002), 'day_of_week'] = 'Funday'
+    df.loc[pick(0.002), 'days_since_last'] = 9
+    df['num_exercises'] = df['num_exercises'].astype(float)
+    df.loc[pick(0.002), 'num_exercises'] = 99
+    df.loc[pick(0.001), 'num_exercises'] = np.nan
+    df.loc[pick(0.001), 'exercises_list'] = 'Deadlift,, Bench Press ,'
+    df.loc[pick(0.001), 'exercises_list'] = np.nan
+    return df
+
+
+# ============================================================================
+# REFERENCE IMPLEMENTATIONS (pre-optimization)
+# ============================================================================
+
+def legacy_parse_weight_notation(weight_str, exercise_standard, exercise_raw=""):
+    """parse_weight_notation before the precompiled-pattern rewrite."""
+    if not weight_str or weight_str.strip() in ['NA', 'MATCH', 'GF', 'BF', 'DL', '']:
+        return None, False, False, weight_str
+
+    weight_str = str(weight_str).strip()
+    original = weight_str
+    exercise_is_kg = 'KG' in exercise_raw.upper() or 'kg' in exercise_raw
+
+    weight_str = weight_str.replace('⅛', '.125').replace('¼', '.25').replace('⅓', '.333')
+    weight_str = weight_str.replace('½', '.5').replace('⅔', '.667').replace('¾', '.75')
+    weight_str = weight_str.replace('⅚', '.833').replace('⅝', '.625').replace('⅜', '.375')
+
+    if weight_str.startswith('FS'):
+        has_extender = '+' in weight_str
+        return None, False, has_extender, original
+
+    STANDARD_BODYWEIGHT = 185
+    if weight_str.startswith('BW'):
+        match = re.search(r'BW\+?(\d+\.?\d*)', weight_str)
+        if match:
+            added_weight = float(match.group(1))
+            return STANDARD_BODYWEIGHT + added_weight, True, False, original
+        return STANDARD_BODYWEIGHT, True, False, original
+
+    kg_match = re.search(r'(\d+\.?\d*)\s*\+?\s*(\d+\.?\d*)?\s*KG', weight_str, re.IGNORECASE)
+    if kg_match or 'KG' in weight_str.upper():
+        numbers = re.findall(r'(\d+\.?\d*)', weight_str.split('KG')[0].split('kg')[0])
+        if numbers:
+            total_kg = sum(float(n) for n in numbers if n)
+            total_lbs = total_kg * 2.205
+            return round(total_lbs, 1), False, False, original
+        return None, False, False, original
+
+    pps_match = re.match(r'(\d+)PPs?(?:\+(\d+\.?\d*))?', weight_str)
+    if pps_match:
+        plates = int(pps_match.group(1))
+        extra = float(pps_match.group(2)) if pps_match.group(2) else 0
+        weight = (plates * 45 * 2) + extra
+        if exercise_standard in ptd.BARBELL_EXERCISES:
+            weight += 45
+        else:
+            weight += 22.5
+        return weight, False, False, original
+
+    if exercise_is_kg:
+        numbers = re.findall(r'(\d+\.?\d*)', weight_str)
+        if numbers:
+            total_kg = sum(float(n) for n in numbers if n)
+            weight = round(total_kg * 2.205, 1)
+            return weight, False, False, original
+
+    num_match = re.match(r'\+?(\d+\.?\d*)', weight_str)
+    if num_match:
+        weight = float(num_match.group(1))
+        return weight, False, False, original
+
+    return None, False, False, original
+
+
+def legacy_parse_reps_notation(reps_str):
+    """parse_reps_notation before the translate-table rewrite."""
+    if not reps_str or reps_str.strip() in ['NA', 'F', 'BF', 'GF', '']:
+        return None, False, None
+
+    reps_str = str(reps_str).strip()
+    reps_str = reps_str.replace('⅛', '.125').replace('¼', '.25').replace('⅓', '.333')
+    reps_str = reps_str.replace('½', '.5').replace('⅔', '.667').replace('¾', '.75')
+    reps_str = reps_str.replace('⅚', '.833').replace('⅝', '.625').replace('⅜', '.375')
+
+    if ':' in reps_str and '+' not in reps_str:
+        parts = reps_str.split(':')
+        try:
+            left = float(parts[0]) if parts[0] else None
+            right = float(parts[1]) if len(parts) > 1 and parts[1] else None
+            return (left, right), False, 'single_leg'
+        except ValueError:
+            pass
+
+    if '+' in reps_str:
+        parts = reps_str.split('+')
+        try:
+            base_reps = float(parts[0])
+            extra_reps = float(parts[1]) if len(parts) > 1 and parts[1] else 0
+            return base_reps + extra_reps, True, None
+        except ValueError:
+            pass
+
+    try:
+        return float(reps_str), False, None
+    except ValueError:
+        return None, False, None
+
+
+def legacy_is_workout_header(line):
+    """is_workout_header before the patterns were compiled into one alternation."""
+    line = line.strip()
+    if not line:
+        return False
+    if '/' in line:
+        return False
+    if len(line) > 50:
+        return False
+
+    clean = line.rstrip(':').strip()
+    workout_patterns = [
+        r'^Upper\s*\d*$', r'^Lower\s*\d*$', r'^Legs\s*\d*$', r'^Back\s*\d*$',
+        r'^Chest\s*\d*$', r'^Arms\s*\d*$', r'^Torso\s*\d*$', r'^Limbs\s*\d*$',
+        r'^Upper\s+\d+$', r'^Lower\s*\d+$', r'^Legs\s+\d+$', r'^Back\s+\d+$',
+        r'^Arms\s+\d+$', r'^Torso\s+\d+$', r'^Limbs\s+\d+$',
+        r'^Bro\s*[Dd]ay\s*\d*$', r'^Fun\s*[Dd]ay\s*\d*$', r'^Weakness\s*[Dd]ay\s*\d*$',
+        r'^Chest\s+[Aa]nd\s+[Aa]rms\s*\d*$', r'^Chest\s+[Aa]nd\s+[Aa]rms\s*$',
+        r'^Back\s+[Aa]nd\s+[Ss]houlders\s*\d*$',
+        r'^Upper\s+[Bb]ack\s+[Aa]nd\s+[Ss]houlders\s*\d*$',
+        r'^[Ii]solation[s]?\s*\d*$',
+    ]
+    for pattern in workout_patterns:
+        if re.match(pattern, clean, re.IGNORECASE):
+            return True
+    return False
+
+
+def legacy_build_training_sets_df(all_sessions):
+    """build_training_sets_df before the columnar rewrite (one dict per set)."""
+    rows = []
+    for session in all_sessions:
+        date = session['date']
+        workout_type = session['workout_type']
+        day_of_week = ptd.get_day_of_week(date)
+
+        for exercise in session['exercises']:
+            exercise_raw = exercise['exercise_raw']
+            exercise_standard = ptd.EXERCISE_MAPPING.get(exercise_raw, exercise_raw)
+            is_paused = exercise['is_paused']
+
+            for set_num, set_data in enumerate(exercise['sets'], 1):
+                reps = set_data['reps']
+                if isinstance(reps, tuple):
+                    left, right = reps
+                    if left is not None and right is not None:
+                        reps = (left + right) / 2
+                    elif left is not None:
+                        reps = left
+                    elif right is not None:
+                        reps = right
+                    else:
+                        reps = None
+
+                weight_lbs = set_data['weight_lbs']
+                if weight_lbs is not None and reps is not None:
+                    volume = weight_lbs * reps
+                else:
+                    volume = None
+
+                notes = []
+                if is_paused:
+                    notes.append('paused')
+                if set_data['is_bodyweight']:
+                    notes.append('bodyweight')
+                if set_data['reps_type'] == 'single_leg':
+                    notes.append('single_leg')
+
+                rows.append({
+                    'date': date.strftime('%Y-%m-%d'),
+                    'day_of_week': day_of_week,
+                    'workout_type': workout_type,
+                    'exercise_raw': exercise_raw,
+                    'exercise_standard': exercise_standard,
+                    'weight_raw': set_data['weight_raw'],
+                    'weight_lbs': weight_lbs,
+                    'reps': reps,
+                    'set_number': set_num,
+                    'volume': volume,
+                    'has_extender': set_data['has_extender'],
+                    'machine_position': None,
+                    'is_synthetic': False,
+                    'date_is_estimated': session['date_is_estimated'],
+                    'notes': ', '.join(notes) if notes else '',
+                })
+
+    return pd.DataFrame(rows)
+
+
+def legacy_build_training_sessions_df(sets_df):
+    """build_training_sessions_df before vectorization (lambda aggregations)."""
+    sessions = sets_df.groupby(['date', 'workout_type'], observed=True).agg({
+        'day_of_week': 'first',
+        'exercise_standard': lambda x: ','.join(x.unique()),
+        'set_number': 'count',
+        'volume': 'sum',
+        'weight_lbs': 'mean',
+        'reps': 'mean',
+        'is_synthetic': 'any',
+        'date_is_estimated': 'any',
+    }).reset_index()
+
+    sessions.columns = [
+        'date', 'workout_type', 'day_of_week', 'exercises_list',
+        'num_sets', 'total_volume', 'avg_weight', 'avg_reps', 'is_synthetic',
+        'date_is_estimated'
+    ]
+    sessions['num_exercises'] = sessions['exercises_list'].apply(lambda x: len(x.split(',')))
+    sessions['session_duration_est'] = sessions['num_sets'] * 3
+    sessions = sessions.sort_values('date')
+    sessions['date_dt'] = pd.to_datetime(sessions['date'])
+    sessions['days_since_last'] = sessions['date_dt'].diff().dt.days.fillna(0).astype(int)
+    sessions = sessions.drop('date_dt', axis=1)
+    return sessions[[
+        'date', 'day_of_week', 'workout_type', 'exercises_list',
+        'num_exercises', 'num_sets', 'total_volume', 'avg_weight',
+        'avg_reps', 'session_duration_est', 'days_since_last', 'is_synthetic',
+        'date_is_estimated'
+    ]]
+
+
+def legacy_audit_row_checks(df):
+    """The iterrows()/loc loops audit_training_sessions.py used for CHECK 3, 6 and 7."""
+    from datetime import datetime
+
+    bad_format = []
+    for i, row in df.iterrows():
+        try:
+            datetime.strptime(str(row['date']), '%Y-%m-%d')
+        except Exception:
+            bad_format.append((i, row['date']))
+
+    dn = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    mismatches_dow = []
+    for i, row in df.iterrows():
+        d = df.loc[i, '_dp']
+        if pd.isna(d):
+            continue
+        actual_day = dn[d.weekday()]
+        if str(row['day_of_week']).strip() != actual_day:
+            mismatches_dow.append((i, row['date'], row['day_of_week'], actual_day))
+
+    dfs = df.sort_values('_dp', kind='stable').reset_index(drop=True)
+    mismatches_dsl = []
+    for i in range(1, len(dfs)):
+        dc = dfs.loc[i, '_dp']
+        dp2 = dfs.loc[i - 1, '_dp']
+        if pd.isna(dc) or pd.isna(dp2):
+            continue
+        eg = (dc - dp2).days
+        rep = dfs.loc[i, 'days_since_last']
+        if not np.isnan(rep) and int(rep) != eg:
+            mismatches_dsl.append((dfs.loc[i, 'date'], int(rep), eg))
+
+    mismatches_ex = []
+    for i, row in df.iterrows():
+        el = str(row['exercises_list'])
+        if el == 'nan' or el.strip() == '':
+            counted = 0
+        else:
+            counted = len([x.strip() for x in el.split(',') if x.strip()])
+        rep = row['num_exercises']
+        if not np.isnan(rep) and int(rep) != counted:
+            mismatches_ex.append((i, row['date'], int(rep), counted, el[:80]))
+
+    return bad_format, mismatches_dow, mismatches_dsl, mismatches_ex
+
+
+def legacy_dense_apriori(transactions, min_support, batch=1000):
+    """
+    mlxtend's apriori(use_colnames=True) on a TransactionEncoder-style dense
+    boolean matrix: candidates extend each frequent itemset with every larger
+    frequent item and are counted with np.all over the member columns
+    (in batches of candidates, to bound the n_sessions x batch x k temporary).
+    """
+    items = sorted({item for t in transactions for item in t})
+    column = {item: i for i, item in enumerate(items)}
+    X = np.zeros((len(transactions), len(items)), dtype=bool)
+    for row, t in enumerate(transactions):
+        X[row, [column[item] for item in t]] = True
+
+    n = len(transactions)
+    support = X.sum(axis=0) / n
+    keep = support >= min_support
+    levels = [(np.flatnonzero(keep).reshape(-1, 1), support[keep])]
+    while True:
+        previous = levels[-1][0]
+        frequent_items = np.unique(previous)
+        combos = [tuple(old) + (item,) for old in previous.tolist()
+                  for item in frequent_items[frequent_items > old[-1]].tolist()]
+        if not combos:
+            break
+        combos = np.array(combos)
+        support = np.concatenate([np.all(X[:, combos[i:i + batch]], axis=2).sum(axis=0) / n
+                                  for i in range(0, len(combos), batch)])
+        keep = support >= min_support
+        if not keep.any():
+            break
+        levels.append((combos[keep], support[keep]))
+
+    return pd.DataFrame({
+        'support': np.concatenate([support for _, support in levels]),
+        'itemsets': [frozenset(items[i] for i in itemset) for itemsets, _ in levels for itemset in itemsets],
+    })
+
+
+def legacy_association_rules(itemsets, min_confidence):
+    """mlxtend's association_rules(metric='confidence') loop over each itemset's splits."""
+    support_of = dict(zip(itemsets['itemsets'], itemsets['support']))
+    rules = {}
+    for itemset, sAC in support_of.items():
+        for size in range(len(itemset) - 1, 0, -1):
+            for combo in combinations(itemset, size):
+                antecedent = frozenset(combo)
+                consequent = itemset.difference(antecedent)
+                sA, sC = support_of[antecedent], support_of[consequent]
+                confidence = sAC / sA
+                if confidence >= min_confidence:
+                    rules[(antecedent, consequent)] = (sAC, confidence, confidence / sC)
+    return rules
+
+
+def reference_rolling_volume(df, window_days):
+    """Trailing volume per session from daily totals and a time-based rolling window."""
+    dates = pd.to_datetime(df['date'], errors='coerce')
+    volume = pd.to_numeric(df['total_volume'], errors='coerce').fillna(0)
+    daily = volume.groupby(dates).sum()
+    trailing = daily.rolling(f"{window_days}D").sum()
+    return trailing.reindex(dates).to_numpy()
+
+
+def legacy_lloyd_kmeans(X, k, seed=0, max_iter=100, tol=1e-4):
+    """Full-batch Lloyd K-Means from the same k-means++ seeding: every iteration reads all rows."""
+    rng = np.random.default_rng(seed)
+    sample = np.asarray(X[np.sort(rng.choice(len(X), min(len(X), max(10 * k, 3 * phases.DEFAULT_BATCH_SIZE)),
+                                              replace=False))], dtype=np.float64)
+    centers = phases.kmeans_plus_plus(sample, k, rng)
+    for _ in range(max_iter):
+        labels, _ = phases.nearest_centers(X, centers)
+        sums = np.zeros_like(centers)
+        for j in range(X.shape[1]):
+            sums[:, j] = np.bincount(labels, weights=X[:, j], minlength=k)
+        sizes = np.bincount(labels, minlength=k)
+        new = np.where(sizes[:, None] > 0, sums / np.maximum(sizes, 1)[:, None], centers)
+        shift = float(((new - centers) ** 2).sum())
+        centers = new
+        if shift <= tol * float(sample.var(axis=0).mean()) * k:
+            break
+    return centers, float(phases.nearest_centers(X, centers)[1].sum())
+
+
+def legacy_isolation_score(forest, X):
+    """Isolation forest scores walking each tree row by row."""
+    c = float(anomaly.average_path_length(forest.psi_))
+    scores = np.empty(len(X))
+    for i, x in enumerate(X):
+        total = 0.0
+        for root in forest.roots_:
+            node, depth = root, 0
+            while forest.feature_[node] >= 0:
+                node = forest.left_[node] if x[forest.feature_[node]] < forest.threshold_[node] else forest.right_[node]
+                depth += 1
+            total += depth + float(anomaly.average_path_length(forest.size_[node]))
+        scores[i] = 2.0 ** (-total / len(forest.roots_) / c)
+    return scores
+
+
+def legacy_current_pr(sets_df, exercise):
+    """Best e1RM set of one exercise: e1RM over the whole table, then a filter and idxmax."""
+    e1rm = progression.estimated_1rm(sets_df['weight_lbs'], sets_df['reps'])
+    mine = pd.Series(e1rm, index=sets_df.index)[(sets_df['exercise_standard'] == exercise).to_numpy()].dropna()
+    return float(mine.max()) if len(mine) else None
+
+
+def legacy_pr_history(sets_df):
+    """(exercise, date, e1rm) of every PR via a per-day max, groupby cummax and comparison over all sets."""
+    df = sets_df.assign(e1rm=progression.estimated_1rm(sets_df['weight_lbs'], sets_df['reps'])).dropna(subset=['e1rm'])
+    df = df.assign(date=pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d'),
+                   exercise_standard=df['exercise_standard'].astype(str))
+    df = df.groupby(['exercise_standard', 'date'], sort=True)['e1rm'].max().reset_index()
+    best = df.groupby('exercise_standard')['e1rm'].cummax()
+    previous = best.groupby(df['exercise_standard']).shift(1)
+    records = df[previous.isna() | (df['e1rm'] > previous)]
+    return sorted(zip(records['exercise_standard'], records['date'], records['e1rm']))
+
+
+def legacy_workload(sets_df):
+    """
+    Per-day recompute: for every calendar day, filter the sets of the last
+    7 and 28 days and group them by muscle group; EWMAs stepped day by day.
+    Returns {(muscle group, date): (acute, chronic, ewma_acute, ewma_chronic)}.
+    """
+    dates = pd.to_datetime(sets_df['date'])
+    groups = workload.muscle_groups(sets_df['exercise_standard'])
+    frame = pd.DataFrame({'date': dates, 'group': groups, 'volume': sets_df['volume'].fillna(0)})
+    frame = pd.concat([frame, frame.assign(group=workload.TOTAL)], ignore_index=True)
+    names = sorted(frame['group'].unique())
+    lam_a, lam_c = 2 / (workload.ACUTE_DAYS + 1), 2 / (workload.CHRONIC_DAYS + 1)
+    ewmas = {name: (0.0, 0.0) for name in names}
+    result = {}
+    for day in pd.date_range(dates.min(), dates.max(), freq='D'):
+        acute = frame[(frame['date'] > day - pd.Timedelta(days=workload.ACUTE_DAYS)) & (frame['date'] <= day)]
+        chronic = frame[(frame['date'] > day - pd.Timedelta(days=workload.CHRONIC_DAYS)) & (frame['date'] <= day)]
+        today = frame[frame['date'] == day].groupby('group')['volume'].sum()
+        acute = acute.groupby('group')['volume'].sum()
+        chronic = chronic.groupby('group')['volume'].sum()
+        for name in names:
+            x = today.get(name, 0.0)
+            ea, ec = ewmas[name]
+            ewmas[name] = (lam_a * x + (1 - lam_a) * ea, lam_c * x + (1 - lam_c) * ec)
+            result[(name, day)] = (acute.get(name, 0.0) / workload.ACUTE_DAYS,
+                                   chronic.get(name, 0.0) / workload.CHRONIC_DAYS, *ewmas[name])
+    return result
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def bench_set_parsing(args):
+    """Weight/reps notation parsing: parity on every logged set, then sets/second."""
+    data_dir, repeat = args.data_dir, args.repeat
+    calls = collect_set_inputs(data_dir)
+    weights, reps = split_set_inputs(calls)
+    print(f"Collected {len(weights)} sets from {data_dir}")
+
+    mismatches = 0
+    for args, reps_str in zip(weights, reps):
+        if legacy_parse_weight_notation(*args) != ptd.parse_weight_notation(*args):
+            mismatches += 1
+            print(f"  weight mismatch: {args!r}")
+        if legacy_parse_reps_notation(reps_str) != ptd.parse_reps_notation(reps_str):
+            mismatches += 1
+            print(f"  reps mismatch: {reps_str!r}")
+    print(f"Parity: {'OK' if mismatches == 0 else f'{mismatches} mismatches'}")
+
+    def run(parse_weight, parse_reps):
+        def loop():
+            for args, reps_str in zip(weights, reps):
+                parse_weight(*args)
+                parse_reps(reps_str)
+        return loop
+
+    before = time_call(run(legacy_parse_weight_notation, legacy_parse_reps_notation), repeat)
+    after = time_call(run(ptd.parse_weight_notation, ptd.parse_reps_notation), repeat)
+    n = len(weights)
+    print(f"  before: {n / before:>12,.0f} sets/s")
+    print(f"  after : {n / after:>12,.0f} sets/s  ({before / after:.2f}x)")
+    return mismatches == 0
+
+
+def bench_header_matching(args):
+    """Workout header detection: identical classification of every log line, then lines/second."""
+    data_dir, repeat = args.data_dir, args.repeat
+    lines = []
+    for filepath in sorted(Path(data_dir).glob("*.txt")):
+        with open(filepath, 'r', encoding='utf-8-sig') as f:
+            lines.extend(f.read().split('\n'))
+    print(f"Collected {len(lines)} lines from {data_dir}")
+
+    mismatches = 0
+    headers = 0
+    for line in lines:
+        expected = legacy_is_workout_header(line)
+        headers += expected
+        if ptd.is_workout_header(line) != expected:
+            mismatches += 1
+            print(f"  mismatch: {line!r} (expected {expected})")
+    print(f"Parity: {'OK' if mismatches == 0 else f'{mismatches} mismatches'} ({headers} header lines)")
+
+    def run(is_header):
+        def loop():
+            for line in lines:
+                is_header(line)
+        return loop
+
+    before = time_call(run(legacy_is_workout_header), repeat)
+    after = time_call(run(ptd.is_workout_header), repeat)
+    n = len(lines)
+    print(f"  before: {n / before:>12,.0f} lines/s")
+    print(f"  after : {n / after:>12,.0f} lines/s  ({before / after:.2f}x)")
+    return mismatches == 0
+
+
+def bench_sets_builder(args):
+    """build_training_sets_df: equivalent frame, then wall time and memory on synthetic sets."""
+    sessions = synthetic_sessions(args.data_dir, args.rows)
+    print(f"Built {len(sessions)} synthetic sessions")
+
+    expected = legacy_build_training_sets_df(sessions)
+    actual = ptd.build_training_sets_df(sessions)
+    ok = frames_equivalent(expected, actual)
+    print(f"Parity: {'OK' if ok else 'MISMATCH'} ({len(actual):,} sets)")
+
+    before = time_call(lambda: legacy_build_training_sets_df(sessions), args.repeat)
+    after = time_call(lambda: ptd.build_training_sets_df(sessions), args.repeat)
+    print(f"  before: {before:8.2f} s  frame {expected.memory_usage(deep=True).sum() / 1e6:8.1f} MB")
+    print(f"  after : {after:8.2f} s  frame {actual.memory_usage(deep=True).sum() / 1e6:8.1f} MB"
+          f"  ({before / after:.2f}x)")
+    return ok
+
+
+def bench_sessions_builder(args):
+    """build_training_sessions_df: equivalent frame, then wall time on synthetic sets."""
+    sets_df = ptd.build_training_sets_df(synthetic_sessions(args.data_dir, args.rows))
+    print(f"Built {len(sets_df):,} synthetic sets")
+
+    expected = legacy_build_training_sessions_df(sets_df)
+    actual = ptd.build_training_sessions_df(sets_df)
+    ok = frames_equivalent(expected, actual)
+    print(f"Parity: {'OK' if ok else 'MISMATCH'} ({len(actual):,} sessions)")
+
+    before = time_call(lambda: legacy_build_training_sessions_df(sets_df), args.repeat)
+    after = time_call(lambda: ptd.build_training_sessions_df(sets_df), args.repeat)
+    print(f"  before: {before:8.3f} s")
+    print(f"  after : {after:8.3f} s  ({before / after:.2f}x)")
+    return ok
+
+
+def vectorized_audit_row_checks(df):
+    """The audit_checks equivalents of legacy_audit_row_checks."""
+    _, mismatches_dsl = audit_checks.find_days_since_last_mismatches(df, df['_dp'])
+    return (
+        audit_checks.find_bad_date_format(df),
+        audit_checks.find_day_of_week_mismatches(df, df['_dp']),
+        mismatches_dsl,
+        audit_checks.find_exercise_count_mismatches(df),
+    )
+
+
+def bench_audit_checks(args):
+    """Row-level audit checks: identical findings, then old vs new wall time per table size."""
+    ok = True
+    for size in args.sizes:
+        df = synthetic_sessions_table(args.data_dir, size)
+        df['_dp'] = pd.to_datetime(df['date'], errors='coerce', format='%Y-%m-%d')
+
+        start = time.perf_counter()
+        expected = legacy_audit_row_checks(df)
+        before = time.perf_counter() - start
+        actual = vectorized_audit_row_checks(df)
+        after = time_call(lambda: vectorized_audit_row_checks(df), args.repeat)
+
+        same = [len(e) == len(a) and all(str(x) == str(y) for x, y in zip(e, a))
+                for e, a in zip(expected, actual)]
+        ok = ok and all(same)
+        findings = ', '.join(str(len(a)) for a in actual)
+        print(f"{size:>9,} rows  parity {'OK' if all(same) else 'MISMATCH'}  findings [{findings}]"
+              f"  before {before:8.2f} s  after {after:7.3f} s  ({before / after:,.0f}x)")
+    return ok
+
+
+def bench_incremental_audit(args):
+    """
+    incremental_audit: running counts match a full audit when appended
+    batches start on the last validated date, a row inserted into the
+    validated prefix forces a rebuild, then append vs full audit wall time.
+    """
+    from incremental_audit import incremental_audit
+
+    size = args.sizes[-1]
+    df = synthetic_sessions_table(args.data_dir, size)
+    df = df[df['date'].astype(str).str.fullmatch(r'\d{4}-\d{2}-\d{2}')].reset_index(drop=True)
+    # Each batch starts on the date the previous one ended with
+    bounds = np.linspace(0, len(df), 6).astype(int)
+    for b in bounds[1:-1]:
+        df.loc[b, 'date'] = df.loc[b - 1, 'date']
+    print(f"{len(df):,} sessions appended in {len(bounds) - 1} batches")
+
+    tmp = Path(tempfile.mkdtemp())
+    path, state_path = tmp / 'training_sessions.csv', tmp / 'audit_state.json'
+    try:
+        for b in bounds[1:]:
+            df.iloc[:b].to_csv(path, index=False)
+            _, state, _ = incremental_audit(path, state_path)
+        full = audit_checks.audit(pd.read_csv(path))
+        mismatched = [name for name, count in state['counts'].items() if count != full.results[name].count]
+        ok = not mismatched
+        print(f"Parity: {'OK' if ok else 'MISMATCH ' + ', '.join(mismatched)}"
+              f" (duplicate_dates {state['counts']['duplicate_dates']},"
+              f" days_since_last {state['counts']['days_since_last_mismatch']})")
+
+        # A re-parse that adds a session mid-history shifts the validated rows
+        data = path.read_bytes()
+        middle = data.index(b'\n', len(data) // 2) + 1
+        row = data[middle:data.index(b'\n', middle) + 1]
+        path.write_bytes(data[:middle] + row + data[middle:])
+        _, _, rebuilt = incremental_audit(path, state_path)
+        ok = ok and rebuilt
+        print(f"Row inserted into validated rows: {'rebuilt' if rebuilt else 'NOT DETECTED'}")
+
+        # One day's worth of new sessions on top of the whole history
+        new_rows = 10
+        df.iloc[:-new_rows].to_csv(path, index=False)
+        incremental_audit(path, state_path)
+        history = path.stat().st_size
+        appended = df.iloc[-new_rows:].to_csv(index=False, header=False).encode()
+
+        def append():
+            os.truncate(path, history)
+            with open(path, 'ab') as f:
+                f.write(appended)
+            shutil.copy(backup, state_path)
+            incremental_audit(path, state_path)
+
+        backup = tmp / 'audit_state.backup.json'
+        shutil.copy(state_path, backup)
+        after = time_call(append, args.repeat)
+        before = time_call(lambda: audit_checks.audit(pd.read_csv(path)), args.repeat)
+        print(f"  full audit                 : {before:8.3f} s")
+        print(f"  append {new_rows} rows incrementally: {after:8.3f} s  ({before / after:,.0f}x)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return ok
+
+
+def synthetic_aliases(num_aliases, seed=0):
+    """num_aliases made-up equipment aliases ("<brand> <machine> <n>") -> standard names."""
+    rng = np.random.default_rng(seed)
+    brands = ['Hammer', 'Nautilus', 'Cybex', 'Prime', 'Strive', 'Panatta', 'Atlantis', 'Arsenal']
+    machines = ['chest press', 'row', 'lat pulldown', 'leg press', 'hack squat', 'pec fly', 'shoulder press']
+    mapping = {}
+    while len(mapping) < num_aliases:
+        brand, machine = rng.choice(brands), rng.choice(machines)
+        n = int(rng.integers(1, 10 ** 6))
+        mapping[f"{brand} {machine} {n}"] = f"{brand} {machine.title()} #{n}"
+    return mapping
+
+
+def bench_alias_resolution(args):
+    """
+    Exercise name standardization: the alias index agrees with the
+    EXERCISE_MAPPING lookup on every exactly-mapped name, then resolves/second
+    for the shipped mapping and for one padded with --aliases extra aliases.
+    """
+    names = [exercise_raw for _, _, exercise_raw in collect_set_inputs(args.data_dir)]
+    print(f"Collected {len(names)} exercise name lookups ({len(set(names))} distinct)")
+
+    mismatches = 0
+    index = AliasIndex(ptd.EXERCISE_MAPPING)
+    for name in set(names):
+        if name in ptd.EXERCISE_MAPPING and index.resolve(name) != ptd.EXERCISE_MAPPING[name]:
+            mismatches += 1
+            print(f"  mismatch: {name!r}")
+    print(f"Parity: {'OK' if mismatches == 0 else f'{mismatches} mismatches'}")
+
+    def run(resolve):
+        def loop():
+            for name in names:
+                resolve(name)
+        return loop
+
+    before = time_call(run(lambda name: ptd.EXERCISE_MAPPING.get(name, name)), args.repeat)
+    print(f"  dict .get()                 : {len(names) / before:>12,.0f} lookups/s")
+    for extra in [0, args.aliases]:
+        mapping = dict(ptd.EXERCISE_MAPPING)
+        mapping.update(synthetic_aliases(extra))
+        start = time.perf_counter()
+        index = AliasIndex(mapping)
+        build = time.perf_counter() - start
+        after = time_call(run(index.resolve), args.repeat)
+        print(f"  alias index, {len(mapping):>7,} aliases: {len(names) / after:>12,.0f} lookups/s "
+              f"(built in {build:.2f} s, {len(index.unmapped)} unmapped)")
+    return mismatches == 0
+
+
+def misspell(name, rng):
+    """name with one character dropped, doubled or swapped with its neighbour."""
+    i = int(rng.integers(1, max(2, len(name) - 1)))
+    kind = rng.integers(3)
+    if kind == 0:
+        return name[:i] + name[i + 1:]
+    if kind == 1:
+        return name[:i] + name[i] + name[i:]
+    return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+
+
+def bench_fuzzy_suggest(args):
+    """
+    Suggestions for misspelled aliases: how often the intended standard name
+    is ranked first / in the top 3, and per-query time against a brute-force
+    difflib scan over every alias.
+    """
+    rng = np.random.default_rng(0)
+    mapping = {alias: std for alias, std in ptd.EXERCISE_MAPPING.items() if std is not None}
+    aliases = list(mapping)
+    queries = [(misspell(alias, rng), mapping[alias]) for alias in rng.choice(aliases, 300)]
+
+    index = SuggestionIndex(mapping)
+    top1 = top3 = 0
+    for query, expected in queries:
+        ranked = [name for name, _, _ in index.suggest(query, limit=3)]
+        top1 += bool(ranked) and ranked[0] == expected
+        top3 += expected in ranked
+    print(f"{len(queries)} misspelled aliases: intended name first {top1 / len(queries):.0%}, "
+          f"in top 3 {top3 / len(queries):.0%}")
+
+    texts = [normalize_alias(alias) for alias in aliases]
+
+    def brute_force(query):
+        query = normalize_alias(query)
+        return max(texts, key=lambda text: difflib.SequenceMatcher(None, query, text).ratio())
+
+    sample = [query for query, _ in queries[:50]]
+    before = time_call(lambda: [brute_force(q) for q in sample], 1) / len(sample)
+    print(f"  difflib scan, {len(aliases):>7,} aliases: {before * 1000:8.3f} ms/query")
+    for extra in [0, args.aliases]:
+        padded = dict(mapping)
+        padded.update(synthetic_aliases(extra))
+        index = SuggestionIndex(padded)
+        after = time_call(lambda: [index.suggest(q) for q, _ in queries], args.repeat) / len(queries)
+        print(f"  n-gram index, {len(index):>6,} entries: {after * 1000:8.3f} ms/query")
+    return True
+
+
+def synthetic_transactions(data_dir, num_sessions, num_lifters=50, seed=0):
+    """
+    num_sessions exercise lists resampled from the shipped training_sessions
+    table and spread over num_lifters lifters, each of whom logs about a
+    third of the exercises under their own gym's variant name.
+    """
+    base = association_mining.load_transactions(Path(data_dir) / "training_sessions.csv")
+    rng = np.random.default_rng(seed)
+    names = sorted({item for t in base for item in t})
+    swapped = rng.random((num_lifters, len(names))) < 1 / 3
+    variants = rng.integers(0, 4, size=(num_lifters, len(names)))
+    index = {name: i for i, name in enumerate(names)}
+
+    transactions = []
+    for session, lifter in zip(rng.integers(len(base), size=num_sessions),
+                               rng.integers(num_lifters, size=num_sessions)):
+        items = []
+        for item in base[session]:
+            i = index[item]
+            items.append(f"{item} [{variants[lifter, i]}]" if swapped[lifter, i] else item)
+        transactions.append(items)
+    return transactions
+
+
+def bench_association_mining(args):
+    """
+    Frequent itemsets and rules on --sessions synthetic multi-lifter sessions:
+    the bitset miner against mlxtend's dense-matrix Apriori (mlxtend itself
+    if installed, otherwise the reference copy of its algorithm), checking
+    that itemsets, supports, confidences and lifts are identical.
+    """
+    min_support, min_confidence = 0.01, association_mining.MIN_CONFIDENCE
+    transactions = synthetic_transactions(args.data_dir, args.sessions)
+    print(f"{len(transactions):,} sessions, {len({i for t in transactions for i in t})} distinct exercises, "
+          f"min support {min_support}")
+
+    try:
+        from mlxtend.frequent_patterns import apriori, association_rules
+        from mlxtend.preprocessing import TransactionEncoder
+    except ImportError:
+        label = "dense Apriori (mlxtend's algorithm)"
+
+        def reference():
+            itemsets = legacy_dense_apriori(transactions, min_support)
+            return itemsets, legacy_association_rules(itemsets, min_confidence)
+    else:
+        label = "mlxtend apriori + association_rules"
+
+        def reference():
+            encoder = TransactionEncoder()
+            encoded = pd.DataFrame(encoder.fit_transform(transactions), columns=encoder.columns_)
+            itemsets = apriori(encoded, min_support=min_support, use_colnames=True)
+            rules = association_rules(itemsets, metric='confidence', min_threshold=min_confidence)
+            return itemsets, {(a, c): (s, conf, lift) for a, c, s, conf, lift in
+                              rules[['antecedents', 'consequents', 'support', 'confidence', 'lift']].itertuples(index=False)}
+
+    def bitsets():
+        itemsets = association_mining.apriori(transactions, min_support=min_support)
+        rules = association_mining.association_rules(itemsets, min_threshold=min_confidence)
+        return itemsets, rules
+
+    expected_itemsets, expected_rules = reference()
+    itemsets, rules = bitsets()
+    actual_rules = {(a, c): (s, conf, lift) for a, c, s, conf, lift in
+                    rules[['antecedents', 'consequents', 'support', 'confidence', 'lift']].itertuples(index=False)}
+    ok = (list(itemsets['itemsets']) == list(expected_itemsets['itemsets'])
+          and np.array_equal(itemsets['support'].to_numpy(), expected_itemsets['support'].to_numpy())
+          and actual_rules == expected_rules)
+    print(f"Parity: {'OK' if ok else 'MISMATCH'} ({len(itemsets)} itemsets, longest "
+          f"{itemsets['itemsets'].map(len).max()}, {len(rules)} rules)")
+
+    before = time_call(reference, 1)
+    after = time_call(bitsets, args.repeat)
+    print(f"  {label}: {before:8.3f} s")
+    print(f"  packed-bitset Apriori{' ' * (len(label) - 21)}: {after:8.3f} s  ({before / after:,.1f}x)")
+    return ok
+
+
+def synthetic_sets_table(transactions, sessions_per_day=1):
+    """A minimal training_sets frame (date, workout_type, exercise_standard), one row per session exercise."""
+    days = np.arange(len(transactions)) // sessions_per_day
+    dates = (pd.Timestamp('2024-01-01') + pd.to_timedelta(days, unit='D')).strftime('%Y-%m-%d')
+    lengths = [len(t) for t in transactions]
+    return pd.DataFrame({
+        'date': np.repeat(np.asarray(dates, dtype=object), lengths),
+        # Distinct workout names keep same-day sessions apart
+        'workout_type': np.repeat([f"Workout {i % sessions_per_day}" for i in range(len(transactions))], lengths),
+        'exercise_standard': [item for t in transactions for item in t],
+    })
+
+
+def bench_session_matrix(args):
+    """
+    Item and pair counts for --sessions synthetic sessions: the notebook's
+    parse_exercises / Counter / combinations passes over exercises_list
+    strings against the CSR session x exercise matrix (built from the sets,
+    and reloaded from its .npz cache).
+    """
+    transactions = synthetic_transactions(args.data_dir, args.sessions)
+    sets_df = synthetic_sets_table(transactions)
+    sessions_lists = [','.join(t) for t in transactions]
+    print(f"{len(transactions):,} sessions, {len(sets_df):,} session/exercise rows")
+
+    def notebook():
+        lists = [[ex.strip() for ex in el.split(',')] for el in sessions_lists]
+        item_counts = Counter(item for t in lists for item in t)
+        pair_counts = Counter(pair for t in lists for pair in combinations(sorted(set(t)), 2))
+        return item_counts, pair_counts
+
+    item_counts, pair_counts = notebook()
+    matrix = SessionMatrix.from_sets(sets_df)
+    pairs = matrix.pair_counts()
+    vocab = matrix.vocabulary
+    ok = (dict(zip(vocab, matrix.item_counts().tolist())) == dict(item_counts)
+          and {(vocab[a], vocab[b]): int(c) for a, b, c in zip(*pairs)} == dict(pair_counts))
+    print(f"Parity: {'OK' if ok else 'MISMATCH'} ({matrix.shape[1]} exercises, {len(pair_counts):,} pairs)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = Path(tmp) / 'sets.matrix.npz'
+        matrix.save(cache)
+        before = time_call(notebook, 1)
+        build = time_call(lambda: SessionMatrix.from_sets(sets_df), args.repeat)
+        load = time_call(lambda: SessionMatrix.load(cache), args.repeat)
+        count = time_call(lambda: (matrix.item_counts(), matrix.pair_counts()), args.repeat)
+    print(f"  strings + Counter + combinations: {before:8.3f} s")
+    print(f"  CSR build from sets             : {build:8.3f} s")
+    print(f"  CSR load from .npz cache        : {load:8.3f} s")
+    print(f"  item + pair counts on CSR       : {count:8.3f} s  ({before / (load + count):,.1f}x with cache)")
+    return ok
+
+
+def bench_rolling_rules(args):
+    """
+    Rule timeline over a 12-week window moved weekly across --sessions
+    synthetic sessions (50 a day, several years): filtering the sessions and
+    recounting every window from scratch, as the notebook compares periods,
+    against the rolling co-occurrence counts.
+    """
+    transactions = synthetic_transactions(args.data_dir, args.sessions)
+    matrix = SessionMatrix.from_sets(synthetic_sets_table(transactions, sessions_per_day=50))
+    top = matrix.pair_rules(min_support=0.01).sort_values('lift', ascending=False, kind='stable').head(5)
+    rules = [(next(iter(a)), next(iter(c))) for a, c in zip(top['antecedents'], top['consequents'])]
+    print(f"{len(matrix):,} sessions over {len(set(matrix.dates)):,} days, following {len(rules)} rules")
+
+    dates = matrix.dates.astype('datetime64[D]')
+    lists = matrix.transactions()
+
+    def recount():
+        records = []
+        for end in rolling_rules.window_ends(dates):
+            start = end - np.timedelta64(7 * rolling_rules.DEFAULT_WINDOW_WEEKS, 'D')
+            window = [lists[r] for r in np.flatnonzero((dates > start) & (dates <= end))]
+            n = len(window)
+            item_counts = Counter(item for t in window for item in t)
+            pair_counts = Counter(pair for t in window for pair in combinations(sorted(set(t)), 2))
+            for a, c in rules:
+                both = pair_counts[tuple(sorted((a, c)))]
+                confidence = both / item_counts[a] if item_counts[a] else np.nan
+                lift = confidence / (item_counts[c] / n) if n and item_counts[c] else np.nan
+                records.append((both / n if n else np.nan, confidence, lift))
+        return np.array(records, dtype=float)
+
+    def rolling():
+        return rolling_rules.rule_timeline(matrix, rules)
+
+    expected = recount()
+    timeline = rolling()
+    actual = timeline[['support', 'confidence', 'lift']].to_numpy()
+    ok = np.allclose(actual, expected, equal_nan=True, rtol=1e-12, atol=0)
+    print(f"Parity: {'OK' if ok else 'MISMATCH'} ({timeline['window_end'].nunique()} window positions)")
+
+    before = time_call(recount, 1)
+    after = time_call(rolling, args.repeat)
+    print(f"  recount every window: {before:8.3f} s")
+    print(f"  rolling counts      : {after:8.3f} s  ({before / after:,.1f}x)")
+    return ok
+
+
+def bench_athlete_shards(args):
+    """
+    Multi-athlete parse + partitioned write: --athletes layouts of copies of
+    the shipped logs (one folder per athlete), parsed without the file cache.
+    Time per athlete should stay flat as the number of athletes grows.
+    """
+    logs = sorted(Path(args.data_dir).glob("*.txt"))
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.athletes:
+            data_dir, output_dir = Path(tmp) / f"logs{count}", Path(tmp) / f"out{count}"
+            for i in range(count):
+                athlete_dir = data_dir / f"athlete{i:04d}"
+                athlete_dir.mkdir(parents=True)
+                for log in logs:
+                    shutil.copy(log, athlete_dir / log.name)
+
+            def run():
+                athletes = ptd.discover_athletes(data_dir)
+                parsed = ptd.parse_athletes(athletes, data_dir)
+                for athlete_id, (sessions, _, _, _) in parsed.items():
+                    ptd.write_athlete_tables(athlete_id, sessions, output_dir, ['csv'])
+
+            elapsed = time_call(run, args.repeat)
+            written = sorted(output_dir.glob("training_sessions/athlete_id=*"))
+            ok = ok and len(written) == count
+            print(f"  {count:>4} athletes: {elapsed:7.2f} s  ({elapsed / count * 1000:7.1f} ms per athlete, "
+                  f"{len(written)} athlete partitions)")
+    return ok
+
+
+def bench_phases(args):
+    """
+    Phase segmentation on --rows synthetic sessions: feature build, one
+    mini-batch fit against full-batch Lloyd (inertia within 5%), and the
+    k sweep run serially and in a process pool (identical results). The
+    sweep speedup is measured, not assumed: it is bounded by the cores this
+    process may use, so on one core the pool only adds its start-up cost.
+    """
+    df = synthetic_sessions_table(args.data_dir, args.rows)
+    start = time.perf_counter()
+    features = phases.session_features(df)
+    print(f"{len(df):,} sessions -> {features.X.shape[1]} features "
+          f"({features.X.nbytes / 2 ** 20:,.0f} MB) in {time.perf_counter() - start:.2f} s")
+    shuffled = df.sample(frac=1, random_state=0)
+    rolling_ok = all(
+        np.allclose(phases.rolling_volume(shuffled, window), reference_rolling_volume(shuffled, window),
+                     equal_nan=True)
+        for window in phases.ROLLING_WINDOWS)
+    print(f"Parity: {'OK' if rolling_ok else 'MISMATCH'} (rolling volume vs daily rolling window, shuffled rows)")
+
+    k = 6
+    lloyd_start = time.perf_counter()
+    _, lloyd_inertia = legacy_lloyd_kmeans(features.X, k)
+    lloyd = time.perf_counter() - lloyd_start
+    model = phases.MiniBatchKMeans(k)
+    fit = time_call(lambda: model.fit(features.X), args.repeat)
+    ratio = model.inertia_ / lloyd_inertia
+    ok = rolling_ok and ratio <= 1.05
+    print(f"Parity: {'OK' if ok else 'MISMATCH'} (mini-batch / Lloyd inertia {ratio:.4f})")
+    print(f"  full-batch Lloyd (k={k}) : {lloyd:8.3f} s")
+    print(f"  mini-batch K-Means (k={k}): {fit:8.3f} s  ({lloyd / fit:,.1f}x, {model.n_iter_} batches)")
+
+    ks = list(range(2, 10))
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    workers = max(2, min(len(ks), cores))
+    start = time.perf_counter()
+    serial = phases.k_sweep(features.X, ks)
+    serial_time = time.perf_counter() - start
+    start = time.perf_counter()
+    parallel = phases.k_sweep(features.X, ks, workers=workers)
+    parallel_time = time.perf_counter() - start
+    same = np.allclose(serial[['inertia', 'silhouette']].to_numpy(), parallel[['inertia', 'silhouette']].to_numpy())
+    ok = ok and same
+    print(f"Parity: {'OK' if same else 'MISMATCH'} (k sweep {ks[0]}-{ks[-1]}, serial vs {workers} workers)")
+    print(f"  k sweep, 1 process  : {serial_time:8.3f} s")
+    print(f"  k sweep, {workers:>2} workers : {parallel_time:8.3f} s  "
+          f"(measured speedup {serial_time / parallel_time:,.2f}x on {cores} usable core{'s' if cores != 1 else ''})")
+    return ok
+
+
+def bench_anomaly(args):
+    """
+    Anomaly stage on ~--rows synthetic sets: groupby-rolling z-scores against
+    the per-set windows used for incremental scoring, the level-wise forest
+    walk against a per-row walk, and scoring the last week of sessions with
+    the saved model against refitting on everything.
+    """
+    sets_df = ptd.build_training_sets_df(synthetic_sessions(args.data_dir, args.rows))
+    print(f"{len(sets_df):,} sets")
+
+    vectorized = anomaly.rolling_zscores(sets_df)
+    start = time.perf_counter()
+    per_set = anomaly.ExerciseWindows().zscores(sets_df)
+    windows_time = time.perf_counter() - start
+    ok = np.allclose(vectorized.to_numpy(), per_set.to_numpy(), equal_nan=True)
+    print(f"Parity: {'OK' if ok else 'MISMATCH'} (rolling z-scores)")
+    rolling_time = time_call(lambda: anomaly.rolling_zscores(sets_df), args.repeat)
+    print(f"  per-set windows     : {windows_time:8.3f} s")
+    print(f"  groupby-rolling     : {rolling_time:8.3f} s  ({windows_time / rolling_time:,.1f}x)")
+
+    model, sessions = anomaly.AnomalyModel.fit(sets_df)
+    X = anomaly.feature_matrix(sessions, model.fill_values)
+    sample = X[:2000]
+    start = time.perf_counter()
+    expected = legacy_isolation_score(model.forest, sample)
+    per_row = (time.perf_counter() - start) / len(sample)
+    same = np.allclose(model.forest.score(sample), expected)
+    ok = ok and same
+    level_wise = time_call(lambda: anomaly.score_sessions(model.forest, X), args.repeat) / len(X)
+    print(f"Parity: {'OK' if same else 'MISMATCH'} (forest scores, {len(sample):,} sessions)")
+    print(f"  per-row tree walk   : {per_row * 1e6:8.1f} us/session")
+    print(f"  level-wise walk     : {level_wise * 1e6:8.1f} us/session  ({per_row / level_wise:,.0f}x)")
+
+    dates = pd.to_datetime(sets_df['date'])
+    cut = dates.max() - pd.Timedelta(days=7)
+    old, new = sets_df[dates <= cut], sets_df[dates > cut]
+    refit = time_call(lambda: anomaly.AnomalyModel.fit(sets_df), 1)
+    model, _ = anomaly.AnomalyModel.fit(old)
+    incremental = time_call(lambda: model.score_new_sets(new, update=False), args.repeat)
+    print(f"  refit on all sets   : {refit:8.3f} s")
+    print(f"  score last week     : {incremental:8.3f} s  ({len(new):,} new sets, {refit / incremental:,.0f}x)")
+    return ok
+
+
+def bench_progression(args):
+    """
+    PR lookups on ~--rows synthetic sets: the PR index against a scan and
+    groupby of the whole sets table per question, and folding in the last
+    week of sets against rebuilding the index.
+    """
+    sets_df = ptd.build_training_sets_df(synthetic_sessions(args.data_dir, args.rows))
+    print(f"{len(sets_df):,} sets")
+
+    start = time.perf_counter()
+    index = progression.PRIndex.from_sets(sets_df)
+    build = time.perf_counter() - start
+    expected = legacy_pr_history(sets_df)
+    actual = sorted((exercise, date, e1rm) for (_, exercise), history in index.records.items()
+                    for date, e1rm in zip(history['date'], history['e1rm']))
+    ok = expected == actual
+    print(f"Parity: {'OK' if ok else 'MISMATCH'} ({len(actual):,} PR entries over {len(index)} exercises)")
+
+    exercises = index.exercises()
+    rng = np.random.default_rng(0)
+    queries = [exercises[i] for i in rng.integers(0, len(exercises), 10_000)]
+    scans = queries[:20]
+    same = all(legacy_current_pr(sets_df, ex) == index.current(ex).e1rm for ex in scans)
+    ok = ok and same
+    print(f"Parity: {'OK' if same else 'MISMATCH'} (current PR of {len(scans)} exercises)")
+    scan = time_call(lambda: [legacy_current_pr(sets_df, ex) for ex in scans], 1) / len(scans)
+    lookup = time_call(lambda: [index.current(ex) for ex in queries], args.repeat) / len(queries)
+    as_of = time_call(lambda: [index.as_of(ex, '2025-06-01') for ex in queries], args.repeat) / len(queries)
+    history = time_call(lambda: legacy_pr_history(sets_df), 1)
+    print(f"  build index            : {build:8.3f} s")
+    print(f"  current PR, table scan : {scan * 1e3:8.3f} ms")
+    print(f"  current PR, index      : {lookup * 1e6:8.3f} us  ({scan / lookup:,.0f}x)")
+    print(f"  PR as of a date, index : {as_of * 1e6:8.3f} us")
+    print(f"  all PR histories, scan : {history:8.3f} s")
+
+    dates = pd.to_datetime(sets_df['date'])
+    cut = dates.max() - pd.Timedelta(days=7)
+    old, new = sets_df[dates <= cut], sets_df[dates > cut]
+    incremental = progression.PRIndex.from_sets(old)
+    update = time_call(lambda: incremental.update(new), args.repeat)
+    same = incremental.to_dict() == index.to_dict()
+    ok = ok and same
+    print(f"Parity: {'OK' if same else 'MISMATCH'} (index updated with the last week)")
+    print(f"  rebuild from all sets  : {build:8.3f} s")
+    print(f"  update with last week  : {update:8.3f} s  ({len(new):,} new sets, {build / update:,.0f}x)")
+
+    # Same-day sets split across chunks in any order still give one entry per day
+    shuffled = sets_df.sample(frac=1, random_state=0)
+    chunked = progression.PRIndex()
+    for start in range(0, len(shuffled), 700):
+        chunked.update(shuffled.iloc[start:start + 700])
+    same = chunked.records == index.records
+    ok = ok and same
+    print(f"Parity: {'OK' if same else 'MISMATCH'} (shuffled sets folded in 700-set chunks)")
+
+    # A re-parse that moves estimated dates replaces the stale entries
+    moved = sets_df.assign(date=(dates + pd.Timedelta(days=1)).dt.strftime('%Y-%m-%d'))
+    reparsed = progression.PRIndex.from_sets(sets_df)
+    reparsed.replace(moved)
+    same = reparsed.to_dict() == progression.PRIndex.from_sets(moved).to_dict()
+    ok = ok and same
+    print(f"Parity: {'OK' if same else 'MISMATCH'} (re-parse with shifted dates replaces the history)")
+    return ok
+
+
+def bench_workload(args):
+    """
+    Daily acute / chronic load on ~--rows synthetic sets (decades of daily
+    history): the cumulative-sum and blocked-EWMA kernels against a
+    per-day filter and groupby (on the first year, where it is tractable),
+    then adding the last week of sessions to a saved tracker against
+    recomputing every series.
+    """
+    sets_df = ptd.build_training_sets_df(synthetic_sessions(args.data_dir, args.rows))
+    dates = pd.to_datetime(sets_df['date'])
+    first_year = sets_df[dates < dates.min() + pd.Timedelta(days=365)]
+    print(f"{len(sets_df):,} sets over {dates.dt.normalize().nunique():,} training days")
+
+    expected = legacy_workload(first_year)
+    timeline = workload.workload_timeline(first_year)
+    actual = {(row.muscle_group, row.date): (row.acute, row.chronic, row.ewma_acute, row.ewma_chronic)
+              for row in timeline.itertuples(index=False)}
+    ok = expected.keys() == actual.keys() and np.allclose(
+        [expected[key] for key in expected], [actual[key] for key in expected])
+    print(f"Parity: {'OK' if ok else 'MISMATCH'} ({len(actual):,} group-days, first year)")
+    before = time_call(lambda: legacy_workload(first_year), 1)
+    after = time_call(lambda: workload.workload_timeline(first_year), args.repeat)
+    full = time_call(lambda: workload.workload_timeline(sets_df), args.repeat)
+    print(f"  per-day groupby, 1 year : {before:8.3f} s")
+    print(f"  O(n) kernels, 1 year    : {after:8.3f} s  ({before / after:,.0f}x)")
+    print(f"  O(n) kernels, all sets  : {full:8.3f} s  ({len(workload.workload_timeline(sets_df)):,} group-days)")
+
+    cut = dates.max() - pd.Timedelta(days=7)
+    old, new = sets_df[dates <= cut], sets_df[dates > cut]
+    state = workload.WorkloadTracker.from_timeline(workload.workload_timeline(old)).to_dict()
+    tracker = workload.WorkloadTracker.from_dict(copy.deepcopy(state))
+    tracker.add_sets(new)
+    columns = ['acute', 'chronic', 'acwr', 'ewma_acute', 'ewma_chronic', 'ewma_acwr']
+    timeline = workload.workload_timeline(sets_df)
+    last = timeline[timeline['date'] == timeline['date'].max()].set_index('muscle_group')[columns]
+    snapshot = tracker.snapshot().set_index('muscle_group').loc[last.index, columns]
+    same = np.allclose(snapshot.to_numpy(dtype=float), last.to_numpy(dtype=float), equal_nan=True)
+    ok = ok and same
+    print(f"Parity: {'OK' if same else 'MISMATCH'} (tracker after the last week vs full recompute)")
+    incremental = time_call(lambda: workload.WorkloadTracker.from_dict(copy.deepcopy(state)).add_sets(new), args.repeat)
+    print(f"  recompute all series    : {full:8.3f} s")
+    print(f"  add last week to tracker: {incremental:8.3f} s  ({len(new):,} new sets, {full / incremental:,.0f}x)")
+    return ok
+
+
+BENCHMARKS = {
+    'set-parsing': bench_set_parsing,
+    'header-matching': bench_header_matching,
+    'sets-builder': bench_sets_builder,
+    'sessions-builder': bench_sessions_builder,
+    'audit-checks': bench_audit_checks,
+    'incremental-audit': bench_incremental_audit,
+    'alias-resolution': bench_alias_resolution,
+    'fuzzy-suggest': bench_fuzzy_suggest,
+    'association-mining': bench_association_mining,
+    'session-matrix': bench_session_matrix,
+    'rolling-rules': bench_rolling_rules,
+    'athlete-shards': bench_athlete_shards,
+    'phases': bench_phases,
+    'anomaly': bench_anomaly,
+    'progression': bench_progression,
+    'workload': bench_workload,
+}
+
+
+def main(argv=None):
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmarks for the training data parser.")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR,
+                        help=f"Folder with the monthly .txt logs (default: {DEFAULT_DATA_DIR})")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best of N)")
+    parser.add_argument("--rows", type=int, default=1_000_000,
+                        help="Synthetic rows for the dataframe benchmarks (default: 1,000,000)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Table sizes for the audit benchmark (default: 10k 100k 1M)")
+    parser.add_argument("--aliases", type=int, default=10_000,
+                        help="Extra synthetic aliases for the alias benchmark (default: 10,000)")
+    parser.add_argument("--sessions", type=int, default=100_000,
+                        help="Synthetic sessions for the mining benchmarks (default: 100,000)")
+    parser.add_argument("--athletes", type=int, nargs="+", default=[1, 4, 16],
+                        help="Athlete counts for the shard benchmark (default: 1 4 16)")
+    args = parser.parse_args(argv)
+
+    ok = BENCHMARKS[args.benchmark](args)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""
+Chunked Training Sessions Audit
+The full audit in one pass over a table that does not fit in memory.
+
+audit_chunked() reads the table with training_io.iter_table_chunks()
+(read_csv(chunksize=...) for CSV, Arrow record batches for Parquet/Feather)
+and runs the row-level checks per chunk. The index carries whole-file row
+numbers, so findings match the in-memory audit. Checks that span chunks
+carry state between them:
+
+  * duplicate dates: a date -> (count, first row) table, one entry per
+    distinct date, plus the row numbers of the dates seen more than once
+  * days_since_last: the last valid date seen. A file in date order (as the
+    parser writes it) is checked in the same pass. Once a date goes backwards,
+    the pass falls back to an external sort: a second read writes sorted runs of
+    (day, row, days_since_last, date) to temporary .npy files and merges them
+  * CHECK 11-13: streaming_stats.ColumnSummary (exact up to exact_limit
+    values per column, KLL sketch beyond)
+  * dtypes, missing counts, value counts, date range: merged per chunk
+
+Rows with the same date are taken in file order, as the in-memory audit's
+stable sort takes them, so the days_since_last findings are identical on
+tables with duplicate dates too.
+
+Peak memory is one chunk plus those carried tables and the offending rows,
+so it is set by chunksize (and exact_limit). The result is the same
+(AuditReport, table profile) pair that audit() and table_profile() give
+for the in-memory frame.
+"""
+
+import heapq
+import math
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from audit_checks import (CHECKS, DISTRIBUTION_COLUMNS, LISTED_CHECKS, ZERO_COLUMNS,
+                          AuditReport, CheckResult, audit, normalize_sessions)
+from streaming_stats import DEFAULT_K, EXACT_LIMIT, ColumnSummary
+from training_io import iter_table_chunks
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Rows per block when merging the external-sort runs
+MERGE_BLOCK = 65_536
+
+# Stands in for a missing date in the duplicate-date table
+MISSING_DATE = object()
+
+# Checks whose per-chunk results are simply concatenated
+ROW_CHECKS = [name for name in CHECKS if name not in ('duplicate_dates', 'days_since_last_mismatch')]
+
+_DAY = np.timedelta64(1, 'D')
+
+
+# ============================================================================
+# CROSS-CHUNK STATE
+# ============================================================================
+
+def combine_dtypes(dtypes):
+    """
+    dtype read_csv would infer for the whole column from the per-chunk dtypes:
+    ints and floats widen to float64, text anywhere makes the column text,
+    anything else mixed becomes object.
+    """
+    unique = set(dtypes)
+    if len(unique) == 1:
+        return unique.pop()
+    if all(d in ('int64', 'float64') for d in unique):
+        return 'float64'
+    for text in ('str', 'string'):
+        if text in unique:
+            return text
+    return 'object'
+
+
+class DuplicateDates:
+    """CHECK 5 across chunks: count and row numbers per raw date value."""
+
+    def __init__(self):
+        self.first_row = {}
+        self.counts = {}
+        self.extra_rows = {}
+
+    def update(self, chunk):
+        codes, uniques = pd.factorize(chunk['date'], use_na_sentinel=False)
+        labels = chunk.index.to_numpy()
+        _, first_pos, counts = np.unique(codes, return_index=True, return_counts=True)
+        for code, (date, pos, count) in enumerate(zip(uniques, first_pos, counts)):
+            key = MISSING_DATE if pd.isna(date) else date
+            seen = self.counts.get(key, 0)
+            self.counts[key] = seen + int(count)
+            if not seen:
+                self.first_row[key] = labels[pos]
+            if seen or count > 1:
+                rows = labels[codes == code]
+                self.extra_rows.setdefault(key, []).extend((rows if seen else rows[1:]).tolist())
+
+    def result(self):
+        rows = []
+        for key, extra in self.extra_rows.items():
+            rows.append(self.first_row[key])
+            rows.extend(extra)
+        dates = {str(k): self.counts[k] for k in sorted((k for k in self.extra_rows if k is not MISSING_DATE), key=str)}
+        return np.sort(np.array(rows, dtype=np.int64)), {'dates': dates}
+
+
+class DaysSinceLast:
+    """
+    CHECK 6 across chunks. Checks in the same pass while dates are in
+    order; records that an external sort is needed as soon as they are not.
+    """
+
+    def __init__(self):
+        self.last_day = None
+        self.in_order = True
+        self.rows = []
+        self.findings = []
+        self.first = None           # (date, days_since_last) of the earliest-dated row
+        self.file_first = None      # fallback when no date parses
+
+    def update(self, chunk, dp):
+        if self.file_first is None and len(chunk):
+            self.file_first = {'date': chunk['date'].iat[0], 'days_since_last': chunk['days_since_last'].iat[0]}
+        if not self.in_order:
+            return
+        valid = dp.notna().to_numpy()
+        if not valid.any():
+            return
+        days = (dp[valid].to_numpy() - np.datetime64('1970-01-01')) // _DAY
+        if np.any(np.diff(days) < 0) or (self.last_day is not None and days[0] < self.last_day):
+            self.in_order = False
+            return
+
+        sub = chunk[valid]
+        if self.first is None:
+            self.first = {'date': sub['date'].iat[0], 'days_since_last': sub['days_since_last'].iat[0]}
+        previous = np.concatenate([[self.last_day if self.last_day is not None else -1], days[:-1]])
+        has_previous = np.ones(len(days), dtype=bool)
+        if self.last_day is None:
+            has_previous[0] = False
+        expected = days - previous
+        reported = pd.to_numeric(sub['days_since_last'], errors='coerce').to_numpy(dtype=float)
+        positions = np.flatnonzero(has_previous & ~np.isnan(reported))
+        positions = positions[np.trunc(reported[positions]) != expected[positions]]
+        self.rows.extend(sub.index[positions].tolist())
+        self.findings.extend(
+            (sub['date'].iat[pos], int(reported[pos]), int(expected[pos])) for pos in positions
+        )
+        self.last_day = days[-1]
+
+    def result(self):
+        details = {'findings': self.findings}
+        first = self.first if self.first is not None else self.file_first
+        if first is not None:
+            details['first'] = first
+        return np.array(self.rows, dtype=np.int64), details
+
+
+RUN_FIELDS = ('day', 'row', 'dsl', 'date', 'dsl_raw')
+
+
+def _write_sorted_runs(path, chunksize, run_dir):
+    """External-sort pass 1: one (day, row)-sorted run of .npy files per chunk of valid dates."""
+    runs = []
+    for chunk in iter_table_chunks(path, chunksize, columns=['date', 'days_since_last']):
+        chunk = normalize_sessions(chunk)
+        dp = pd.to_datetime(chunk['date'], errors='coerce')
+        valid = dp.notna().to_numpy()
+        if not valid.any():
+            continue
+        days = (dp[valid].to_numpy() - np.datetime64('1970-01-01')) // _DAY
+        rows = chunk.index.to_numpy()[valid].astype(np.int64)
+        order = np.lexsort((rows, days))
+        fields = {
+            'day': days[order].astype(np.int64),
+            'row': rows[order],
+            'dsl': pd.to_numeric(chunk['days_since_last'], errors='coerce').to_numpy(dtype=float)[valid][order],
+            'date': chunk['date'].to_numpy(dtype=object)[valid][order].astype(str),
+            'dsl_raw': _saveable(chunk['days_since_last'].to_numpy()[valid][order]),
+        }
+        run = Path(run_dir) / f"run{len(runs):06d}"
+        for name, values in fields.items():
+            np.save(f"{run}.{name}.npy", values)
+        runs.append(run)
+    return runs
+
+
+def _saveable(values):
+    """Numeric arrays as they are, anything else as fixed-width strings (no pickling)."""
+    return values if values.dtype.kind in 'biuf' else values.astype(str)
+
+
+def _iter_run(run):
+    """Stream (day, row, dsl, date, dsl_raw) tuples from one memory-mapped run, a block at a time."""
+    fields = [np.load(f"{run}.{name}.npy", mmap_mode='r') for name in RUN_FIELDS]
+    for start in range(0, len(fields[0]), MERGE_BLOCK):
+        yield from zip(*(f[start:start + MERGE_BLOCK].tolist() for f in fields))
+
+
+def days_since_last_external(path, chunksize, file_first=None):
+    """CHECK 6 for a file not in date order: external merge sort on (day, row)."""
+    state = DaysSinceLast()
+    state.file_first = file_first
+    with tempfile.TemporaryDirectory(prefix='audit_sort_') as run_dir:
+        runs = _write_sorted_runs(path, chunksize, run_dir)
+        last_day = None
+        for day, row, dsl, date, dsl_raw in heapq.merge(*(_iter_run(r) for r in runs)):
+            if state.first is None:
+                state.first = {'date': date, 'days_since_last': dsl_raw}
+            if last_day is not None and not math.isnan(dsl) and int(dsl) != day - last_day:
+                state.rows.append(row)
+                state.findings.append((date, int(dsl), int(day - last_day)))
+            last_day = day
+    return state.result()
+
+
+# ============================================================================
+# CHUNKED AUDIT
+# ============================================================================
+
+def _merge_value_counts(totals, series):
+    """Accumulate counts keyed by str(value), in order of first appearance."""
+    for value in series.unique():
+        key = str(value)
+        if key not in totals:
+            totals[key] = [value, 0]
+    counts = series.value_counts()
+    for value, count in counts.items():
+        totals[str(value)][1] += int(count)
+
+
+def _finish_value_counts(totals, name):
+    """Sorted like Series.value_counts(): by count, descending, ties in order of first appearance."""
+    counts = pd.Series([c for _, c in totals.values()],
+                       index=pd.Index([v for v, _ in totals.values()], dtype=object), name='count')
+    counts.index.name = name
+    return counts.sort_values(ascending=False, kind='stable')
+
+
+def audit_chunked(path, chunksize=DEFAULT_CHUNKSIZE, k=DEFAULT_K, exact_limit=EXACT_LIMIT):
+    """
+    Full audit of a training_sessions table, chunksize rows at a time.
+    Returns (AuditReport, table profile) like audit() + table_profile().
+    """
+    start = time.perf_counter()
+    results = {name: [] for name in ROW_CHECKS}
+    seconds = dict.fromkeys(CHECKS, 0.0)
+    details = {name: {} for name in ROW_CHECKS}
+    missing = {}
+    duplicates = DuplicateDates()
+    gaps = DaysSinceLast()
+
+    num_rows = 0
+    columns = None
+    dtypes = {}
+    date_min = date_max = None
+    listed = {name: [] for name in LISTED_CHECKS}
+    zero_rows = {col: [] for col in ZERO_COLUMNS}
+    value_counts = {'is_synthetic': {}, 'workout_type': {}}
+    summaries = {col: ColumnSummary(k=k, exact_limit=exact_limit) for col in DISTRIBUTION_COLUMNS}
+
+    for chunk in iter_table_chunks(path, chunksize):
+        chunk = normalize_sessions(chunk)
+        if columns is None:
+            columns = chunk.columns.tolist()
+        num_rows += len(chunk)
+        for c in columns:
+            dtypes.setdefault(c, []).append(str(chunk[c].dtype))
+
+        dp = pd.to_datetime(chunk['date'], errors='coerce')
+        valid = dp.dropna()
+        if len(valid):
+            date_min = valid.min() if date_min is None else min(date_min, valid.min())
+            date_max = valid.max() if date_max is None else max(date_max, valid.max())
+
+        # Row-level checks run per chunk; their findings just concatenate
+        report = audit(chunk, checks=ROW_CHECKS, parsed_dates=dp)
+        for name, result in report.results.items():
+            results[name].append(result.rows)
+            seconds[name] += result.seconds
+            for key, value in result.details.items():
+                if key == 'findings':
+                    details[name].setdefault('findings', []).extend(value)
+                elif key == 'per_column':
+                    for c, v in value.items():
+                        missing[c] = missing.get(c, 0) + v
+                else:
+                    details[name][key] = value
+            if name in listed and len(result.rows):
+                listed[name].append(chunk.loc[result.rows])
+
+        t0 = time.perf_counter()
+        duplicates.update(chunk)
+        seconds['duplicate_dates'] += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        gaps.update(chunk, dp)
+        seconds['days_since_last_mismatch'] += time.perf_counter() - t0
+
+        for col in ZERO_COLUMNS:
+            zeros = chunk[chunk[col] == 0]
+            if len(zeros):
+                zero_rows[col].append(zeros)
+        for col, totals in value_counts.items():
+            _merge_value_counts(totals, chunk[col])
+        for col in DISTRIBUTION_COLUMNS:
+            summaries[col].update(chunk[col])
+
+    # Assemble results in suite order
+    dtypes = {c: combine_dtypes(d) for c, d in dtypes.items()}
+    details['missing_values'] = {'per_column': {c: missing.get(c, 0) for c in columns}}
+    final = {}
+    for name, (label, _, _) in CHECKS.items():
+        if name == 'duplicate_dates':
+            t0 = time.perf_counter()
+            rows, info = duplicates.result()
+            seconds[name] += time.perf_counter() - t0
+        elif name == 'days_since_last_mismatch':
+            t0 = time.perf_counter()
+            rows, info = (gaps.result() if gaps.in_order
+                          else days_since_last_external(path, chunksize, gaps.file_first))
+            seconds[name] += time.perf_counter() - t0
+        else:
+            rows = np.concatenate(results[name]) if results[name] else np.empty(0, dtype=np.int64)
+            info = details[name]
+        count = sum(info['per_column'].values()) if name == 'missing_values' else len(rows)
+        final[name] = CheckResult(name, label, int(count), rows, seconds[name], info)
+    report = AuditReport(num_rows, final, time.perf_counter() - start)
+
+    def frame(parts):
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        # Numbers widened across chunks print as they would in memory
+        return pd.concat(parts).astype({c: 'float64' for c in columns if dtypes[c] == 'float64'})
+
+    profile = {
+        'num_rows': num_rows,
+        'columns': columns,
+        'dtypes': dtypes,
+        'date_min': date_min,
+        'date_max': date_max,
+        'rows': {name: frame(parts) for name, parts in listed.items()},
+        'zero_rows': {col: frame(parts) for col, parts in zero_rows.items()},
+        'synthetic_values': sorted(value_counts['is_synthetic']),
+        'value_counts': {col: _finish_value_counts(totals, col) for col, totals in value_counts.items()},
+        'summaries': summaries,
+    }
+    return report, profile
@@ -0,0 +1,144 @@
+"""
+Exercise Alias Index
+Compiled lookup from raw exercise names in the logs to standardized names.
+
+AliasIndex is built once from an alias -> standard mapping (EXERCISE_MAPPING)
+and resolves a raw name in three steps:
+
+  1. exact: the raw name is a key of the mapping
+  2. normalized: same key after case folding and whitespace collapsing
+     ("leg  Extensions" -> "leg extensions")
+  3. token prefix: every token of the raw name is a prefix (at least
+     MIN_PREFIX_LEN characters, or the whole token) of the matching token of
+     an alias with the same number of tokens ("Strive Leg ext" ->
+     "strive leg extensions"). Aliases are stored in a token trie whose
+     children are kept sorted, so each step is a bisect. The match is only
+     used when every candidate alias agrees on the standard name.
+
+Results are memoized per raw name, so each distinct name is resolved once
+no matter how many sets use it, and the names that did not resolve are kept
+in a set (unmapped) that is checked in O(1). Aliases mapped to None mark
+entries to skip; they only match exactly or normalized, never by prefix.
+"""
+
+from bisect import bisect_left
+
+# Shortest raw token that may match a longer alias token by prefix
+MIN_PREFIX_LEN = 3
+
+# Memo marker for names that resolved to nothing
+_UNMAPPED = object()
+
+
+def normalize_alias(name):
+    """Case-folded name with runs of whitespace collapsed to single spaces."""
+    return ' '.join(str(name).casefold().split())
+
+
+class _TrieNode:
+    __slots__ = ('children', 'keys', 'standards')
+
+    def __init__(self):
+        self.children = {}
+        self.keys = None        # sorted child tokens, rebuilt lazily after inserts
+        self.standards = set()  # standards of aliases ending at this node
+
+
+class AliasIndex:
+    """Alias -> standard name resolver with normalization, token-prefix matching and memoization."""
+
+    def __init__(self, mapping=None):
+        self.exact = {}
+        self.normalized = {}
+        self.root = _TrieNode()
+        self._memo = {}
+        self.unmapped = set()
+        if mapping:
+            self.update(mapping)
+
+    def __len__(self):
+        return len(self.exact)
+
+    def add(self, alias, standard):
+        """Register one alias (standard=None marks a name to skip)."""
+        self.exact[alias] = standard
+        key = normalize_alias(alias)
+        self.normalized[key] = standard
+        if standard is not None:
+            node = self.root
+            for token in key.split():
+                child = node.children.get(token)
+                if child is None:
+                    child = node.children[token] = _TrieNode()
+                    node.keys = None
+                node = child
+            node.standards.add(standard)
+        self._memo.clear()
+        self.unmapped.clear()
+
+    def update(self, mapping):
+        """Register every alias in an alias -> standard mapping."""
+        for alias, standard in mapping.items():
+            self.add(alias, standard)
+
+    def _prefix_matches(self, tokens):
+        """Standards of aliases whose tokens each start with the matching raw token."""
+        nodes = [self.root]
+        for token in tokens:
+            exact_only = len(token) < MIN_PREFIX_LEN or token[0].isdigit()
+            next_nodes = []
+            for node in nodes:
+                if exact_only:
+                    child = node.children.get(token)
+                    if child is not None:
+                        next_nodes.append(child)
+                    continue
+                if node.keys is None:
+                    node.keys = sorted(node.children)
+                i = bisect_left(node.keys, token)
+                while i < len(node.keys) and node.keys[i].startswith(token):
+                    next_nodes.append(node.children[node.keys[i]])
+                    i += 1
+            if not next_nodes:
+                return set()
+            nodes = next_nodes
+        standards = set()
+        for node in nodes:
+            standards |= node.standards
+        return standards
+
+    def _resolve(self, raw):
+        if raw in self.exact:
+            return self.exact[raw]
+        key = normalize_alias(raw)
+        if key in self.normalized:
+            return self.normalized[key]
+        if key:
+            standards = self._prefix_matches(key.split())
+            if len(standards) == 1:
+                return standards.pop()
+        return _UNMAPPED
+
+    def lookup(self, raw):
+        """Standard name for raw, or None if it is unmapped or marked to skip."""
+        result = self._memo.get(raw)
+        if result is None and raw not in self._memo:
+            result = self._memo[raw] = self._resolve(raw)
+            if result is _UNMAPPED:
+                self.unmapped.add(raw)
+        return None if result is _UNMAPPED else result
+
+    def resolve(self, raw):
+        """
+        Standard name for raw; raw itself if unmapped (like
+        EXERCISE_MAPPING.get(raw, raw)); None if the alias marks it to skip.
+        """
+        result = self.lookup(raw)
+        if result is None and raw in self.unmapped:
+            return raw
+        return result
+
+    def is_unmapped(self, raw):
+        """True if raw resolves to no alias (O(1) once raw has been seen)."""
+        self.lookup(raw)
+        return raw in self.unmapped
@@ -0,0 +1,147 @@
+"""
+Fuzzy Exercise Name Matching
+Ranked suggestions for exercise names the alias index cannot resolve.
+
+SuggestionIndex holds the standardized names from EXERCISE_MAPPING and the
+aliases that point at them, broken into padded character trigrams
+("leg curl" -> "  l", " le", "leg", "eg ", ...) with an inverted index
+trigram -> entry ids. A query looks up its own trigrams, counts shared
+trigrams per entry with one np.bincount over the posting lists, and scores
+the entries it touched with the Dice coefficient 2|A & B| / (|A| + |B|).
+Only those entries are scored, never the whole vocabulary, so a query
+costs well under a millisecond even with tens of thousands of names.
+
+Accepted suggestions can be saved to an alias overlay: a JSON file of
+alias -> standard name that parse_training_data.py loads on top of
+EXERCISE_MAPPING (--alias-overlay), so a fix applies on the next run
+without editing the mapping in code.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from exercise_aliases import normalize_alias
+
+# Character n-gram length
+NGRAM = 3
+
+# Suggestions returned per name
+DEFAULT_LIMIT = 5
+
+# Lowest score worth showing
+MIN_SCORE = 0.3
+
+# Entries ranked per requested suggestion before de-duplicating by standard name
+CANDIDATES_PER_SUGGESTION = 8
+
+
+def ngrams(text, n=NGRAM):
+    """Set of padded character n-grams of the normalized text."""
+    padded = f"{' ' * (n - 1)}{normalize_alias(text)} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class SuggestionIndex:
+    """Trigram inverted index over standard names and their aliases."""
+
+    def __init__(self, mapping):
+        # Each distinct normalized text is one entry pointing at its standard name
+        entries = {}
+        for alias, standard in mapping.items():
+            if standard is None:
+                continue
+            entries.setdefault(normalize_alias(standard), standard)
+            entries.setdefault(normalize_alias(alias), standard)
+        self.texts = list(entries)
+        self.standards = [entries[text] for text in self.texts]
+
+        postings = {}
+        sizes = np.empty(len(self.texts), dtype=np.int32)
+        for entry, text in enumerate(self.texts):
+            grams = ngrams(text)
+            sizes[entry] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(entry)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.texts)
+
+    def suggest(self, raw, limit=DEFAULT_LIMIT, min_score=MIN_SCORE):
+        """
+        Up to limit (standard name, score, matched text) tuples for raw, best
+        first, one per standard name. Scores are Dice coefficients in [0, 1].
+        """
+        grams = ngrams(raw)
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists:
+            return []
+        hits = np.concatenate(lists)
+        shared = np.bincount(hits, minlength=len(self.texts))
+        touched = np.flatnonzero(shared)
+        scores = 2.0 * shared[touched] / (len(grams) + self.sizes[touched])
+
+        keep = scores >= min_score
+        touched, scores = touched[keep], scores[keep]
+        # Partial sort down to a shortlist; several entries can share a standard name
+        shortlist = limit * CANDIDATES_PER_SUGGESTION
+        if len(touched) > shortlist:
+            top = np.argpartition(-scores, shortlist)[:shortlist]
+            touched, scores = touched[top], scores[top]
+        # Best entries first; ties broken by the shorter, then alphabetical text
+        order = sorted(range(len(touched)),
+                       key=lambda i: (-scores[i], len(self.texts[touched[i]]), self.texts[touched[i]]))
+
+        suggestions = []
+        seen = set()
+        for i in order:
+            standard = self.standards[touched[i]]
+            if standard in seen:
+                continue
+            seen.add(standard)
+            suggestions.append((standard, round(float(scores[i]), 3), self.texts[touched[i]]))
+            if len(suggestions) == limit:
+                break
+        return suggestions
+
+
+# ============================================================================
+# ALIAS OVERLAY
+# ============================================================================
+
+def load_alias_overlay(path):
+    """alias -> standard name entries from an overlay file ({} if it does not exist)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        overlay = json.load(f)
+    if not isinstance(overlay, dict):
+        raise ValueError(f"Alias overlay {path} must be a JSON object of alias -> standard name")
+    return overlay
+
+
+def save_alias_overlay(path, additions):
+    """Merge additions into the overlay file (written atomically). Returns the merged overlay."""
+    path = Path(path)
+    overlay = load_alias_overlay(path)
+    overlay.update(additions)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(overlay.items())), f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    os.replace(tmp, path)
+    return overlay
+
+
+def auto_matches(index, names, threshold):
+    """alias -> standard name for every name whose best suggestion scores at least threshold."""
+    matches = {}
+    for name in names:
+        suggestions = index.suggest(name, limit=1)
+        if suggestions and suggestions[0][1] >= threshold:
+            matches[name] = suggestions[0][0]
+    return matches
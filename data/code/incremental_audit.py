@@ -0,0 +1,355 @@
+"""
+Incremental Training Sessions Audit
+Audit only the sessions appended to training_sessions.csv since the last run.
+
+A small JSON state file records how far the CSV has been validated (byte
+offset plus a fingerprint of the bytes before it), the last validated date
+and the rows dated on it, running per-check problem counts and a
+session_duration_est summary (Welford mean/variance, min/max and a 1-minute
+histogram for percentiles).
+Each run reads the CSV from the stored offset, audits the new rows, checks
+days_since_last for the first new row against the last validated date,
+counts new rows on that date as duplicates of the validated ones, and folds
+the results into the state, so the cost is proportional to the new data
+rather than the whole history.
+
+The fingerprint hashes a bounded sample of the validated bytes (the first
+and last FINGERPRINT_BYTES and FINGERPRINT_SAMPLES evenly spaced windows),
+so checking it costs the same however long the file grows. It catches a
+truncated or regenerated file (a re-parse changes the header or shifts the
+rows) and edits near the end, but not an in-place edit that keeps every
+sampled byte; delete the state file to force a full audit after such edits.
+
+Running counts match a full audit as long as sessions are appended in date
+order, which is how the parser writes them. New rows dated before the last
+validated date are reported as backdated; run a full audit after
+fixing them. If the file shrank or the fingerprint no longer matches, the
+state is rebuilt from a full audit.
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from audit_checks import (CHECKS, AuditReport, CheckResult, audit,
+                          days_since_last_mismatch_positions, select_checks)
+
+STATE_VERSION = 3
+
+# Bytes hashed at each end of the validated prefix, and the number and size
+# of the windows sampled evenly in between
+FINGERPRINT_BYTES = 64 * 1024
+FINGERPRINT_SAMPLES = 16
+SAMPLE_BYTES = 4096
+
+# Histogram bin width (minutes) for session_duration_est percentiles
+DURATION_BIN_MIN = 1.0
+
+DURATION_PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+
+
+# ============================================================================
+# STATE FILE
+# ============================================================================
+
+def new_state(columns):
+    """Empty audit state for a table with the given columns."""
+    return {
+        'version': STATE_VERSION,
+        'columns': list(columns),
+        'offset': 0,
+        'fingerprint': None,
+        'num_rows': 0,
+        'last_date': None,
+        'last_date_rows': [],
+        'counts': {name: 0 for name in CHECKS},
+        'duration': {
+            'n': 0, 'mean': 0.0, 'm2': 0.0, 'min': None, 'max': None,
+            'zeros': 0, 'negatives': 0, 'histogram': {},
+        },
+    }
+
+
+def load_state(path):
+    """Load the audit state, or None if it is missing or from another version."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('version') != STATE_VERSION:
+        return None
+    return state
+
+
+def save_state(state, path):
+    """Write the audit state atomically."""
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _fingerprint(f, offset):
+    """
+    SHA-256 of the length and a bounded sample of the first offset bytes of
+    an open binary file: both ends plus evenly spaced windows in between.
+    """
+    hasher = hashlib.sha256(str(offset).encode())
+    step = offset / (FINGERPRINT_SAMPLES + 1)
+    starts = ([0] + [int(step * (i + 1)) for i in range(FINGERPRINT_SAMPLES)]
+              + [max(0, offset - FINGERPRINT_BYTES)])
+    sizes = [FINGERPRINT_BYTES] + [SAMPLE_BYTES] * FINGERPRINT_SAMPLES + [FINGERPRINT_BYTES]
+    for start, size in zip(starts, sizes):
+        f.seek(start)
+        hasher.update(f.read(max(0, min(size, offset - start))))
+    return hasher.hexdigest()
+
+
+# ============================================================================
+# READING APPENDED ROWS
+# ============================================================================
+
+def read_appended_rows(path, state):
+    """
+    Rows appended to the CSV since state['offset'], indexed by their row number
+    in the whole file. Returns (df, new_offset, new_fingerprint), or None if
+    the validated part of the file changed and the state must be rebuilt.
+    """
+    size = os.path.getsize(path)
+    offset = state['offset']
+    if size < offset:
+        return None
+
+    with open(path, 'rb') as f:
+        if _fingerprint(f, offset) != state['fingerprint']:
+            return None
+        f.seek(offset)
+        data = f.read()
+        # Only whole lines; a partly written last line is picked up next run
+        end = data.rfind(b'\n') + 1
+        data = data[:end]
+        new_offset = offset + end
+        fingerprint = _fingerprint(f, new_offset)
+
+    if not data.strip():
+        df = pd.DataFrame(columns=state['columns'])
+    else:
+        df = pd.read_csv(BytesIO(data), header=None, names=state['columns'])
+    df.index = pd.RangeIndex(state['num_rows'], state['num_rows'] + len(df))
+    return df, new_offset, fingerprint
+
+
+# ============================================================================
+# DURATION SUMMARY
+# ============================================================================
+
+def update_duration_stats(stats, values):
+    """Fold a batch of session_duration_est values into the running summary."""
+    values = pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy(dtype=float)
+    if not len(values):
+        return stats
+
+    # Chan et al. parallel update of Welford's mean / M2
+    n_a, n_b = stats['n'], len(values)
+    mean_b = values.mean()
+    m2_b = ((values - mean_b) ** 2).sum()
+    n = n_a + n_b
+    delta = mean_b - stats['mean']
+    stats['mean'] += delta * n_b / n
+    stats['m2'] += m2_b + delta * delta * n_a * n_b / n
+    stats['n'] = n
+
+    lo, hi = float(values.min()), float(values.max())
+    stats['min'] = lo if stats['min'] is None else min(stats['min'], lo)
+    stats['max'] = hi if stats['max'] is None else max(stats['max'], hi)
+    stats['zeros'] += int((values == 0).sum())
+    stats['negatives'] += int((values < 0).sum())
+
+    bins, counts = np.unique(np.rint(values / DURATION_BIN_MIN).astype(np.int64), return_counts=True)
+    hist = stats['histogram']
+    for b, c in zip(bins.tolist(), counts.tolist()):
+        hist[str(b)] = hist.get(str(b), 0) + c
+    return stats
+
+
+def duration_quantile(stats, q):
+    """
+    Quantile from the histogram, interpolating linearly between order statistics
+    like Series.quantile(). Each value is stored rounded to the nearest bin, so
+    the result is exact for durations on the DURATION_BIN_MIN grid and within
+    DURATION_BIN_MIN / 2 otherwise.
+    """
+    n = stats['n']
+    if not n:
+        return math.nan
+    bins = sorted((int(b), c) for b, c in stats['histogram'].items())
+    values = np.array([b for b, _ in bins], dtype=float) * DURATION_BIN_MIN
+    ends = np.cumsum([c for _, c in bins])
+
+    target = q * (n - 1)
+    lo_rank, hi_rank = math.floor(target), math.ceil(target)
+    lo = values[np.searchsorted(ends, lo_rank, side='right')]
+    hi = values[np.searchsorted(ends, hi_rank, side='right')]
+    return lo + (hi - lo) * (target - lo_rank)
+
+
+def duration_summary(stats):
+    """min/max/mean/std/median/percentiles of session_duration_est from the running summary."""
+    n = stats['n']
+    return {
+        'count': n,
+        'min': stats['min'],
+        'max': stats['max'],
+        'mean': stats['mean'] if n else math.nan,
+        'std': math.sqrt(stats['m2'] / (n - 1)) if n > 1 else math.nan,
+        'median': duration_quantile(stats, 0.5),
+        'zeros': stats['zeros'],
+        'negatives': stats['negatives'],
+        'percentiles': {p: duration_quantile(stats, p / 100) for p in DURATION_PERCENTILES},
+    }
+
+
+# ============================================================================
+# INCREMENTAL AUDIT
+# ============================================================================
+
+def _boundary_days_since_last(df, dp, last_date):
+    """
+    days_since_last check over the new rows, with the last validated date in
+    front so the first new session is checked against the one before it.
+    """
+    new = df.assign(_dp=dp).sort_values('_dp', kind='stable')
+    order = new.index.to_numpy()
+    frame = new[['date', 'days_since_last', '_dp']].reset_index(drop=True)
+    if last_date is not None:
+        boundary = pd.DataFrame({'date': [last_date], 'days_since_last': [np.nan],
+                                 '_dp': [pd.Timestamp(last_date)]})
+        frame = pd.concat([boundary, frame], ignore_index=True)
+    positions, reported, expected = days_since_last_mismatch_positions(frame)
+    findings = [(frame['date'].iat[pos], int(reported[pos]), int(expected[pos])) for pos in positions]
+    if last_date is not None:
+        positions = positions - 1
+    return order[positions], {'findings': findings}
+
+
+def _boundary_duplicate_dates(df, dp, state):
+    """
+    duplicate_dates over the new rows, counting rows on the last validated
+    date as duplicates of the validated rows on it. Those validated rows are
+    reported too when this batch gives them their first duplicate.
+    """
+    on_last = np.zeros(len(df), dtype=bool)
+    if state['last_date'] is not None:
+        on_last = (dp == pd.Timestamp(state['last_date'])).to_numpy()
+    dup = df['date'].duplicated(keep=False).to_numpy() & ~on_last
+    counts = {str(d): int(n) for d, n in df.loc[dup].groupby('date').size().items()}
+    rows = df.index.to_numpy()[dup | on_last]
+    if on_last.any():
+        previous = state['last_date_rows']
+        counts[state['last_date']] = len(previous) + int(on_last.sum())
+        if len(previous) == 1:
+            rows = np.concatenate([np.asarray(previous, dtype=rows.dtype), rows])
+    return rows, {'dates': counts}
+
+
+def audit_appended(df, state, checks=None):
+    """
+    Audit rows appended after the state's last validated session. Returns an
+    AuditReport over the new rows, including a 'backdated_rows' check for new
+    sessions dated before the last validated date.
+    """
+    start = time.perf_counter()
+    selected = select_checks(checks)
+    dp = pd.to_datetime(df['date'], errors='coerce')
+    boundary_checks = {
+        'duplicate_dates': lambda: _boundary_duplicate_dates(df, dp, state),
+        'days_since_last_mismatch': lambda: _boundary_days_since_last(df, dp, state['last_date']),
+    }
+    report = audit(df, checks=[c for c in selected if c not in boundary_checks], parsed_dates=dp)
+
+    results = {}
+    for name in selected:
+        if name in boundary_checks:
+            t0 = time.perf_counter()
+            rows, details = boundary_checks[name]()
+            results[name] = CheckResult(name, CHECKS[name][0], len(rows), rows,
+                                        time.perf_counter() - t0, details)
+        else:
+            results[name] = report.results[name]
+
+    t0 = time.perf_counter()
+    last = pd.Timestamp(state['last_date']) if state['last_date'] else None
+    backdated = df.index.to_numpy()[(dp < last).to_numpy()] if last is not None else df.index.to_numpy()[:0]
+    results['backdated_rows'] = CheckResult('backdated_rows', 'Backdated appended rows', len(backdated),
+                                            backdated, time.perf_counter() - t0,
+                                            {'last_validated_date': state['last_date']})
+    return AuditReport(len(df), results, time.perf_counter() - start)
+
+
+def fold_into_state(state, df, report, offset, fingerprint):
+    """Add a batch's audit results and durations to the running state."""
+    for result in report:
+        if result.name in state['counts']:
+            state['counts'][result.name] += result.count
+    update_duration_stats(state['duration'], df['session_duration_est'])
+    dp = pd.to_datetime(df['date'], errors='coerce')
+    if dp.notna().any():
+        newest = dp.max()
+        label = newest.strftime('%Y-%m-%d')
+        on_newest = df.index.to_numpy()[(dp == newest).to_numpy()].tolist()
+        if state['last_date'] is None or label > state['last_date']:
+            state['last_date'], state['last_date_rows'] = label, on_newest
+        elif label == state['last_date']:
+            state['last_date_rows'] += on_newest
+    state['num_rows'] += len(df)
+    state['offset'] = offset
+    state['fingerprint'] = fingerprint
+    return state
+
+
+def rebuild_state(path):
+    """Full audit of the CSV and a fresh state covering all of it. Returns (report, state)."""
+    with open(path, 'rb') as f:
+        offset = f.read().rfind(b'\n') + 1
+        fingerprint = _fingerprint(f, offset)
+    df = pd.read_csv(path)
+    state = new_state(df.columns)
+    report = audit(df)
+    fold_into_state(state, df, report, offset, fingerprint)
+    return report, state
+
+
+def incremental_audit(path, state_path, checks=None):
+    """
+    Audit the rows of a training_sessions CSV appended since the last run and
+    update the state file. Returns (report, state, rebuilt): report covers the
+    new rows, or the whole file when the state had to be rebuilt.
+    """
+    if Path(path).suffix.lower() != '.csv':
+        raise ValueError(f"Incremental audit needs an append-only CSV, got {path}")
+
+    state = load_state(state_path)
+    appended = read_appended_rows(path, state) if state is not None else None
+    if appended is None:
+        report, state = rebuild_state(path)
+        save_state(state, state_path)
+        return report, state, True
+
+    df, offset, fingerprint = appended
+    if df.empty:
+        state['offset'], state['fingerprint'] = offset, fingerprint
+        save_state(state, state_path)
+        return AuditReport(0, {}, 0.0), state, False
+    report = audit_appended(df, state, checks)
+    fold_into_state(state, df, report, offset, fingerprint)
+    save_state(state, state_path)
+    return report, state, False
@@ -1,6 +1,12 @@
 """
 Strength Training Data Parser
 Parses 2 years of workout logs into analysis-ready CSV files.
+
+DATA_DIR holds one lifter's monthly *.txt logs, or one folder per athlete
+(DATA_DIR/<athlete_id>/*.txt, optionally with an athlete.json giving
+{"bodyweight_lbs": ...}). For athletes the tables get an athlete_id column
+and are written Hive-partitioned by athlete and year (see training_io), so
+--athlete rebuilds only the named athletes' partitions.
 """
 
 import pandas as pd
@@ -8,12 +14,29 @@ import numpy as np
 from datetime import datetime, timedelta
 import re
 import os
+import argparse
+import hashlib
+import json
+import pickle
+import sys
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+from exercise_aliases import AliasIndex
+from fuzzy_match import SuggestionIndex, auto_matches, load_alias_overlay, save_alias_overlay
+from progression import update_pr_index
+from training_io import OUTPUT_FORMATS, file_content_hash, write_athlete_partitions, write_table
 
 # Configuration
 DATA_DIR = Path(r"C:\Users\cruzi\OneDrive\Desktop\GYM Data")
 OUTPUT_DIR = DATA_DIR
+CACHE_DIR = OUTPUT_DIR / ".parse_cache"
+
+# Bump whenever the parsing logic changes output, so cached results from
+# older parser versions are ignored
+PARSER_VERSION = 4
 
 # ============================================================================
 # EXERCISE NAME STANDARDIZATION MAPPING
@@ -688,13 +711,107 @@ BARBELL_EXERCISES = {
     "AFS Smith Incline Press", "AFS Smith Incline Press (Paused)",
 }
 
+# Compiled index over EXERCISE_MAPPING: matches names regardless of case and
+# spacing, and abbreviated tokens ("Leg ext") by prefix; see exercise_aliases.py
+EXERCISE_ALIASES = AliasIndex(EXERCISE_MAPPING)
+
+
+def standardize_exercise(exercise_raw):
+    """Standardized name for a raw exercise name (unchanged if unmapped, None to skip it)."""
+    return EXERCISE_ALIASES.resolve(exercise_raw)
+
+
+def add_exercise_aliases(mapping):
+    """Add alias -> standard name entries to EXERCISE_MAPPING and the compiled index."""
+    EXERCISE_MAPPING.update(mapping)
+    EXERCISE_ALIASES.update(mapping)
+
+# ============================================================================
+# WORKOUT HEADER GRAMMAR
+# ============================================================================
+# Split names recognised as session headers. Each entry is a regex fragment
+# matched case-insensitively against the whole header line, followed by an
+# optional session number ("Upper 2", "Lower2"). More names can be added
+# without code changes via --header-names or add_workout_header_names().
+WORKOUT_HEADER_NAMES = [
+    # Basic types
+    r'Upper', r'Lower', r'Legs', r'Back', r'Chest', r'Arms', r'Torso', r'Limbs',
+    # Combination types
+    r'Bro\s*day',
+    r'Fun\s*day',
+    r'Weakness\s*day',
+    r'Chest\s+and\s+arms',
+    r'Back\s+and\s+shoulders',
+    r'Upper\s+back\s+and\s+shoulders',
+    # Special sessions
+    r'Isolations?',
+]
+
+
+def compile_workout_header_pattern(names):
+    """Compile the header names into a single case-insensitive alternation."""
+    alternation = '|'.join(f'(?:{name})' for name in names)
+    return re.compile(rf'^(?:{alternation})\s*\d*$', re.IGNORECASE)
+
+
+WORKOUT_HEADER_RE = compile_workout_header_pattern(WORKOUT_HEADER_NAMES)
+
+
+def add_workout_header_names(names):
+    """
+    Register extra split names such as "Push" or "Full body" as workout headers.
+    Names are plain text (not regex); whitespace between words matches any run of spaces.
+    """
+    global WORKOUT_HEADER_RE
+    for name in names:
+        fragment = r'\s+'.join(re.escape(word) for word in name.split())
+        if fragment and fragment not in WORKOUT_HEADER_NAMES:
+            WORKOUT_HEADER_NAMES.append(fragment)
+    WORKOUT_HEADER_RE = compile_workout_header_pattern(WORKOUT_HEADER_NAMES)
+
+
+def load_workout_header_names(path):
+    """Read split names from a text file, one per line (blank lines and # comments ignored)."""
+    names = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                names.append(line)
+    return names
+
+
 # ============================================================================
 # PARSING FUNCTIONS
 # ============================================================================
 
-def parse_weight_notation(weight_str, exercise_standard, exercise_raw=""):
+# Unicode fractions used in the logs, expanded in a single str.translate pass
+FRACTION_TABLE = str.maketrans({
+    '⅛': '.125', '¼': '.25', '⅓': '.333',
+    '½': '.5', '⅔': '.667', '¾': '.75',
+    '⅚': '.833', '⅝': '.625', '⅜': '.375',
+})
+
+# Standard bodyweight (lbs) used for BW notation when the athlete has none on file
+STANDARD_BODYWEIGHT = 185
+
+# Notation tokens that carry no weight / no reps
+NO_WEIGHT_TOKENS = frozenset(['NA', 'MATCH', 'GF', 'BF', 'DL', ''])
+NO_REPS_TOKENS = frozenset(['NA', 'F', 'BF', 'GF', ''])
+
+# Patterns used on every set, compiled once at import
+NUMBER_RE = re.compile(r'(\d+\.?\d*)')
+LEADING_NUMBER_RE = re.compile(r'\+?(\d+\.?\d*)')
+BODYWEIGHT_RE = re.compile(r'BW\+?(\d+\.?\d*)')
+PLATES_RE = re.compile(r'(\d+)PPs?(?:\+(\d+\.?\d*))?')
+REPEAT_RE = re.compile(r'x(\d+)$')
+SET_SEPARATOR_RE = re.compile(r'[,\s]+')
+
+
+def parse_weight_notation(weight_str, exercise_standard, exercise_raw="", bodyweight=None):
     """
     Parse weight notation and return (weight_lbs, is_bodyweight, has_extender).
+    BW notation uses bodyweight (lbs), or STANDARD_BODYWEIGHT when it is None.
 
     Handles:
     - PPs notation: 3PPs+30 -> plates per side calculation
@@ -704,51 +821,51 @@ def parse_weight_notation(weight_str, exercise_standard, exercise_raw=""):
     - Direct numbers: 90 -> direct weight
     - Fractions: Unicode fractions like 7.5
     """
-    if not weight_str or weight_str.strip() in ['NA', 'MATCH', 'GF', 'BF', 'DL', '']:
+    return _parse_weight(weight_str, exercise_standard in BARBELL_EXERCISES, 'KG' in exercise_raw.upper(),
+                         bodyweight)
+
+
+def _parse_weight(weight_str, is_barbell, is_kg_exercise, bodyweight=None):
+    """
+    parse_weight_notation with the exercise reduced to the only two facts
+    the result depends on, so it can be part of a cache key.
+    """
+    if not weight_str or weight_str.strip() in NO_WEIGHT_TOKENS:
         return None, False, False, weight_str
 
     weight_str = str(weight_str).strip()
     original = weight_str
-    has_extender = False
-    is_bodyweight = False
-
-    # Check if exercise name indicates KG (for cases like "Cybex eagle row(KG)")
-    exercise_is_kg = 'KG' in exercise_raw.upper() or 'kg' in exercise_raw
 
     # Replace unicode fractions
-    weight_str = weight_str.replace('⅛', '.125').replace('¼', '.25').replace('⅓', '.333')
-    weight_str = weight_str.replace('½', '.5').replace('⅔', '.667').replace('¾', '.75')
-    weight_str = weight_str.replace('⅚', '.833').replace('⅝', '.625').replace('⅜', '.375')
+    weight_str = weight_str.translate(FRACTION_TABLE)
+
+    # Dispatch on the leading token
+    lead = weight_str[0]
 
     # Handle FS (Full Stack) notation
-    if weight_str.startswith('FS'):
-        has_extender = '+' in weight_str
-        return None, False, has_extender, original
-
-    # Handle BW (bodyweight) notation - use 185 lbs as standard bodyweight
-    STANDARD_BODYWEIGHT = 185
-    if weight_str.startswith('BW'):
-        is_bodyweight = True
-        match = re.search(r'BW\+?(\d+\.?\d*)', weight_str)
+    if lead == 'F' and weight_str.startswith('FS'):
+        return None, False, '+' in weight_str, original
+
+    # Handle BW (bodyweight) notation
+    if lead == 'B' and weight_str.startswith('BW'):
+        if bodyweight is None:
+            bodyweight = STANDARD_BODYWEIGHT
+        match = BODYWEIGHT_RE.search(weight_str)
         if match:
-            added_weight = float(match.group(1))
-            return STANDARD_BODYWEIGHT + added_weight, True, False, original
-        return STANDARD_BODYWEIGHT, True, False, original
+            return bodyweight + float(match.group(1)), True, False, original
+        return bodyweight, True, False, original
 
     # Handle KG notation - convert to lbs (multiply by 2.205)
-    kg_match = re.search(r'(\d+\.?\d*)\s*\+?\s*(\d+\.?\d*)?\s*KG', weight_str, re.IGNORECASE)
-    if kg_match or 'KG' in weight_str.upper():
-        # Extract all numbers before KG
-        numbers = re.findall(r'(\d+\.?\d*)', weight_str.split('KG')[0].split('kg')[0])
+    if 'KG' in weight_str.upper():
+        # Sum all the numbers before KG (handles cases like "94.5+10KG")
+        numbers = NUMBER_RE.findall(weight_str.split('KG')[0].split('kg')[0])
         if numbers:
-            # Sum all the numbers (handles cases like "94.5+10KG")
-            total_kg = sum(float(n) for n in numbers if n)
-            total_lbs = total_kg * 2.205
-            return round(total_lbs, 1), False, False, original
+            total_kg = sum(float(n) for n in numbers)
+            return round(total_kg * 2.205, 1), False, False, original
         return None, False, False, original
 
     # Handle PPs (plates per side) notation
-    pps_match = re.match(r'(\d+)PPs?(?:\+(\d+\.?\d*))?', weight_str)
+    pps_match = PLATES_RE.match(weight_str)
     if pps_match:
         plates = int(pps_match.group(1))
         extra = float(pps_match.group(2)) if pps_match.group(2) else 0
@@ -758,32 +875,23 @@ def parse_weight_notation(weight_str, exercise_standard, exercise_raw=""):
 
         # Add bar weight for barbell exercises (45 lb bar)
         # Add machine base weight for machines (22.5 lbs)
-        if exercise_standard in BARBELL_EXERCISES:
+        if is_barbell:
             weight += 45
         else:
             weight += 22.5  # Machine base weight
 
         return weight, False, False, original
 
-    # Handle direct numbers (possibly with + for extender)
-    if '+' in weight_str and not weight_str.startswith('+'):
-        # Check if this is an extender notation like "150/13+3"
-        # But weight_str here is just the weight part
-        pass
-
-    # Try to extract a number
-    # For KG exercises, sum all numbers (handles cases like "103.5+10")
-    if exercise_is_kg:
-        numbers = re.findall(r'(\d+\.?\d*)', weight_str)
+    # For KG exercises (like "Cybex eagle row(KG)"), sum all numbers (handles "103.5+10")
+    if is_kg_exercise:
+        numbers = NUMBER_RE.findall(weight_str)
         if numbers:
-            total_kg = sum(float(n) for n in numbers if n)
-            weight = round(total_kg * 2.205, 1)
-            return weight, False, False, original
+            total_kg = sum(float(n) for n in numbers)
+            return round(total_kg * 2.205, 1), False, False, original
 
-    num_match = re.match(r'\+?(\d+\.?\d*)', weight_str)
+    num_match = LEADING_NUMBER_RE.match(weight_str)
     if num_match:
-        weight = float(num_match.group(1))
-        return weight, False, False, original
+        return float(num_match.group(1)), False, False, original
 
     return None, False, False, original
 
@@ -800,20 +908,15 @@ def parse_reps_notation(reps_str):
     - Single leg: 6:4 -> returns tuple for left/right
     - Failure: F -> None
     """
-    if not reps_str or reps_str.strip() in ['NA', 'F', 'BF', 'GF', '']:
+    if not reps_str or reps_str.strip() in NO_REPS_TOKENS:
         return None, False, None
 
-    reps_str = str(reps_str).strip()
-
     # Replace unicode fractions
-    reps_str = reps_str.replace('⅛', '.125').replace('¼', '.25').replace('⅓', '.333')
-    reps_str = reps_str.replace('½', '.5').replace('⅔', '.667').replace('¾', '.75')
-    reps_str = reps_str.replace('⅚', '.833').replace('⅝', '.625').replace('⅜', '.375')
-
-    has_extender = False
+    reps_str = str(reps_str).strip().translate(FRACTION_TABLE)
 
     # Handle single leg notation (left:right)
-    if ':' in reps_str and '+' not in reps_str:
+    has_plus = '+' in reps_str
+    if not has_plus and ':' in reps_str:
         parts = reps_str.split(':')
         try:
             left = float(parts[0]) if parts[0] else None
@@ -823,7 +926,7 @@ def parse_reps_notation(reps_str):
             pass
 
     # Handle extender notation (13+3)
-    if '+' in reps_str:
+    if has_plus:
         parts = reps_str.split('+')
         try:
             base_reps = float(parts[0])
@@ -839,15 +942,54 @@ def parse_reps_notation(reps_str):
         return None, False, None
 
 
-def parse_set_string(set_str, exercise_standard, exercise_raw=""):
+# Result of parsing one set string. Immutable so cached instances can be shared.
+ParsedSet = namedtuple('ParsedSet', [
+    'weight_raw', 'weight_lbs', 'reps', 'has_extender',
+    'is_bodyweight', 'reps_type', 'repeat_count',
+])
+
+# Distinct set cache keys kept (see parse_set_string for what is in a key)
+PARSED_SET_CACHE_SIZE = 8192
+
+# Cache hits/misses reported back by worker processes (see parse_workout_files)
+_worker_set_cache_stats = {'hits': 0, 'misses': 0}
+
+
+def parse_set_string(set_str, exercise_standard, exercise_raw="", bodyweight=None):
     """
     Parse a single set string like "90/8" or "3PPs+30/5.5" or "BW+25/6".
-    Returns dict with weight_raw, weight_lbs, reps, has_extender, etc.
+    Returns a ParsedSet with weight_raw, weight_lbs, reps, has_extender, etc.
+    BW notation uses bodyweight (lbs), or STANDARD_BODYWEIGHT when it is None.
+
+    Results are memoized. The cache key is the set string plus only the
+    exercise facts its weight notation reads: the barbell flag for plate
+    counts ("3PPs"), the bodyweight for BW notation, and whether the
+    exercise is logged in KG for the plain numbers that flag converts.
+    They are looked up on every call, so edits to EXERCISE_MAPPING or
+    BARBELL_EXERCISES at runtime never return stale results and athletes
+    with different bodyweights never share a BW entry, while "90/8" is one
+    entry for every lifter and machine. The logs repeat fewer set strings
+    than one might expect: on the shipped logs about 50% of lookups hit
+    serially and about 31% with --workers 3, since each worker process
+    starts with an empty cache. The saving is the re-parse of those hits.
     """
     set_str = str(set_str).strip()
-
+    weight = set_str.split('/', 1)[0]
+    uses_bodyweight = weight.startswith('BW')
+    uses_plates = 'PP' in weight
+    return _parse_set_cached(
+        set_str,
+        uses_plates and exercise_standard in BARBELL_EXERCISES,
+        not (uses_bodyweight or uses_plates) and 'KG' in exercise_raw.upper(),
+        (STANDARD_BODYWEIGHT if bodyweight is None else bodyweight) if uses_bodyweight else None,
+    )
+
+
+@lru_cache(maxsize=PARSED_SET_CACHE_SIZE)
+def _parse_set_cached(set_str, is_barbell, is_kg_exercise, bodyweight):
+    """Uncached body of parse_set_string."""
     # Handle "x2" or "x3" notation (same set repeated)
-    repeat_match = re.search(r'x(\d+)$', set_str)
+    repeat_match = REPEAT_RE.search(set_str)
     repeat_count = int(repeat_match.group(1)) if repeat_match else 1
     if repeat_match:
         set_str = set_str[:repeat_match.start()]
@@ -862,27 +1004,47 @@ def parse_set_string(set_str, exercise_standard, exercise_raw=""):
     reps_raw = parts[1]
 
     # Parse weight
-    weight_lbs, is_bodyweight, weight_extender, _ = parse_weight_notation(weight_raw, exercise_standard, exercise_raw)
+    weight_lbs, is_bodyweight, weight_extender, _ = _parse_weight(weight_raw, is_barbell, is_kg_exercise,
+                                                                  bodyweight)
 
     # Parse reps
     reps, reps_extender, reps_type = parse_reps_notation(reps_raw)
 
     has_extender = weight_extender or reps_extender
 
-    result = {
-        'weight_raw': weight_raw,
-        'weight_lbs': weight_lbs,
-        'reps': reps,
-        'has_extender': has_extender,
-        'is_bodyweight': is_bodyweight,
-        'reps_type': reps_type,
-        'repeat_count': repeat_count,
+    return ParsedSet(
+        weight_raw=weight_raw,
+        weight_lbs=weight_lbs,
+        reps=reps,
+        has_extender=has_extender,
+        is_bodyweight=is_bodyweight,
+        reps_type=reps_type,
+        repeat_count=repeat_count,
+    )
+
+
+def parse_set_cache_info():
+    """
+    Hit/miss counters for the parse_set_string cache, including the hits and
+    misses of worker processes used by parse_workout_files.
+    """
+    info = _parse_set_cached.cache_info()
+    return {
+        'hits': info.hits + _worker_set_cache_stats['hits'],
+        'misses': info.misses + _worker_set_cache_stats['misses'],
+        'maxsize': info.maxsize,
+        'currsize': info.currsize,
     }
 
-    return result
 
+def clear_parse_set_cache():
+    """Empty the parse_set_string cache and reset its counters."""
+    _parse_set_cached.cache_clear()
+    _worker_set_cache_stats['hits'] = 0
+    _worker_set_cache_stats['misses'] = 0
 
-def parse_exercise_line(line):
+
+def parse_exercise_line(line, bodyweight=None):
     """
     Parse an exercise line like:
     "DB bench: 90/8, 80/12"
@@ -891,7 +1053,8 @@ def parse_exercise_line(line):
     Also handles multi-exercise lines like:
     "Trcp pushdown: 170/6 OVH alt: 120/6 115/8"
 
-    Returns (exercise_name, is_paused, sets_data) for first exercise
+    Returns (exercise_name, is_paused, sets_data) for first exercise.
+    bodyweight is the athlete's bodyweight for BW notation (None: STANDARD_BODYWEIGHT).
     """
     line = line.strip()
     if not line or ':' not in line:
@@ -942,7 +1105,7 @@ def parse_exercise_line(line):
         return None, False, []
 
     # Get standardized name
-    exercise_standard = EXERCISE_MAPPING.get(exercise_raw, exercise_raw)
+    exercise_standard = standardize_exercise(exercise_raw)
 
     # Skip if mapping says to ignore this entry
     if exercise_standard is None:
@@ -951,7 +1114,7 @@ def parse_exercise_line(line):
     # Parse sets - split by comma or space (handling both formats)
     # Some entries use commas, some use spaces
     # But be careful with patterns like "80/12x2" or notes in parentheses
-    sets_raw = re.split(r'[,\s]+', sets_str)
+    sets_raw = SET_SEPARATOR_RE.split(sets_str)
     sets_raw = [s.strip() for s in sets_raw if s.strip() and '/' in s]
 
     sets_data = []
@@ -959,17 +1122,17 @@ def parse_exercise_line(line):
         # Skip if this looks like a secondary exercise name
         if ':' in set_str or set_str in ['OVH', 'SA', 'SS', 'alt']:
             continue
-        parsed = parse_set_string(set_str, exercise_standard, exercise_raw)
+        parsed = parse_set_string(set_str, exercise_standard, exercise_raw, bodyweight)
         if parsed:
             # Handle repeat notation
-            for _ in range(parsed['repeat_count']):
+            for _ in range(parsed.repeat_count):
                 sets_data.append({
-                    'weight_raw': parsed['weight_raw'],
-                    'weight_lbs': parsed['weight_lbs'],
-                    'reps': parsed['reps'],
-                    'has_extender': parsed['has_extender'],
-                    'is_bodyweight': parsed['is_bodyweight'],
-                    'reps_type': parsed['reps_type'],
+                    'weight_raw': parsed.weight_raw,
+                    'weight_lbs': parsed.weight_lbs,
+                    'reps': parsed.reps,
+                    'has_extender': parsed.has_extender,
+                    'is_bodyweight': parsed.is_bodyweight,
+                    'reps_type': parsed.reps_type,
                 })
 
     return exercise_raw, is_paused, sets_data
@@ -1027,84 +1190,133 @@ def is_workout_header(line):
     # Remove trailing colon for checking
     clean = line.rstrip(':').strip()
 
-    # Known workout type patterns
-    workout_patterns = [
-        # Basic types (with optional number)
-        r'^Upper\s*\d*$',
-        r'^Lower\s*\d*$',
-        r'^Legs\s*\d*$',
-        r'^Back\s*\d*$',
-        r'^Chest\s*\d*$',
-        r'^Arms\s*\d*$',
-        r'^Torso\s*\d*$',
-        r'^Limbs\s*\d*$',
-        # With explicit numbers (Upper 1, Upper 2, Lower 3, etc.)
-        r'^Upper\s+\d+$',
-        r'^Lower\s*\d+$',  # Handle "Lower2" without space
-        r'^Legs\s+\d+$',
-        r'^Back\s+\d+$',
-        r'^Arms\s+\d+$',
-        r'^Torso\s+\d+$',
-        r'^Limbs\s+\d+$',
-        # Combination types
-        r'^Bro\s*[Dd]ay\s*\d*$',
-        r'^Fun\s*[Dd]ay\s*\d*$',
-        r'^Weakness\s*[Dd]ay\s*\d*$',
-        r'^Chest\s+[Aa]nd\s+[Aa]rms\s*\d*$',
-        r'^Chest\s+[Aa]nd\s+[Aa]rms\s*$',
-        r'^Back\s+[Aa]nd\s+[Ss]houlders\s*\d*$',
-        r'^Upper\s+[Bb]ack\s+[Aa]nd\s+[Ss]houlders\s*\d*$',
-        # Special sessions
-        r'^[Ii]solation[s]?\s*\d*$',
-    ]
-
-    for pattern in workout_patterns:
-        if re.match(pattern, clean, re.IGNORECASE):
-            return True
+    return WORKOUT_HEADER_RE.match(clean) is not None
 
-    return False
 
+MONTH_NUMBERS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4,
+    'may': 5, 'june': 6, 'july': 7, 'august': 8,
+    'september': 9, 'october': 10, 'november': 11, 'december': 12
+}
 
-def parse_workout_file(filepath):
+# "January 2024" in a filename, or at the start of a month header line
+# like "January 2024:" / "October 2024 gym sessions:"
+MONTH_YEAR_PATTERN = r'(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})'
+MONTH_YEAR_RE = re.compile(MONTH_YEAR_PATTERN, re.IGNORECASE)
+MONTH_HEADER_RE = re.compile('^' + MONTH_YEAR_PATTERN, re.IGNORECASE)
+
+# Explicit session dates: "2025-03-14", "3/14/2025", "Mon 3/14", "Monday, 3/14",
+# "3/14:". A marker can stand on its own line or prefix/suffix a workout
+# header ("3/14 Upper:", "Upper - Mon 3/14:", "Upper (3/14):").
+DATE_PATTERN = (
+    r'(?P<weekday>(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?,?\s+)?'
+    r'(?:(?P<iso_year>\d{4})-(?P<iso_month>\d{1,2})-(?P<iso_day>\d{1,2})'
+    r'|(?P<month>\d{1,2})/(?P<day>\d{1,2})(?:/(?P<year>\d{4}|\d{2}))?)'
+)
+DATE_PREFIX_RE = re.compile(
+    r'^' + DATE_PATTERN + r'(?P<colon>\s*:)?(?:\s*[-,]?\s+(?P<rest>[^/]+))?$', re.IGNORECASE)
+DATE_SUFFIX_RE = re.compile(
+    r'^(?P<rest>[^/:]+?)\s*(?:[-,(]\s*|\s)' + DATE_PATTERN + r'\)?\s*:?$', re.IGNORECASE)
+
+# A weekday-qualified "M/D" this many months away from the file's month
+# belongs to the neighbouring year (a "Thu 1/2" in a December log)
+YEAR_WRAP_MONTHS = 6
+
+
+def parse_month_from_filename(filepath):
     """
-    Parse a single workout file and return list of sessions.
-    Each session is a dict with workout_type and exercises.
+    Return (year, month) from a filename like "January 2024 gym sessions.txt".
+    Falls back to January 2024 if the filename has no month/year.
     """
-    # Extract month and year from filename
     filename = os.path.basename(filepath)
+    month_match = MONTH_YEAR_RE.search(filename)
+    if month_match:
+        return int(month_match.group(2)), MONTH_NUMBERS[month_match.group(1).lower()]
+    # Default fallback
+    return 2024, 1
 
-    # Try to parse month/year from filename like "January 2024 gym sessions.txt"
-    month_match = re.search(r'(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})', filename, re.IGNORECASE)
 
-    if month_match:
-        month_name = month_match.group(1)
-        year = int(month_match.group(2))
-        month_map = {
-            'january': 1, 'february': 2, 'march': 3, 'april': 4,
-            'may': 5, 'june': 6, 'july': 7, 'august': 8,
-            'september': 9, 'october': 10, 'november': 11, 'december': 12
-        }
-        month = month_map[month_name.lower()]
+def match_date_marker(line, year, month):
+    """
+    Recognise an explicit date marker in a log line.
+
+    Returns None if the line holds no usable date, else a (date, header,
+    ambiguous) tuple: header is the workout header the marker was attached
+    to ("" for a marker on its own line) and ambiguous is True for a bare
+    "3/14" or "3/14/25" line, which is also valid set notation (weight/reps)
+    and only counts as a date when the caller can confirm it. Dates without
+    a year take the log's year; bare dates must fall in the log's month.
+    """
+    match = DATE_PREFIX_RE.match(line)
+    if match is None:
+        if ':' in line[:-1] or '/' not in line and '-' not in line:
+            return None
+        match = DATE_SUFFIX_RE.match(line)
+        if match is None:
+            return None
+
+    header = (match.group('rest') or '').strip()
+    if header and not is_workout_header(header):
+        return None
+
+    if match.group('iso_year'):
+        marker_year, marker_month, day = (int(match.group(g)) for g in ('iso_year', 'iso_month', 'iso_day'))
+        explicit = True
     else:
-        # Default fallback
-        year, month = 2024, 1
+        marker_month, day = int(match.group('month')), int(match.group('day'))
+        year_text = match.group('year')
+        if year_text:
+            marker_year = int(year_text) + (2000 if len(year_text) == 2 else 0)
+        elif marker_month - month > YEAR_WRAP_MONTHS:
+            marker_year = year - 1
+        elif month - marker_month > YEAR_WRAP_MONTHS:
+            marker_year = year + 1
+        else:
+            marker_year = year
+        explicit = bool(header or match.group('weekday') or match.group('colon')
+                        or (year_text and len(year_text) == 4))
+        if not explicit and marker_month != month:
+            return None
+
+    try:
+        date = datetime(marker_year, marker_month, day)
+    except ValueError:
+        return None
+    return date, header, not explicit
 
-    # Read file
-    with open(filepath, 'r', encoding='utf-8-sig') as f:
-        content = f.read()
 
-    # Split into sessions by double newlines or workout type headers
-    sessions = []
+def iter_workout_sessions(lines, year, month, bodyweight=None):
+    """
+    Parse an iterable of log lines and yield sessions one at a time.
+
+    A session is yielded as soon as the next workout header (or the end of
+    the input) closes it, so only the session being built is held in memory.
+    Each session is a dict with workout_type, exercises, year, month and
+    date_marker (the explicit date written in the log, or None).
+    year/month start at the given values and follow any month header lines
+    ("March 2025 gym sessions:") in the input, which lets one multi-month
+    export be streamed through the same code as a monthly file.
+    bodyweight is passed on to the set parser for BW notation.
+
+    Date markers (see match_date_marker) on a header line or on their own
+    line date the session they belong to: a marker after a session's
+    exercises dates the next header. A bare "3/14" line after an exercise is
+    parsed as sets like any continuation line, and only taken back as a date
+    if the very next line is a workout header, so the input is still read once.
+    """
     current_session = None
     current_exercises = []
-
-    lines = content.split('\n')
+    session_year, session_month = year, month
+    session_date = None
+    # Date marker waiting for the next workout header
+    pending_date = None
+    # (date, sets list, length before) for a bare "M/D" line just read as sets
+    tentative_date = None
 
     # Track pending exercise name for multi-line format
     pending_exercise = None
 
     for line in lines:
-        original_line = line
         line = line.strip()
 
         # Skip empty lines
@@ -1112,27 +1324,78 @@ def parse_workout_file(filepath):
             pending_exercise = None  # Reset on blank line
             continue
 
-        # Skip month headers like "January 2024:" or "October 2024 gym sessions:"
-        if re.match(r'^(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}', line, re.IGNORECASE):
+        confirm_date, tentative_date = tentative_date, None
+
+        # Month headers like "January 2024:" or "October 2024 gym sessions:"
+        # start a new month, so a session never runs across one
+        month_match = MONTH_HEADER_RE.match(line)
+        if month_match:
+            if current_session and current_exercises:
+                yield {
+                    'workout_type': current_session,
+                    'exercises': current_exercises,
+                    'year': session_year,
+                    'month': session_month,
+                    'date_marker': session_date,
+                }
+            current_session = None
+            current_exercises = []
+            pending_exercise = None
+            pending_date = None
+            year, month = int(month_match.group(2)), MONTH_NUMBERS[month_match.group(1).lower()]
             continue
 
-        # Check if this is a workout type header
+        header, header_date = None, None
         if is_workout_header(line):
-            # Save previous session if exists
+            header = line
+        else:
+            marker = match_date_marker(line, year, month)
+            if marker:
+                marker_date, marker_header, ambiguous = marker
+                if marker_header:
+                    header, header_date = marker_header, marker_date
+                elif not ambiguous or not (pending_exercise or current_exercises):
+                    # A date on its own line: the current session's if it has
+                    # no exercises yet, otherwise the next one's
+                    if current_session and not current_exercises:
+                        session_date = marker_date
+                    else:
+                        pending_date = marker_date
+                    pending_exercise = None
+                    continue
+                elif not pending_exercise:
+                    last_sets = current_exercises[-1]['sets']
+                    tentative_date = (marker_date, last_sets, len(last_sets))
+
+        # Check if this is a workout type header
+        if header is not None:
+            if confirm_date:
+                # The bare "M/D" line before this header was a date, not sets
+                marker_date, last_sets, num_sets = confirm_date
+                del last_sets[num_sets:]
+                pending_date = marker_date
+
+            # Emit previous session if exists
             if current_session and current_exercises:
-                sessions.append({
+                yield {
                     'workout_type': current_session,
-                    'exercises': current_exercises
-                })
+                    'exercises': current_exercises,
+                    'year': session_year,
+                    'month': session_month,
+                    'date_marker': session_date,
+                }
 
             # Start new session
-            current_session = line.rstrip(':').strip()
+            current_session = header.rstrip(':').strip()
             current_exercises = []
+            session_year, session_month = year, month
+            session_date = header_date or pending_date
+            pending_date = None
             pending_exercise = None
 
         elif ':' in line and '/' in line:
             # Exercise with sets on same line (standard format)
-            exercise_raw, is_paused, sets_data = parse_exercise_line(line)
+            exercise_raw, is_paused, sets_data = parse_exercise_line(line, bodyweight)
             if exercise_raw and sets_data:
                 current_exercises.append({
                     'exercise_raw': exercise_raw,
@@ -1153,7 +1416,7 @@ def parse_workout_file(filepath):
         elif '/' in line and ':' not in line and pending_exercise:
             # Sets only - combine with pending exercise name
             combined_line = pending_exercise + ' ' + line
-            exercise_raw, is_paused, sets_data = parse_exercise_line(combined_line)
+            exercise_raw, is_paused, sets_data = parse_exercise_line(combined_line, bodyweight)
             if exercise_raw and sets_data:
                 current_exercises.append({
                     'exercise_raw': exercise_raw,
@@ -1167,32 +1430,37 @@ def parse_workout_file(filepath):
             # Try to add to last exercise if exists
             if current_exercises:
                 # Parse as additional sets
-                sets_raw = re.split(r'[,\s]+', line)
+                sets_raw = SET_SEPARATOR_RE.split(line)
                 sets_raw = [s.strip() for s in sets_raw if s.strip() and '/' in s]
                 last_exercise = current_exercises[-1]
                 exercise_raw = last_exercise['exercise_raw']
-                exercise_standard = EXERCISE_MAPPING.get(exercise_raw, exercise_raw)
+                exercise_standard = standardize_exercise(exercise_raw)
                 for set_str in sets_raw:
-                    parsed = parse_set_string(set_str, exercise_standard, exercise_raw)
+                    parsed = parse_set_string(set_str, exercise_standard, exercise_raw, bodyweight)
                     if parsed:
-                        for _ in range(parsed['repeat_count']):
+                        for _ in range(parsed.repeat_count):
                             last_exercise['sets'].append({
-                                'weight_raw': parsed['weight_raw'],
-                                'weight_lbs': parsed['weight_lbs'],
-                                'reps': parsed['reps'],
-                                'has_extender': parsed['has_extender'],
-                                'is_bodyweight': parsed['is_bodyweight'],
-                                'reps_type': parsed['reps_type'],
+                                'weight_raw': parsed.weight_raw,
+                                'weight_lbs': parsed.weight_lbs,
+                                'reps': parsed.reps,
+                                'has_extender': parsed.has_extender,
+                                'is_bodyweight': parsed.is_bodyweight,
+                                'reps_type': parsed.reps_type,
                             })
 
     # Don't forget last session
     if current_session and current_exercises:
-        sessions.append({
+        yield {
             'workout_type': current_session,
-            'exercises': current_exercises
-        })
+            'exercises': current_exercises,
+            'year': session_year,
+            'month': session_month,
+            'date_marker': session_date,
+        }
 
-    # Estimate dates for sessions
+
+def assign_estimated_dates(sessions, year, month):
+    """Date one month's sessions in order using estimate_dates_for_month."""
     dates = estimate_dates_for_month(year, month, len(sessions))
 
     for i, session in enumerate(sessions):
@@ -1201,127 +1469,280 @@ def parse_workout_file(filepath):
         else:
             # Fallback to end of month
             session['date'] = datetime(year, month, 28)
-        session['year'] = year
-        session['month'] = month
+    return sessions
+
+
+def assign_session_dates(sessions, year, month):
+    """
+    Date one month's sessions, keeping the dates written in the log.
 
+    Sessions with a date_marker get that date. If none has one, the month
+    is dated by assign_estimated_dates as before. Otherwise each run of
+    unmarked sessions is spread evenly between the marked sessions around
+    it (the start or end of the month at the edges). Every session gets a
+    date_is_estimated flag.
+    """
+    anchors = [i for i, session in enumerate(sessions) if session.get('date_marker')]
+    if not anchors:
+        assign_estimated_dates(sessions, year, month)
+        for session in sessions:
+            session['date_is_estimated'] = True
+        return sessions
+
+    month_start = datetime(year, month, 1)
+    next_month = datetime(year + month // 12, month % 12 + 1, 1)
+    bounds = [-1] + anchors + [len(sessions)]
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if hi < len(sessions):
+            sessions[hi]['date'] = sessions[hi]['date_marker']
+            sessions[hi]['date_is_estimated'] = False
+        if hi - lo < 2:
+            continue
+        start = sessions[lo]['date'] if lo >= 0 else month_start - timedelta(days=1)
+        stop = sessions[hi]['date'] if hi < len(sessions) else next_month
+        spacing = max((stop - start).days, 0) / (hi - lo)
+        for step, i in enumerate(range(lo + 1, hi), 1):
+            sessions[i]['date'] = start + timedelta(days=int(spacing * step))
+            sessions[i]['date_is_estimated'] = True
     return sessions
 
 
+def stream_workout_file(filepath, bodyweight=None):
+    """
+    Lazily parse a workout file and yield dated sessions.
+
+    The file is read line by line and never held in memory as a whole.
+    Sessions take the dates written in the log where there are any, and
+    the rest are spread over their month by session count, so sessions are
+    buffered per month only: when the first session of the next month
+    arrives (or the file ends), the finished month is dated from its
+    buffered sessions (assign_session_dates) and yielded. Memory is bounded
+    by one month of sessions regardless of file size.
+    """
+    year, month = parse_month_from_filename(filepath)
+
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        month_key = None
+        month_sessions = []
+        for session in iter_workout_sessions(f, year, month, bodyweight):
+            session_key = (session['year'], session['month'])
+            if session_key != month_key:
+                if month_sessions:
+                    yield from assign_session_dates(month_sessions, *month_key)
+                month_key = session_key
+                month_sessions = []
+            month_sessions.append(session)
+        if month_sessions:
+            yield from assign_session_dates(month_sessions, *month_key)
+
+
+def parse_workout_file(filepath, bodyweight=None):
+    """
+    Parse a single workout file and return list of sessions.
+    Each session is a dict with workout_type, exercises, date,
+    date_is_estimated, year, month and date_marker.
+    """
+    return list(stream_workout_file(filepath, bodyweight))
+
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
 def get_day_of_week(date):
     """Return day name from datetime."""
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    return days[date.weekday()]
+    return DAY_NAMES[date.weekday()]
+
+
+# notes strings indexed by a bitmask of paused (1), bodyweight (2), single_leg (4)
+SET_NOTES = [
+    ', '.join(name for bit, name in ((1, 'paused'), (2, 'bodyweight'), (4, 'single_leg')) if mask & bit)
+    for mask in range(8)
+]
 
 
-def build_training_sets_df(all_sessions):
+def build_training_sets_df(all_sessions, athlete_id=None):
     """
-    Build the training_sets.csv dataframe from parsed sessions.
+    Build the training_sets.csv dataframe from parsed sessions. With an
+    athlete_id the frame starts with an athlete_id column.
+
+    Columns are filled into preallocated typed arrays instead of one dict
+    per set. Date, day of week and workout type are worked out once per
+    session and broadcast to its sets through a set -> session index, and
+    exercise_standard, workout_type and day_of_week are stored as
+    categorical codes.
     """
-    rows = []
-
-    for session in all_sessions:
+    num_rows = sum(len(exercise['sets']) for session in all_sessions for exercise in session['exercises'])
+
+    # Per-set columns
+    session_index = np.empty(num_rows, dtype=np.int64)
+    exercise_index = np.empty(num_rows, dtype=np.int64)
+    weight_raw = np.empty(num_rows, dtype=object)
+    weight_lbs = np.full(num_rows, np.nan)
+    reps = np.full(num_rows, np.nan)
+    set_number = np.empty(num_rows, dtype=np.int64)
+    has_extender = np.empty(num_rows, dtype=bool)
+    notes_mask = np.empty(num_rows, dtype=np.int8)
+
+    # Per-session and per-exercise lookups, computed once
+    session_dates = np.empty(len(all_sessions), dtype=object)
+    session_days = np.empty(len(all_sessions), dtype=np.int8)
+    session_types = np.empty(len(all_sessions), dtype=object)
+    session_estimated = np.empty(len(all_sessions), dtype=bool)
+    exercise_codes = {}
+
+    row = 0
+    for s_idx, session in enumerate(all_sessions):
         date = session['date']
-        workout_type = session['workout_type']
-        day_of_week = get_day_of_week(date)
+        session_dates[s_idx] = date.strftime('%Y-%m-%d')
+        session_days[s_idx] = date.weekday()
+        session_types[s_idx] = session['workout_type']
+        session_estimated[s_idx] = session.get('date_is_estimated', True)
 
         for exercise in session['exercises']:
-            exercise_raw = exercise['exercise_raw']
-            exercise_standard = EXERCISE_MAPPING.get(exercise_raw, exercise_raw)
-            is_paused = exercise['is_paused']
+            e_idx = exercise_codes.setdefault(exercise['exercise_raw'], len(exercise_codes))
+            paused_bit = 1 if exercise['is_paused'] else 0
 
             for set_num, set_data in enumerate(exercise['sets'], 1):
                 # Handle single leg reps (tuple)
-                reps = set_data['reps']
-                if isinstance(reps, tuple):
+                set_reps = set_data['reps']
+                if isinstance(set_reps, tuple):
                     # For single leg, average the two sides
-                    left, right = reps
+                    left, right = set_reps
                     if left is not None and right is not None:
-                        reps = (left + right) / 2
+                        set_reps = (left + right) / 2
                     elif left is not None:
-                        reps = left
+                        set_reps = left
                     elif right is not None:
-                        reps = right
+                        set_reps = right
                     else:
-                        reps = None
-
-                # Calculate volume
-                weight_lbs = set_data['weight_lbs']
-                if weight_lbs is not None and reps is not None:
-                    volume = weight_lbs * reps
-                else:
-                    volume = None
-
-                # Build notes
-                notes = []
-                if is_paused:
-                    notes.append('paused')
-                if set_data['is_bodyweight']:
-                    notes.append('bodyweight')
-                if set_data['reps_type'] == 'single_leg':
-                    notes.append('single_leg')
-
-                rows.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'day_of_week': day_of_week,
-                    'workout_type': workout_type,
-                    'exercise_raw': exercise_raw,
-                    'exercise_standard': exercise_standard,
-                    'weight_raw': set_data['weight_raw'],
-                    'weight_lbs': weight_lbs,
-                    'reps': reps,
-                    'set_number': set_num,
-                    'volume': volume,
-                    'has_extender': set_data['has_extender'],
-                    'machine_position': None,  # Will extract from exercise name if present
-                    'is_synthetic': False,
-                    'notes': ', '.join(notes) if notes else '',
-                })
+                        set_reps = None
+
+                session_index[row] = s_idx
+                exercise_index[row] = e_idx
+                weight_raw[row] = set_data['weight_raw']
+                if set_data['weight_lbs'] is not None:
+                    weight_lbs[row] = set_data['weight_lbs']
+                if set_reps is not None:
+                    reps[row] = set_reps
+                set_number[row] = set_num
+                has_extender[row] = set_data['has_extender']
+                notes_mask[row] = (
+                    paused_bit
+                    | (2 if set_data['is_bodyweight'] else 0)
+                    | (4 if set_data['reps_type'] == 'single_leg' else 0)
+                )
+                row += 1
+
+    # Exercise names are standardized once per distinct raw name
+    exercise_raw_names = np.array(list(exercise_codes), dtype=object)
+    exercise_standard_names = np.array(
+        [standardize_exercise(name) for name in exercise_raw_names], dtype=object
+    )
+
+    # Volume is NaN wherever weight or reps is missing
+    volume = weight_lbs * reps
+
+    sets_df = pd.DataFrame({
+        'date': session_dates[session_index],
+        'day_of_week': pd.Categorical.from_codes(session_days[session_index], categories=DAY_NAMES),
+        'workout_type': _categorical_from_values(session_types[session_index]),
+        'exercise_raw': exercise_raw_names[exercise_index],
+        'exercise_standard': _categorical_from_values(exercise_standard_names[exercise_index]),
+        'weight_raw': weight_raw,
+        'weight_lbs': weight_lbs,
+        'reps': reps,
+        'set_number': set_number,
+        'volume': volume,
+        'has_extender': has_extender,
+        'machine_position': np.full(num_rows, None, dtype=object),  # Will extract from exercise name if present
+        'is_synthetic': np.zeros(num_rows, dtype=bool),
+        'date_is_estimated': session_estimated[session_index],
+        'notes': np.array(SET_NOTES, dtype=object)[notes_mask],
+    })
+    if athlete_id is not None:
+        sets_df.insert(0, 'athlete_id', np.full(num_rows, athlete_id, dtype=object))
+    return sets_df
+
 
-    return pd.DataFrame(rows)
+def _categorical_from_values(values):
+    """Categorical with lexically sorted categories, so groupby order matches plain strings."""
+    categories, codes = np.unique(values.astype(str), return_inverse=True)
+    return pd.Categorical.from_codes(codes.astype(np.int32), categories=categories)
 
 
 def build_training_sessions_df(sets_df):
     """
     Build the training_sessions.csv dataframe from the sets dataframe.
+    Sessions are keyed by (date, workout_type), and by athlete first when
+    sets_df has an athlete_id column; days_since_last is then per athlete.
+
+    Everything is aggregated with built-in groupby reductions. The ordered
+    exercises_list is built in one pass over (session, exercise code) pairs:
+    duplicates are dropped keeping first appearance, the pairs are stably
+    sorted by session, and each session's slice of names is joined once.
     """
-    # Group by date and workout_type
-    sessions = sets_df.groupby(['date', 'workout_type']).agg({
-        'day_of_week': 'first',
-        'exercise_standard': lambda x: ','.join(x.unique()),
-        'set_number': 'count',
-        'volume': 'sum',
-        'weight_lbs': 'mean',
-        'reps': 'mean',
-        'is_synthetic': 'any',
-    }).reset_index()
-
-    sessions.columns = [
-        'date', 'workout_type', 'day_of_week', 'exercises_list',
-        'num_sets', 'total_volume', 'avg_weight', 'avg_reps', 'is_synthetic'
+    # Group by date and workout_type (within athlete)
+    athlete_keys = ['athlete_id'] if 'athlete_id' in sets_df.columns else []
+    grouped = sets_df.groupby(athlete_keys + ['date', 'workout_type'], observed=True, sort=True)
+    sessions = grouped.agg(
+        num_sets=('set_number', 'count'),
+        total_volume=('volume', 'sum'),
+        avg_weight=('weight_lbs', 'mean'),
+        avg_reps=('reps', 'mean'),
+        is_synthetic=('is_synthetic', 'any'),
+        date_is_estimated=('date_is_estimated', 'any'),
+    ).reset_index()
+
+    # Day of week from each session's first set
+    session_ids = grouped.ngroup().to_numpy()
+    _, first_rows = np.unique(session_ids, return_index=True)
+    sessions['day_of_week'] = sets_df['day_of_week'].to_numpy()[first_rows]
+
+    # Exercises per session in order of first appearance
+    exercise_codes, exercise_names = _category_codes(sets_df['exercise_standard'])
+    first_seen = ~pd.DataFrame({'session': session_ids, 'exercise': exercise_codes}).duplicated().to_numpy()
+    unique_sessions = session_ids[first_seen]
+    order = np.argsort(unique_sessions, kind='stable')
+    counts = np.bincount(unique_sessions, minlength=len(sessions))
+    ordered_names = np.asarray(exercise_names, dtype=object)[exercise_codes[first_seen][order]].tolist()
+    bounds = np.concatenate([[0], np.cumsum(counts)]).tolist()
+    sessions['exercises_list'] = [
+        ','.join(ordered_names[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])
     ]
-
-    # Calculate num_exercises
-    sessions['num_exercises'] = sessions['exercises_list'].apply(lambda x: len(x.split(',')))
+    sessions['num_exercises'] = counts
 
     # Estimate session duration (sets * 3 minutes)
     sessions['session_duration_est'] = sessions['num_sets'] * 3
 
     # Calculate days since last session
-    sessions = sessions.sort_values('date')
     sessions['date_dt'] = pd.to_datetime(sessions['date'])
-    sessions['days_since_last'] = sessions['date_dt'].diff().dt.days.fillna(0).astype(int)
+    if athlete_keys:
+        sessions = sessions.sort_values(athlete_keys + ['date'], kind='stable')
+        gaps = sessions.groupby(athlete_keys, observed=True, sort=False)['date_dt'].diff()
+    else:
+        sessions = sessions.sort_values('date')
+        gaps = sessions['date_dt'].diff()
+    sessions['days_since_last'] = gaps.dt.days.fillna(0).astype(int)
     sessions = sessions.drop('date_dt', axis=1)
 
     # Reorder columns
-    sessions = sessions[[
+    sessions = sessions[athlete_keys + [
         'date', 'day_of_week', 'workout_type', 'exercises_list',
         'num_exercises', 'num_sets', 'total_volume', 'avg_weight',
-        'avg_reps', 'session_duration_est', 'days_since_last', 'is_synthetic'
+        'avg_reps', 'session_duration_est', 'days_since_last', 'is_synthetic',
+        'date_is_estimated'
     ]]
 
     return sessions
 
 
+def _category_codes(column):
+    """Return (codes, names) for a column, reusing categorical codes when it has them."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), column.cat.categories
+    return pd.factorize(column)
+
+
 def extract_unique_exercises(all_sessions):
     """
     Extract all unique exercise names found in the data.
@@ -1333,39 +1754,285 @@ def extract_unique_exercises(all_sessions):
     return sorted(exercises)
 
 
-def main():
-    """Main entry point."""
-    # Set console encoding for Windows
-    import sys
-    if sys.platform == 'win32':
-        sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+def parse_workout_files(filepaths, workers=1, bodyweights=None):
+    """
+    Parse a list of workout files and return one list of sessions per file.
+    bodyweights gives each file's athlete bodyweight (None entries, or no
+    list at all, mean STANDARD_BODYWEIGHT).
+
+    With workers > 1 the files are fanned out across a process pool.
+    Executor.map hands results back in submission order, so the merged
+    output is identical to a serial run regardless of which worker
+    finishes first.
+    """
+    filepaths = list(filepaths)
+    bodyweights = [None] * len(filepaths) if bodyweights is None else list(bodyweights)
+    if workers <= 1 or len(filepaths) <= 1:
+        return [parse_workout_file(filepath, bw) for filepath, bw in zip(filepaths, bodyweights)]
+
+    # Batch several files per task so pickling overhead doesn't dominate
+    chunksize = max(1, len(filepaths) // (workers * 4))
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(list(WORKOUT_HEADER_NAMES), dict(EXERCISE_MAPPING))) as pool:
+        for sessions, hits, misses in pool.map(_parse_workout_file_counted, filepaths, bodyweights,
+                                               chunksize=chunksize):
+            results.append(sessions)
+            _worker_set_cache_stats['hits'] += hits
+            _worker_set_cache_stats['misses'] += misses
+    return results
+
+
+def _init_worker(header_names, exercise_mapping):
+    """Give worker processes the same header grammar and aliases as the parent (needed with spawn)."""
+    global WORKOUT_HEADER_RE
+    WORKOUT_HEADER_NAMES[:] = header_names
+    WORKOUT_HEADER_RE = compile_workout_header_pattern(WORKOUT_HEADER_NAMES)
+    added = {alias: standard for alias, standard in exercise_mapping.items()
+             if alias not in EXERCISE_MAPPING or EXERCISE_MAPPING[alias] != standard}
+    if added:
+        add_exercise_aliases(added)
+
+
+def _parse_workout_file_counted(filepath, bodyweight=None):
+    """parse_workout_file plus the set-cache hits/misses it caused (run in worker processes)."""
+    before = _parse_set_cached.cache_info()
+    sessions = parse_workout_file(filepath, bodyweight)
+    after = _parse_set_cached.cache_info()
+    return sessions, after.hits - before.hits, after.misses - before.misses
 
-    print("=" * 60)
-    print("STRENGTH TRAINING DATA PARSER")
-    print("=" * 60)
 
-    # Find all workout files
-    workout_files = list(DATA_DIR.glob("*.txt"))
-    print(f"\nFound {len(workout_files)} workout files")
+# ============================================================================
+# INCREMENTAL PARSE CACHE
+# ============================================================================
 
-    # Parse all files
-    all_sessions = []
-    for filepath in sorted(workout_files):
-        print(f"  Parsing: {filepath.name}")
-        sessions = parse_workout_file(filepath)
+def parser_config_hash(bodyweight=None):
+    """
+    Fingerprint of everything besides the file itself that affects parse output:
+    the parser version, EXERCISE_MAPPING, BARBELL_EXERCISES, the
+    workout header names and the bodyweight used for BW notation.
+    """
+    h = hashlib.sha256()
+    h.update(f"v{PARSER_VERSION}".encode())
+    h.update(f"bw{STANDARD_BODYWEIGHT if bodyweight is None else bodyweight}".encode())
+    h.update(repr(sorted(EXERCISE_MAPPING.items())).encode())
+    h.update(repr(sorted(BARBELL_EXERCISES)).encode())
+    h.update(repr(WORKOUT_HEADER_NAMES).encode())
+    return h.hexdigest()
+
+
+def _cache_entry_path(filepath, cache_dir):
+    """One cache file per source path, so an edited month replaces its old entry."""
+    key = hashlib.sha256(str(Path(filepath).resolve()).encode()).hexdigest()[:32]
+    return Path(cache_dir) / f"{key}.pkl"
+
+
+def load_cached_sessions(filepath, content_hash, config_hash, cache_dir):
+    """
+    Return the cached sessions for filepath, or None if there is no entry or
+    the entry was built from different file contents or parser configuration.
+    """
+    entry_path = _cache_entry_path(filepath, cache_dir)
+    try:
+        with open(entry_path, 'rb') as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+
+    if entry.get('content_hash') != content_hash or entry.get('config_hash') != config_hash:
+        return None
+    return entry['sessions']
+
+
+def store_cached_sessions(filepath, content_hash, config_hash, sessions, cache_dir):
+    """Write parsed sessions to the cache (atomically, via a temp file)."""
+    entry_path = _cache_entry_path(filepath, cache_dir)
+    entry_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = entry_path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({
+            'source': str(filepath),
+            'content_hash': content_hash,
+            'config_hash': config_hash,
+            'sessions': sessions,
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, entry_path)
+
+
+def load_workout_files(filepaths, workers=1, cache_dir=None, bodyweights=None):
+    """
+    Parse workout files, reusing cached results for files whose contents and
+    parser configuration (including the file's bodyweight) are unchanged.
+
+    Returns (sessions_per_file, cached_flags), both in the order of filepaths.
+    With cache_dir=None every file is parsed.
+    """
+    filepaths = list(filepaths)
+    bodyweights = [None] * len(filepaths) if bodyweights is None else list(bodyweights)
+    if cache_dir is None:
+        return parse_workout_files(filepaths, workers, bodyweights), [False] * len(filepaths)
+
+    config_hashes = {bw: parser_config_hash(bw) for bw in set(bodyweights)}
+    content_hashes = [file_content_hash(fp) for fp in filepaths]
+    results = [
+        load_cached_sessions(fp, content_hash, config_hashes[bw], cache_dir)
+        for fp, content_hash, bw in zip(filepaths, content_hashes, bodyweights)
+    ]
+    cached_flags = [r is not None for r in results]
+
+    # Only new or edited files are re-parsed
+    misses = [i for i, hit in enumerate(cached_flags) if not hit]
+    parsed = parse_workout_files([filepaths[i] for i in misses], workers, [bodyweights[i] for i in misses])
+    for i, sessions in zip(misses, parsed):
+        results[i] = sessions
+        store_cached_sessions(filepaths[i], content_hashes[i], config_hashes[bodyweights[i]], sessions, cache_dir)
+
+    return results, cached_flags
+
+
+# ============================================================================
+# MULTI-ATHLETE LAYOUT
+# ============================================================================
+
+# Optional per-athlete settings file inside each athlete folder
+ATHLETE_PROFILE = "athlete.json"
+
+
+def discover_athletes(data_dir):
+    """
+    athlete_id -> sorted *.txt logs for every subfolder of data_dir that
+    holds logs (DATA_DIR/<athlete_id>/*.txt), in athlete_id order. Empty
+    for the single-lifter layout.
+    """
+    athletes = {}
+    for folder in sorted(Path(data_dir).iterdir()):
+        if folder.is_dir():
+            logs = sorted(folder.glob("*.txt"))
+            if logs:
+                athletes[folder.name] = logs
+    return athletes
+
+
+def load_athlete_bodyweight(athlete_dir):
+    """Bodyweight (lbs) from athlete_dir/athlete.json, or None if the athlete has none on file."""
+    path = Path(athlete_dir) / ATHLETE_PROFILE
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        profile = json.load(f)
+    bodyweight = profile.get('bodyweight_lbs') if isinstance(profile, dict) else None
+    if bodyweight is None:
+        return None
+    if isinstance(bodyweight, bool) or not isinstance(bodyweight, (int, float)) or bodyweight <= 0:
+        raise ValueError(f"{path}: bodyweight_lbs must be a positive number, got {bodyweight!r}")
+    return float(bodyweight)
+
+
+def parse_athletes(athletes, data_dir, workers=1, cache_dir=None):
+    """
+    Parse the logs of several athletes in one pass (files from every athlete
+    share the worker pool). Returns athlete_id -> (sessions, bodyweight,
+    num_files, num_cached).
+    """
+    filepaths, bodyweights, owners = [], [], []
+    athlete_bodyweights = {}
+    for athlete_id, logs in athletes.items():
+        athlete_bodyweights[athlete_id] = load_athlete_bodyweight(Path(data_dir) / athlete_id)
+        filepaths.extend(logs)
+        bodyweights.extend([athlete_bodyweights[athlete_id]] * len(logs))
+        owners.extend([athlete_id] * len(logs))
+
+    results, cached_flags = load_workout_files(filepaths, workers, cache_dir, bodyweights)
+    parsed = {athlete_id: ([], athlete_bodyweights[athlete_id], 0, 0) for athlete_id in athletes}
+    for athlete_id, sessions, cached in zip(owners, results, cached_flags):
+        all_sessions, bodyweight, num_files, num_cached = parsed[athlete_id]
         all_sessions.extend(sessions)
-        print(f"    -> {len(sessions)} sessions found")
+        parsed[athlete_id] = (all_sessions, bodyweight, num_files + 1, num_cached + cached)
+    return parsed
 
-    print(f"\nTotal sessions parsed: {len(all_sessions)}")
 
-    # Extract unique exercises for review
+def write_athlete_tables(athlete_id, sessions, output_dir, formats):
+    """
+    Build one athlete's training_sets / training_sessions frames and replace
+    that athlete's partitions under output_dir/<table>/. Returns
+    (sets_df, sessions_df, written paths).
+    """
+    sets_df = build_training_sets_df(sessions, athlete_id)
+    sessions_df = build_training_sessions_df(sets_df)
+    written = []
+    for name, df in (("training_sets", sets_df), ("training_sessions", sessions_df)):
+        written.extend(write_athlete_partitions(df, Path(output_dir) / name, athlete_id, formats))
+    return sets_df, sessions_df, written
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Parse workout logs into analysis-ready CSV files.")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of processes used to parse files (0 = one per CPU core, default: 1)",
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, default=CACHE_DIR,
+        help=f"Directory for cached per-file parse results (default: {CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Re-parse every file and leave the cache untouched",
+    )
+    parser.add_argument(
+        "--header-names", type=Path,
+        help="Text file with extra workout split names (one per line) to treat as session headers",
+    )
+    parser.add_argument(
+        "--alias-overlay", type=Path,
+        help="JSON file of extra exercise aliases (alias -> standard name) applied on top of "
+             "EXERCISE_MAPPING; --auto-apply writes accepted suggestions here",
+    )
+    parser.add_argument(
+        "--auto-apply", type=float, metavar="SCORE",
+        help="Write the best suggestion for each unmapped exercise scoring at least SCORE "
+             "(0-1) to the alias overlay; takes effect on the next run",
+    )
+    parser.add_argument(
+        "--format", nargs="+", choices=sorted(OUTPUT_FORMATS), default=["csv"],
+        help="Output format(s); parquet/feather store typed columns and need pyarrow (default: csv)",
+    )
+    parser.add_argument(
+        "--data-dir", type=Path,
+        help=f"Folder with the *.txt logs, or one subfolder of logs per athlete (default: {DATA_DIR})",
+    )
+    parser.add_argument(
+        "--output-dir", type=Path,
+        help=f"Folder for the output tables (default: {OUTPUT_DIR})",
+    )
+    parser.add_argument(
+        "--athlete", nargs="+", metavar="ATHLETE_ID",
+        help="With one folder per athlete: parse and rewrite only these athletes' partitions",
+    )
+    parser.add_argument(
+        "--pr-index", type=Path,
+        help="PR index JSON (see progression.py) to update with the parsed sets",
+    )
+    args = parser.parse_args(argv)
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+    if args.workers < 0:
+        parser.error("--workers must be >= 0")
+    if args.auto_apply is not None and not args.alias_overlay:
+        parser.error("--auto-apply needs --alias-overlay to write to")
+    return args
+
+
+def report_unique_exercises(all_sessions, args):
+    """Print every raw exercise name with its mapping, then suggestions for the unmapped ones."""
     print("\n" + "=" * 60)
     print("UNIQUE EXERCISES FOUND")
     print("=" * 60)
     unique_exercises = extract_unique_exercises(all_sessions)
     unmapped = []
     for ex in unique_exercises:
-        mapped = EXERCISE_MAPPING.get(ex, None)
+        mapped = EXERCISE_ALIASES.lookup(ex)
         if mapped:
             print(f"  {ex} -> {mapped}")
         else:
@@ -1374,6 +2041,133 @@ def main():
 
     if unmapped:
         print(f"\n{len(unmapped)} unmapped exercises found!")
+        suggestions = SuggestionIndex(EXERCISE_MAPPING)
+        print("Suggestions:")
+        for ex in unmapped:
+            candidates = suggestions.suggest(ex, limit=3)
+            shown = ", ".join(f"{name} ({score:.2f})" for name, score, _ in candidates) or "none"
+            print(f"  {ex} -> {shown}")
+        if args.auto_apply is not None:
+            applied = auto_matches(suggestions, unmapped, args.auto_apply)
+            if applied:
+                save_alias_overlay(args.alias_overlay, applied)
+            print(f"Auto-applied {len(applied)} suggestion(s) scoring >= {args.auto_apply} "
+                  f"to {args.alias_overlay} (used from the next run)")
+
+
+def report_pr_index(path, sets_df):
+    """Rebuild the parsed athletes' PR histories in the index at path and print what changed."""
+    index, added = update_pr_index(path, sets_df)
+    print(f"\nPR index: {added} new PR entries, {len(index)} exercises -> {path}")
+
+
+def main_athletes(args, athletes, output_dir, cache_dir):
+    """Athlete layout: parse the selected athletes and rewrite only their partitions."""
+    selected = args.athlete or list(athletes)
+    unknown = sorted(set(selected) - set(athletes))
+    if unknown:
+        print(f"\nNo logs found for athlete(s): {', '.join(unknown)}")
+        return 2
+    athletes = {athlete_id: athletes[athlete_id] for athlete_id in selected}
+    print(f"\nFound {len(athletes)} athletes, {sum(len(logs) for logs in athletes.values())} workout files")
+
+    parsed = parse_athletes(athletes, args.data_dir or DATA_DIR, args.workers, cache_dir)
+    for athlete_id, (sessions, bodyweight, num_files, num_cached) in parsed.items():
+        bodyweight = f"{bodyweight:g} lbs" if bodyweight is not None else f"{STANDARD_BODYWEIGHT} lbs (standard)"
+        cached = f", {num_cached} cached" if cache_dir is not None else ""
+        print(f"  {athlete_id}: {num_files} files{cached} -> {len(sessions)} sessions (bodyweight {bodyweight})")
+
+    all_sessions = [session for sessions, _, _, _ in parsed.values() for session in sessions]
+    print(f"\nTotal sessions parsed: {len(all_sessions)}")
+    report_unique_exercises(all_sessions, args)
+
+    print("\n" + "=" * 60)
+    print("WRITING ATHLETE PARTITIONS")
+    print("=" * 60)
+    total_sets = total_sessions = total_files = 0
+    athlete_sets = []
+    for athlete_id, (sessions, _, _, _) in parsed.items():
+        sets_df, sessions_df, written = write_athlete_tables(athlete_id, sessions, output_dir, args.format)
+        if args.pr_index:
+            athlete_sets.append(sets_df)
+        total_sets += len(sets_df)
+        total_sessions += len(sessions_df)
+        total_files += len(written)
+        print(f"  {athlete_id}: {len(sessions_df)} sessions, {len(sets_df)} sets -> {len(written)} partition files")
+    print(f"\nWrote {total_files} files under {output_dir} "
+          f"({total_sessions} sessions, {total_sets} sets)")
+    if athlete_sets:
+        report_pr_index(args.pr_index, pd.concat(athlete_sets, ignore_index=True))
+
+    print("\n" + "=" * 60)
+    print("DONE!")
+    print("=" * 60)
+    return 0
+
+
+def main(argv=None):
+    """Main entry point."""
+    args = parse_args(argv)
+
+    # Set console encoding for Windows
+    if sys.platform == 'win32':
+        sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+    print("=" * 60)
+    print("STRENGTH TRAINING DATA PARSER")
+    print("=" * 60)
+
+    if args.header_names:
+        extra_headers = load_workout_header_names(args.header_names)
+        add_workout_header_names(extra_headers)
+        print(f"\nLoaded {len(extra_headers)} extra workout header names from {args.header_names}")
+    if args.alias_overlay:
+        overlay = load_alias_overlay(args.alias_overlay)
+        add_exercise_aliases(overlay)
+        print(f"\nLoaded {len(overlay)} exercise aliases from {args.alias_overlay}")
+
+    data_dir = args.data_dir or DATA_DIR
+    if not data_dir.is_dir():
+        print(f"\nData folder not found: {data_dir} (pass --data-dir)")
+        return 2
+    output_dir = Path(args.output_dir or OUTPUT_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir = None if args.no_cache else args.cache_dir
+
+    # One folder per athlete -> partitioned per-athlete outputs
+    athletes = discover_athletes(data_dir)
+    if athletes:
+        return main_athletes(args, athletes, output_dir, cache_dir)
+    if args.athlete:
+        print(f"\n--athlete needs one log folder per athlete under {data_dir}")
+        return 2
+
+    # Find all workout files
+    workout_files = sorted(data_dir.glob("*.txt"))
+    print(f"\nFound {len(workout_files)} workout files")
+    if args.workers > 1:
+        print(f"Parsing with {args.workers} worker processes")
+
+    # Parse all files (merged in sorted file order), unchanged files come from the cache
+    results, cached_flags = load_workout_files(workout_files, args.workers, cache_dir)
+    all_sessions = []
+    for filepath, sessions, cached in zip(workout_files, results, cached_flags):
+        print(f"  Parsing: {filepath.name}" + (" (cached)" if cached else ""))
+        all_sessions.extend(sessions)
+        print(f"    -> {len(sessions)} sessions found")
+    if cache_dir is not None:
+        num_cached = sum(cached_flags)
+        print(f"Cache: {num_cached} of {len(workout_files)} files unchanged, "
+              f"{len(workout_files) - num_cached} re-parsed")
+    set_cache = parse_set_cache_info()
+    lookups = set_cache['hits'] + set_cache['misses']
+    if lookups:
+        print(f"Set notation cache: {set_cache['hits']} hits, {set_cache['misses']} misses "
+              f"({set_cache['hits'] / lookups:.1%} hit rate)")
+
+    print(f"\nTotal sessions parsed: {len(all_sessions)}")
+
+    report_unique_exercises(all_sessions, args)
 
     # Build dataframes
     print("\n" + "=" * 60)
@@ -1386,16 +2180,13 @@ def main():
     sessions_df = build_training_sessions_df(sets_df)
     print(f"Training sessions: {len(sessions_df)} rows")
 
-    # Export to CSV
-    sets_output = OUTPUT_DIR / "training_sets.csv"
-    sessions_output = OUTPUT_DIR / "training_sessions.csv"
-
-    sets_df.to_csv(sets_output, index=False)
-    sessions_df.to_csv(sessions_output, index=False)
-
+    # Export in each requested format
     print(f"\nExported:")
-    print(f"  {sets_output}")
-    print(f"  {sessions_output}")
+    for fmt in args.format:
+        for name, df in (("training_sets", sets_df), ("training_sessions", sessions_df)):
+            print(f"  {write_table(df, output_dir / name, fmt)}")
+    if args.pr_index:
+        report_pr_index(args.pr_index, sets_df)
 
     # Summary statistics
     print("\n" + "=" * 60)
@@ -1430,4 +2221,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
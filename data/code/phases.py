@@ -0,0 +1,491 @@
+"""
+Training Phase Segmentation
+K-Means clustering of sessions into training phases (accumulation, intensity, deload, ...).
+
+session_features() turns a training_sessions table into one row of
+features per session: total volume, trailing 7- and 28-day volume (per
+athlete when the table has athlete_id), avg_weight, avg_reps, num_sets,
+num_exercises, and the exercise mix as the share of the session spent on
+each of the most common exercises. Missing values are filled with the
+column median and every column is standardized; the result is float32 so
+1M sessions with ~30 features take ~120 MB.
+
+MiniBatchKMeans (Sculley 2010) seeds its centers with k-means++ on a sample
+and then updates them from random batches with per-center learning rates
+1 / (points seen), so each step costs O(batch x k x features) however many
+sessions there are. Distances are computed for a whole block at once as
+|x|^2 - 2 x.c + |c|^2 (one matrix product), and labeling / inertia run in
+row blocks sized by memory_mb, so memory stays within that budget on top
+of the feature matrix.
+
+k_sweep() fits one model per k and scores it with the inertia and the mean
+silhouette of a random sample of sessions (exact silhouette is O(n^2)).
+With workers > 1 the k values run in a process pool; the features are
+written once to a temporary .npy file that every worker memory-maps. The
+workers are spawned with OMP/OpenBLAS/MKL_NUM_THREADS=1 so numpy loads in
+them with a single BLAS thread each instead of every worker starting one
+BLAS thread per core.
+
+Usage:
+    python phases.py [SESSIONS_FILE] [--k K | --k-range KMIN KMAX] [--workers N]
+                     [--batch-size B] [--mix-exercises M] [--memory-mb MB] [--seed S]
+                     [--output CSV]
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from training_io import iter_table_chunks
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+
+# Numeric session columns used as features as they are
+NUMERIC_FEATURES = ['total_volume', 'avg_weight', 'avg_reps', 'num_sets', 'num_exercises']
+
+# Trailing windows (days) for the rolling volume features
+ROLLING_WINDOWS = [7, 28]
+
+# Most common exercises given their own exercise-mix column
+DEFAULT_MIX_EXERCISES = 20
+
+DEFAULT_BATCH_SIZE = 4096
+DEFAULT_MAX_ITER = 300
+DEFAULT_TOL = 1e-4
+
+# Iterations in a row with small center moves before stopping early
+CONVERGED_ITERATIONS = 10
+
+# Budget for the distance blocks (labeling, inertia, silhouette)
+DEFAULT_MEMORY_MB = 256
+
+# Sessions scored by the sampled silhouette
+DEFAULT_SILHOUETTE_SAMPLE = 10_000
+
+DEFAULT_K_RANGE = (2, 8)
+
+# Set to 1 in the environment k_sweep's workers are spawned with
+BLAS_THREAD_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']
+
+SessionFeatures = namedtuple('SessionFeatures', ['X', 'names', 'mean', 'scale'])
+
+
+# ============================================================================
+# FEATURES
+# ============================================================================
+
+def rolling_volume(df, window_days):
+    """
+    Volume over the trailing window_days days up to and including each
+    session's day (per athlete when df has athlete_id), via a cumulative sum
+    and a searchsorted per row instead of a rolling groupby. The window is
+    by date, so every session on a day gets that whole day's volume and row
+    order does not matter. NaN for undated rows.
+    """
+    days = pd.to_datetime(df['date'], errors='coerce').to_numpy().astype('datetime64[D]')
+    valid = ~np.isnat(days)
+    if 'athlete_id' in df.columns:
+        athletes = pd.factorize(df['athlete_id'])[0].astype(np.int64)
+    else:
+        athletes = np.zeros(len(df), dtype=np.int64)
+    volume = pd.to_numeric(df['total_volume'], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    rows = np.flatnonzero(valid)
+    # Athlete in the high part, day in the low part: one sorted key per row
+    key = athletes[rows] * (1 << 32) + days[rows].astype(np.int64)
+    order = np.argsort(key, kind='stable')
+    key = key[order]
+    totals = np.concatenate([[0.0], np.cumsum(volume[rows][order])])
+    start = np.searchsorted(key, key - window_days, side='right')
+    end = np.searchsorted(key, key, side='right')
+    result = np.full(len(df), np.nan)
+    result[rows[order]] = totals[end] - totals[start]
+    return result
+
+
+def exercise_mix(exercises, num_exercises=DEFAULT_MIX_EXERCISES):
+    """
+    (share matrix, exercise names): for each of the num_exercises most
+    common exercises, the share of the session's exercises it makes up,
+    plus an 'other' column. Sessions repeat the same few exercise lists,
+    so each distinct list is split once and its row of shares is reused.
+    """
+    list_codes, lists = pd.factorize(exercises.fillna('').astype(str))
+    names = pd.Series(lists, dtype=object).str.split(',').explode().str.strip()
+    names = names[names != '']
+    list_rows = names.index.to_numpy()
+    name_codes, vocabulary = pd.factorize(names)
+    # Sessions per exercise: each distinct list counts as often as it occurs
+    occurrences = np.bincount(list_codes, minlength=len(lists))
+    counts = np.bincount(name_codes, weights=occurrences[list_rows], minlength=len(vocabulary))
+    top = sorted(range(len(vocabulary)), key=lambda i: (-counts[i], vocabulary[i]))[:num_exercises]
+
+    column = np.full(len(vocabulary), len(top), dtype=np.int64)  # everything else
+    column[top] = np.arange(len(top))
+    shares = np.zeros((len(lists), len(top) + 1), dtype=np.float32)
+    np.add.at(shares, (list_rows, column[name_codes]), 1)
+    totals = shares.sum(axis=1, keepdims=True)
+    np.divide(shares, totals, out=shares, where=totals > 0)
+    return shares[list_codes], [vocabulary[i] for i in top] + ['other']
+
+
+def session_features(df, mix_exercises=DEFAULT_MIX_EXERCISES):
+    """Standardized float32 feature matrix of a training_sessions frame, as SessionFeatures."""
+    columns = [pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) for col in NUMERIC_FEATURES]
+    names = list(NUMERIC_FEATURES)
+    for window in ROLLING_WINDOWS:
+        columns.append(rolling_volume(df, window))
+        names.append(f"volume_{window}d")
+    numeric = np.column_stack(columns)
+    mix, mix_names = exercise_mix(df['exercises_list'], mix_exercises)
+    names += [f"mix: {name}" for name in mix_names]
+
+    X = np.empty((len(df), numeric.shape[1] + mix.shape[1]), dtype=np.float32)
+    mean = np.empty(X.shape[1])
+    scale = np.empty(X.shape[1])
+    for j in range(X.shape[1]):
+        col = numeric[:, j] if j < numeric.shape[1] else mix[:, j - numeric.shape[1]].astype(float)
+        missing = np.isnan(col)
+        if missing.any():
+            col = np.where(missing, np.nanmedian(col) if (~missing).any() else 0.0, col)
+        mean[j] = col.mean() if len(col) else 0.0
+        std = col.std() if len(col) else 0.0
+        scale[j] = std if std > 0 else 1.0
+        X[:, j] = (col - mean[j]) / scale[j]
+    return SessionFeatures(X, names, mean, scale)
+
+
+# ============================================================================
+# MINI-BATCH K-MEANS
+# ============================================================================
+
+def squared_distances(X, centers, x_sq=None):
+    """(n, k) squared Euclidean distances as |x|^2 - 2 x.c + |c|^2, clipped at 0."""
+    X = np.asarray(X, dtype=np.float64)
+    if x_sq is None:
+        x_sq = np.einsum('ij,ij->i', X, X)
+    c_sq = np.einsum('ij,ij->i', centers, centers)
+    d = x_sq[:, None] - 2.0 * (X @ centers.T) + c_sq[None, :]
+    np.maximum(d, 0, out=d)
+    return d
+
+
+def block_rows(memory_mb, width):
+    """Rows per block so a (rows, width) float64 block plus its inputs fit in memory_mb."""
+    return max(256, int(memory_mb * 2 ** 20 // (8 * (width + 1) * 3)))
+
+
+def nearest_centers(X, centers, memory_mb=DEFAULT_MEMORY_MB):
+    """(labels, squared distance to the nearest center) for every row, in row blocks."""
+    labels = np.empty(len(X), dtype=np.int32)
+    dist = np.empty(len(X))
+    step = block_rows(memory_mb, len(centers) + X.shape[1])
+    for start in range(0, len(X), step):
+        d = squared_distances(X[start:start + step], centers)
+        labels[start:start + step] = d.argmin(axis=1)
+        dist[start:start + step] = d[np.arange(len(d)), labels[start:start + step]]
+    return labels, dist
+
+
+def kmeans_plus_plus(X, k, rng):
+    """k-means++ seeding: each next center drawn with probability proportional to D^2."""
+    X = np.asarray(X, dtype=np.float64)
+    centers = np.empty((k, X.shape[1]))
+    centers[0] = X[rng.integers(len(X))]
+    closest = squared_distances(X, centers[:1])[:, 0]
+    for i in range(1, k):
+        total = closest.sum()
+        pick = rng.choice(len(X), p=closest / total) if total > 0 else rng.integers(len(X))
+        centers[i] = X[pick]
+        closest = np.minimum(closest, squared_distances(X, centers[i:i + 1])[:, 0])
+    return centers
+
+
+class MiniBatchKMeans:
+    """Mini-batch K-Means; fit() sets centers_, labels_, inertia_ and n_iter_."""
+
+    def __init__(self, k, batch_size=DEFAULT_BATCH_SIZE, max_iter=DEFAULT_MAX_ITER, tol=DEFAULT_TOL,
+                 seed=0, memory_mb=DEFAULT_MEMORY_MB):
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        self.k = k
+        self.batch_size = batch_size
+        self.max_iter = max_iter
+        self.tol = tol
+        self.seed = seed
+        self.memory_mb = memory_mb
+
+    def fit(self, X):
+        n = len(X)
+        if n < self.k:
+            raise ValueError(f"Need at least k={self.k} sessions, got {n}")
+        rng = np.random.default_rng(self.seed)
+        sample = np.asarray(X[np.sort(rng.choice(n, min(n, max(10 * self.k, 3 * self.batch_size)),
+                                                 replace=False))], dtype=np.float64)
+        centers = kmeans_plus_plus(sample, self.k, rng)
+        # Stop once centers move less than tol x the average feature variance
+        threshold = self.tol * float(sample.var(axis=0).mean()) * self.k
+        counts = np.zeros(self.k)
+
+        quiet = 0
+        for iteration in range(1, self.max_iter + 1):
+            batch = np.asarray(X[np.sort(rng.integers(0, n, min(self.batch_size, n)))], dtype=np.float64)
+            d = squared_distances(batch, centers)
+            labels = d.argmin(axis=1)
+            onehot = np.zeros((len(batch), self.k))
+            onehot[np.arange(len(batch)), labels] = 1
+            hits = onehot.sum(axis=0)
+            sums = onehot.T @ batch
+            counts += hits
+            hit = hits > 0
+            rate = np.zeros(self.k)
+            rate[hit] = hits[hit] / counts[hit]
+            moved = np.zeros_like(centers)
+            moved[hit] = (sums[hit] / hits[hit, None] - centers[hit]) * rate[hit, None]
+            centers += moved
+
+            # Centers no batch has reached yet restart at the worst-served points
+            empty = np.flatnonzero(counts == 0)
+            if len(empty) and iteration % 10 == 0:
+                worst = np.argsort(d[np.arange(len(batch)), labels])[::-1][:len(empty)]
+                centers[empty[:len(worst)]] = batch[worst]
+
+            quiet = quiet + 1 if float((moved ** 2).sum()) <= threshold else 0
+            if quiet >= CONVERGED_ITERATIONS:
+                break
+
+        self.centers_ = centers
+        self.n_iter_ = iteration
+        self.labels_, dist = nearest_centers(X, centers, self.memory_mb)
+        self.inertia_ = float(dist.sum())
+        return self
+
+    def predict(self, X):
+        """Nearest-center label of every row."""
+        return nearest_centers(X, self.centers_, self.memory_mb)[0]
+
+
+# ============================================================================
+# MODEL SELECTION
+# ============================================================================
+
+def sampled_silhouette(X, labels, sample_size=DEFAULT_SILHOUETTE_SAMPLE, seed=0, memory_mb=DEFAULT_MEMORY_MB):
+    """
+    Mean silhouette coefficient of a random sample of rows (all rows if
+    there are fewer), computed from the sample's pairwise distances in row
+    blocks. Rows alone in their cluster score 0; NaN if the sample has fewer
+    than two clusters.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    idx = np.sort(rng.choice(n, min(n, sample_size), replace=False))
+    S = np.asarray(X[idx], dtype=np.float64)
+    L = np.asarray(labels)[idx]
+    clusters, L = np.unique(L, return_inverse=True)
+    if len(clusters) < 2:
+        return math.nan
+    onehot = np.zeros((len(S), len(clusters)))
+    onehot[np.arange(len(S)), L] = 1
+    sizes = onehot.sum(axis=0)
+    s_sq = np.einsum('ij,ij->i', S, S)
+
+    scores = np.empty(len(S))
+    step = block_rows(memory_mb, len(S))
+    for start in range(0, len(S), step):
+        stop = min(start + step, len(S))
+        rows = np.arange(stop - start)
+        own = L[start:stop]
+        dist = np.sqrt(squared_distances(S[start:stop], S, s_sq[start:stop]))
+        sums = dist @ onehot
+        own_size = sizes[own]
+        a = np.divide(sums[rows, own], own_size - 1, out=np.zeros(len(rows)), where=own_size > 1)
+        means = sums / sizes
+        means[rows, own] = np.inf
+        b = means.min(axis=1)
+        score = (b - a) / np.maximum(a, b)
+        score[own_size <= 1] = 0.0
+        scores[start:stop] = np.nan_to_num(score)
+    return float(scores.mean())
+
+
+def _evaluate_k(X, k, params, sample_size, seed):
+    start = time.perf_counter()
+    model = MiniBatchKMeans(k, seed=seed, **params).fit(X)
+    silhouette = sampled_silhouette(X, model.labels_, sample_size, seed, params.get('memory_mb', DEFAULT_MEMORY_MB))
+    return {
+        'k': k,
+        'inertia': model.inertia_,
+        'silhouette': silhouette,
+        'iterations': model.n_iter_,
+        'seconds': time.perf_counter() - start,
+        'centers': model.centers_,
+    }
+
+
+def _evaluate_k_mapped(path, k, params, sample_size, seed):
+    """_evaluate_k on the memory-mapped feature file (run in worker processes)."""
+    return _evaluate_k(np.load(path, mmap_mode='r'), k, params, sample_size, seed)
+
+
+def _map_single_threaded(fn, workers, *iterables):
+    """
+    pool.map(fn, *iterables) in freshly spawned processes whose environment
+    caps BLAS at one thread. The cap has to be in place before numpy is
+    imported (OpenBLAS and MKL size their thread pools on load), so the
+    workers are spawned rather than forked from this already-loaded
+    process, and the variables are set only while they start.
+    """
+    saved = {name: os.environ.get(name) for name in BLAS_THREAD_VARS}
+    os.environ.update({name: '1' for name in BLAS_THREAD_VARS})
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            return list(pool.map(fn, *iterables))
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def k_sweep(X, ks, workers=1, sample_size=DEFAULT_SILHOUETTE_SAMPLE, seed=0, **params):
+    """
+    Fit one MiniBatchKMeans per k in ks and score it. Returns a frame with
+    k, inertia, silhouette, iterations, seconds and the fitted centers,
+    ordered by k. With workers > 1 the fits run in a process pool over a
+    memory-mapped copy of X, one BLAS thread per worker.
+    """
+    ks = sorted(ks)
+    if workers <= 1 or len(ks) <= 1:
+        results = [_evaluate_k(X, k, params, sample_size, seed) for k in ks]
+    else:
+        with tempfile.TemporaryDirectory(prefix='phases_') as tmp:
+            path = Path(tmp) / 'features.npy'
+            np.save(path, np.ascontiguousarray(X, dtype=np.float32))
+            results = _map_single_threaded(_evaluate_k_mapped, min(workers, len(ks)), [str(path)] * len(ks), ks,
+                                           [params] * len(ks), [sample_size] * len(ks), [seed] * len(ks))
+    return pd.DataFrame(results, columns=['k', 'inertia', 'silhouette', 'iterations', 'seconds', 'centers'])
+
+
+def phase_profiles(df, features, labels, k):
+    """
+    One row per phase: sessions, share, first/last date and the mean of each
+    numeric feature in original units, plus the phase's three most
+    characteristic exercises (highest mean share).
+    """
+    numeric = [i for i, name in enumerate(features.names) if not name.startswith('mix: ')]
+    mix = [i for i, name in enumerate(features.names) if name.startswith('mix: ') and name != 'mix: other']
+    dates = pd.to_datetime(df['date'], errors='coerce')
+    counts = np.bincount(labels, minlength=k)
+
+    rows = []
+    for phase in range(k):
+        members = labels == phase
+        values = features.X[members].astype(np.float64) * features.scale + features.mean
+        row = {
+            'phase': phase,
+            'sessions': int(counts[phase]),
+            'share': counts[phase] / max(len(labels), 1),
+            'first_date': dates[members].min(),
+            'last_date': dates[members].max(),
+        }
+        for i in numeric:
+            row[features.names[i]] = values[:, i].mean() if len(values) else math.nan
+        if len(values) and mix:
+            top = np.argsort(-values[:, mix].mean(axis=0), kind='stable')[:3]
+            row['top_exercises'] = ', '.join(features.names[mix[j]][len('mix: '):] for j in top)
+        else:
+            row['top_exercises'] = ''
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def load_sessions(path):
+    """The columns phases needs from a training_sessions file, read in chunks."""
+    first = next(iter_table_chunks(path, chunksize=1), None)
+    if first is None:
+        return pd.DataFrame(columns=['date', 'exercises_list'] + NUMERIC_FEATURES)
+    wanted = ['date', 'workout_type', 'exercises_list'] + NUMERIC_FEATURES
+    columns = (['athlete_id'] if 'athlete_id' in first.columns else []) + wanted
+    return pd.concat(iter_table_chunks(path, columns=columns), ignore_index=True)
+
+
+def main(argv=None):
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Segment training sessions into phases with K-Means.")
+    parser.add_argument("path", nargs="?", type=Path, default=DATA_DIR / "training_sessions.csv",
+                        help="training_sessions file (.csv, .parquet or .feather)")
+    choice = parser.add_mutually_exclusive_group()
+    choice.add_argument("--k", type=int, help="Number of phases (skips the k sweep)")
+    choice.add_argument("--k-range", type=int, nargs=2, metavar=("KMIN", "KMAX"), default=list(DEFAULT_K_RANGE),
+                        help=f"k values to sweep, best silhouette wins (default: {DEFAULT_K_RANGE[0]} {DEFAULT_K_RANGE[1]})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for the k sweep (0 = one per CPU core, default: 1)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--mix-exercises", type=int, default=DEFAULT_MIX_EXERCISES,
+                        help=f"Exercises with their own exercise-mix feature (default: {DEFAULT_MIX_EXERCISES})")
+    parser.add_argument("--silhouette-sample", type=int, default=DEFAULT_SILHOUETTE_SAMPLE)
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_MB,
+                        help=f"Budget for distance blocks in MB (default: {DEFAULT_MEMORY_MB})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write each session's phase to this CSV")
+    args = parser.parse_args(argv)
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+    ks = [args.k] if args.k else list(range(args.k_range[0], args.k_range[1] + 1))
+    if min(ks) < 2:
+        parser.error("k must be at least 2")
+
+    df = load_sessions(args.path)
+    if len(df) < max(ks):
+        parser.error(f"{args.path} has {len(df)} sessions, fewer than k={max(ks)}")
+    features = session_features(df, args.mix_exercises)
+    params = {'batch_size': args.batch_size, 'memory_mb': args.memory_mb}
+
+    print("=" * 60)
+    print("TRAINING PHASE SEGMENTATION")
+    print("=" * 60)
+    print(f"Sessions: {len(df)} | Features: {features.X.shape[1]}")
+
+    sweep = k_sweep(features.X, ks, args.workers, args.silhouette_sample, args.seed, **params)
+    print(f"\n{'k':>3} {'inertia':>14} {'silhouette':>11} {'iterations':>11} {'seconds':>8}")
+    for row in sweep.itertuples(index=False):
+        print(f"{row.k:>3} {row.inertia:>14,.1f} {row.silhouette:>11.3f} {row.iterations:>11} {row.seconds:>8.2f}")
+    best = sweep.loc[sweep['silhouette'].fillna(-np.inf).idxmax()]
+    k = int(best['k'])
+    labels = nearest_centers(features.X, best['centers'], args.memory_mb)[0]
+    print(f"\nChosen k = {k} (silhouette {best['silhouette']:.3f})")
+
+    profiles = phase_profiles(df, features, labels, k)
+    for row in profiles.itertuples(index=False):
+        print(f"\nPhase {row.phase}: {row.sessions} sessions ({row.share:.1%}), "
+              f"{row.first_date:%Y-%m-%d} to {row.last_date:%Y-%m-%d}")
+        print(f"  volume {row.total_volume:,.0f} | 28-day volume {row.volume_28d:,.0f} | "
+              f"avg weight {row.avg_weight:.1f} | avg reps {row.avg_reps:.1f} | sets {row.num_sets:.1f}")
+        print(f"  top exercises: {row.top_exercises}")
+
+    if args.output:
+        keys = [col for col in ('athlete_id', 'date', 'workout_type') if col in df.columns]
+        out = df[keys].copy()
+        out['phase'] = labels
+        out.to_csv(args.output, index=False)
+        print(f"\nPhases written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,368 @@
+"""
+Strength Progression
+Estimated one-rep max (e1RM) per set and an incremental personal-record index.
+
+estimated_1rm() applies the Epley or Brzycki formula to whole weight / reps
+arrays at once:
+
+    Epley:   weight x (1 + reps / 30)
+    Brzycki: weight x 36 / (37 - reps)
+
+A single rep is its own 1RM under both. Sets without a positive weight and
+reps (bodyweight placeholders, NA) get NaN, as do Brzycki sets of 37+ reps.
+
+PRIndex keeps, for every exercise (per athlete when the sets have
+athlete_id), its PR history: the days whose best set beat everything logged
+before them, one entry per day, in date order. The current PR is the last entry (O(1)) and the
+PR standing on a given date is a bisect over the entry dates (O(log n)),
+instead of a scan and groupby over the whole sets table. update() folds in
+new sets by recomputing the running max over the stored PRs plus the new
+sets of the exercises they touch, so it costs O(new sets + their PR
+history) and re-adding sets already indexed changes nothing.
+
+The index is saved as JSON (pr_index.json by default); parse_training_data.py
+--pr-index refreshes it after each parse. A parse holds each parsed
+athlete's whole history, and estimated dates move when a month gains a
+session, so update_pr_index rebuilds those athletes' histories
+(PRIndex.replace) instead of folding the sets on top of stale dates.
+
+Usage:
+    python progression.py [SETS_FILE] [--index JSON] [--formula epley|brzycki] [--rebuild]
+                          [--exercise NAME ...] [--athlete ID] [--top N] [--output CSV]
+"""
+
+import argparse
+import json
+import os
+import sys
+from bisect import bisect_right
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from training_io import iter_table_chunks
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+
+INDEX_VERSION = 2
+
+FORMULAS = ('epley', 'brzycki')
+DEFAULT_FORMULA = 'epley'
+
+# Brzycki is undefined from this many reps on
+BRZYCKI_MAX_REPS = 37
+
+SET_COLUMNS = ['date', 'exercise_standard', 'weight_lbs', 'reps']
+
+PR = namedtuple('PR', ['date', 'e1rm', 'weight_lbs', 'reps'])
+
+
+def estimated_1rm(weight, reps, formula=DEFAULT_FORMULA):
+    """e1RM of every (weight, reps) pair as a float array; NaN where it is not defined."""
+    weight = np.asarray(weight, dtype=float)
+    reps = np.asarray(reps, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if formula == 'epley':
+            e1rm = weight * (1 + reps / 30)
+        elif formula == 'brzycki':
+            e1rm = np.where(reps < BRZYCKI_MAX_REPS, weight * 36 / (BRZYCKI_MAX_REPS - reps), np.nan)
+        else:
+            raise ValueError(f"Unknown e1RM formula {formula!r} (expected one of {', '.join(FORMULAS)})")
+    e1rm = np.where(reps == 1, weight, e1rm)
+    return np.where((weight > 0) & (reps > 0), e1rm, np.nan)
+
+
+def add_e1rm(sets_df, formula=DEFAULT_FORMULA):
+    """sets_df with an e1rm column."""
+    sets_df = sets_df.copy()
+    sets_df['e1rm'] = estimated_1rm(pd.to_numeric(sets_df['weight_lbs'], errors='coerce'),
+                                    pd.to_numeric(sets_df['reps'], errors='coerce'), formula)
+    return sets_df
+
+
+def running_max_records(keys, dates, e1rm):
+    """
+    Positions of the rows that set a new record: the best row of a (key,
+    date) day, first in input order on ties, whose e1RM is strictly above
+    every earlier day of the same key. Returns the positions in (key, date)
+    order, so there is at most one record per key and date whatever order
+    the rows of a day arrive in.
+    """
+    # Within each day, best e1RM first (NaN last); lexsort is stable
+    order = np.lexsort((np.where(np.isnan(e1rm), np.inf, -e1rm), dates, keys))
+    keys, dates, e1rm = keys[order], dates[order], e1rm[order]
+    day_best = np.ones(len(order), dtype=bool)
+    day_best[1:] = (keys[1:] != keys[:-1]) | (dates[1:] != dates[:-1])
+    order, keys, e1rm = order[day_best], keys[day_best], e1rm[day_best]
+    previous_best = pd.Series(e1rm).groupby(keys).cummax().groupby(keys).shift(1).to_numpy()
+    is_record = ~np.isnan(e1rm) & ~(e1rm <= previous_best)
+    return order[is_record]
+
+
+class PRIndex:
+    """Per-exercise PR histories (date-ordered lists of PR records)."""
+
+    def __init__(self, formula=DEFAULT_FORMULA):
+        if formula not in FORMULAS:
+            raise ValueError(f"Unknown e1RM formula {formula!r} (expected one of {', '.join(FORMULAS)})")
+        self.formula = formula
+        # (athlete_id or None, exercise) -> {'date': [...], 'e1rm': [...], 'weight_lbs': [...], 'reps': [...]}
+        self.records = {}
+        # athlete_id or None -> latest indexed set date
+        self.last_dates = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    @classmethod
+    def from_sets(cls, sets_df, formula=DEFAULT_FORMULA):
+        """Index built from a whole training_sets frame."""
+        index = cls(formula)
+        index.update(sets_df)
+        return index
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def update(self, sets_df):
+        """
+        Fold the sets of sets_df into the index. Returns the number of new PR
+        entries. Sets may be older than ones already indexed; a backdated PR
+        drops the later entries it outranks.
+        """
+        sets_df = _usable_sets(sets_df)
+        if not len(sets_df):
+            return 0
+        athletes = sets_df['athlete_id'].astype(str) if 'athlete_id' in sets_df.columns else None
+        new = pd.DataFrame({
+            'athlete_id': athletes if athletes is not None else None,
+            'exercise': sets_df['exercise_standard'].astype(str),
+            'date': sets_df['date'],
+            'e1rm': estimated_1rm(sets_df['weight_lbs'], sets_df['reps'], self.formula),
+            'weight_lbs': sets_df['weight_lbs'].astype(float),
+            'reps': sets_df['reps'].astype(float),
+        })
+        new = new[new['e1rm'].notna()]
+        if not len(new):
+            return 0
+
+        # Stored PRs of the touched exercises go first, so a tie keeps the older entry
+        touched = set(zip(new['athlete_id'], new['exercise']))
+        stored = [pd.DataFrame({'athlete_id': key[0], 'exercise': key[1], **self.records[key]})
+                  for key in touched if key in self.records]
+        before = sum(len(self.records[key]['date']) for key in touched if key in self.records)
+        combined = pd.concat(stored + [new], ignore_index=True)
+
+        key_codes = combined.groupby(['athlete_id', 'exercise'], sort=False, dropna=False).ngroup().to_numpy()
+        positions = running_max_records(key_codes, combined['date'].to_numpy(dtype=str),
+                                        combined['e1rm'].to_numpy(dtype=float))
+        records = combined.iloc[positions]
+        for key, rows in records.groupby(['athlete_id', 'exercise'], sort=False, dropna=False):
+            self.records[(None if pd.isna(key[0]) else key[0], key[1])] = {
+                'date': rows['date'].tolist(),
+                'e1rm': rows['e1rm'].tolist(),
+                'weight_lbs': rows['weight_lbs'].tolist(),
+                'reps': rows['reps'].tolist(),
+            }
+        for athlete, last in new.groupby('athlete_id', sort=False, dropna=False)['date'].max().items():
+            athlete = None if pd.isna(athlete) else athlete
+            self.last_dates[athlete] = max(self.last_dates.get(athlete, last), last)
+        return len(records) - before
+
+    def replace(self, sets_df):
+        """
+        Rebuild the PR histories of the athletes in sets_df (the single
+        lifter when it has no athlete_id) from those sets alone, leaving
+        other athletes untouched. For sets_df holding each athlete's whole
+        history, such as a fresh parse whose estimated dates may have moved.
+        """
+        athletes = (set(sets_df['athlete_id'].astype(str)) if 'athlete_id' in sets_df.columns
+                    else {None})
+        self.records = {key: history for key, history in self.records.items() if key[0] not in athletes}
+        for athlete in athletes:
+            self.last_dates.pop(athlete, None)
+        self.update(sets_df)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def current(self, exercise, athlete_id=None):
+        """The exercise's PR (a PR tuple), or None if it has none."""
+        history = self.records.get((athlete_id, exercise))
+        if not history:
+            return None
+        return PR(*(history[field][-1] for field in PR._fields))
+
+    def as_of(self, exercise, date, athlete_id=None):
+        """The PR standing at the end of date ('YYYY-MM-DD'), or None."""
+        history = self.records.get((athlete_id, exercise))
+        if not history:
+            return None
+        i = bisect_right(history['date'], str(date)[:10])
+        if not i:
+            return None
+        return PR(*(history[field][i - 1] for field in PR._fields))
+
+    def history(self, exercise, athlete_id=None):
+        """Every PR of the exercise in date order, as a frame with the PR fields."""
+        history = self.records.get((athlete_id, exercise))
+        return pd.DataFrame(history if history else {field: [] for field in PR._fields}, columns=list(PR._fields))
+
+    def exercises(self, athlete_id=None):
+        """Exercises with at least one PR, sorted."""
+        return sorted(exercise for athlete, exercise in self.records if athlete == athlete_id)
+
+    def athletes(self):
+        """Athlete ids in the index (None for single-athlete sets), sorted."""
+        return sorted({athlete for athlete, _ in self.records}, key=lambda a: (a is not None, a or ''))
+
+    def current_table(self, athlete_id=None):
+        """Current PR of every exercise as a frame, best e1RM first."""
+        rows = [(exercise, *self.current(exercise, athlete_id), len(self.records[(athlete_id, exercise)]['date']))
+                for exercise in self.exercises(athlete_id)]
+        table = pd.DataFrame(rows, columns=['exercise', *PR._fields, 'num_prs'])
+        return table.sort_values('e1rm', ascending=False, kind='stable').reset_index(drop=True)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def to_dict(self):
+        return {
+            'version': INDEX_VERSION,
+            'formula': self.formula,
+            'last_dates': [[athlete, date] for athlete, date in self.last_dates.items()],
+            'records': [{'athlete_id': athlete, 'exercise': exercise, **history}
+                        for (athlete, exercise), history in sorted(self.records.items(), key=lambda item: (
+                            item[0][0] or '', item[0][1]))],
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        index = cls(d['formula'])
+        index.last_dates = {athlete: date for athlete, date in d['last_dates']}
+        for entry in d['records']:
+            index.records[(entry['athlete_id'], entry['exercise'])] = {field: entry[field] for field in PR._fields}
+        return index
+
+    def save(self, path):
+        """Write the index as JSON, atomically."""
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, formula=None):
+        """
+        Read an index written by save(), or None if it is missing, unreadable,
+        from another index version or (when formula is given) built with a
+        different e1RM formula.
+        """
+        try:
+            with open(path, encoding='utf-8') as f:
+                d = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if d.get('version') != INDEX_VERSION or (formula is not None and d.get('formula') != formula):
+            return None
+        return cls.from_dict(d)
+
+
+def _usable_sets(sets_df):
+    """Rows with an exercise, a date and numeric weight/reps; dates as 'YYYY-MM-DD' strings."""
+    sets_df = sets_df[sets_df['exercise_standard'].notna()]
+    if 'is_synthetic' in sets_df.columns:
+        sets_df = sets_df[~sets_df['is_synthetic'].astype(bool)]
+    dates = pd.to_datetime(sets_df['date'], errors='coerce')
+    sets_df = sets_df.assign(date=dates.dt.strftime('%Y-%m-%d'),
+                             weight_lbs=pd.to_numeric(sets_df['weight_lbs'], errors='coerce'),
+                             reps=pd.to_numeric(sets_df['reps'], errors='coerce'))
+    return sets_df[dates.notna().to_numpy()]
+
+
+def _entries(index):
+    """Every PR entry of the index as (athlete, exercise, date, e1rm) tuples."""
+    return {(athlete, exercise, date, e1rm)
+            for (athlete, exercise), history in index.records.items()
+            for date, e1rm in zip(history['date'], history['e1rm'])}
+
+
+def update_pr_index(path, sets_df, formula=DEFAULT_FORMULA):
+    """
+    Load the index at path (new if missing or built with another formula),
+    rebuild the histories of the athletes in sets_df from their sets
+    (PRIndex.replace) and save it. sets_df must hold those athletes' whole
+    history. Returns (index, PR entries not in the index before).
+    """
+    index = PRIndex.load(path, formula)
+    if index is None:
+        index = PRIndex(formula)
+    before = _entries(index)
+    index.replace(sets_df)
+    index.save(path)
+    return index, len(_entries(index) - before)
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def load_sets(path):
+    """The columns progression needs from a training_sets file, read in chunks."""
+    first = next(iter_table_chunks(path, chunksize=1), None)
+    if first is None:
+        return pd.DataFrame(columns=SET_COLUMNS)
+    columns = [col for col in ('athlete_id', 'is_synthetic') if col in first.columns] + SET_COLUMNS
+    return pd.concat(iter_table_chunks(path, columns=columns), ignore_index=True)
+
+
+def main(argv=None):
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Estimated 1RM and personal records per exercise.")
+    parser.add_argument("path", nargs="?", type=Path, default=DATA_DIR / "training_sets.csv",
+                        help="training_sets file (.csv, .parquet or .feather)")
+    parser.add_argument("--index", type=Path, default=DATA_DIR / "pr_index.json",
+                        help="PR index file, rebuilt for the athletes in the sets file (default: data/pr_index.json)")
+    parser.add_argument("--formula", choices=FORMULAS, default=DEFAULT_FORMULA,
+                        help=f"e1RM formula (default: {DEFAULT_FORMULA})")
+    parser.add_argument("--rebuild", action="store_true", help="Start a new index, dropping athletes not in the sets file")
+    parser.add_argument("--exercise", nargs="+", help="Show the full PR history of these exercises")
+    parser.add_argument("--athlete", default=None, help="Athlete id for multi-athlete sets")
+    parser.add_argument("--top", type=int, default=15, help="Current PRs to print, by e1RM (default: 15)")
+    parser.add_argument("--output", type=Path, default=None, help="Write every current PR to this CSV")
+    args = parser.parse_args(argv)
+
+    if args.rebuild and args.index.exists():
+        args.index.unlink()
+    index, added = update_pr_index(args.index, load_sets(args.path), args.formula)
+
+    print("=" * 60)
+    print(f"PERSONAL RECORDS ({args.formula.title()} e1RM)")
+    print("=" * 60)
+    print(f"Exercises: {len(index.exercises(args.athlete))} | New PR entries: {added} | "
+          f"Indexed through: {index.last_dates.get(args.athlete)}")
+    table = index.current_table(args.athlete)
+    for row in table.head(args.top).itertuples(index=False):
+        print(f"  {row.exercise:<45} {row.e1rm:7.1f}  ({row.weight_lbs:g} x {row.reps:g} on {row.date}, "
+              f"{row.num_prs} PRs)")
+
+    for exercise in args.exercise or []:
+        history = index.history(exercise, args.athlete)
+        print(f"\n{exercise}: {len(history)} PRs")
+        for row in history.itertuples(index=False):
+            print(f"  {row.date}  {row.e1rm:7.1f}  ({row.weight_lbs:g} x {row.reps:g})")
+
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"\nCurrent PRs written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Rolling Association Rules
+Exercise co-occurrence over a sliding window of weeks, in one pass over the history.
+
+RollingCooccurrence keeps the item counts and the pair counts (the upper
+triangle of X^T X restricted to the window) for the sessions currently
+inside the window. Pair counts are sparse: sorted int64 keys a * items + b
+of the pairs that occur, with their counts. The sessions entering or
+leaving between two window positions are counted with one np.unique over
+their exercise pairs and merged into the keys with searchsorted, so moving
+the window never recounts the sessions that stay in it, and memory and
+time per move follow the pairs present rather than items^2.
+
+iter_windows() slides a window of window_weeks weeks over the sessions of
+a SessionMatrix in date order, one position every step_days days, adding
+the sessions that enter and removing the ones that fall out. rule_timeline()
+reads support / confidence / lift of chosen rules at every position, and
+window_rules() gives every pair rule of the current window, so comparing
+periods (say Jan-Jun 2024 against Jul 2025+) or plotting how a rule evolves
+costs one pass instead of a recount per period.
+
+Usage:
+    python rolling_rules.py [SETS_FILE] [--window-weeks N] [--step-days D]
+                            [--rule ANTECEDENT CONSEQUENT ...] [--output CSV]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from association_mining import MIN_CONFIDENCE, MIN_LIFT, MIN_SUPPORT, _rule_metrics
+from session_matrix import PairCounts, load_session_matrix, pair_rules_from_counts
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+
+# Window length and spacing of window positions
+DEFAULT_WINDOW_WEEKS = 12
+DEFAULT_STEP_DAYS = 7
+
+# Rules followed when none are given on the command line
+DEFAULT_TOP_RULES = 5
+
+
+class RollingCooccurrence:
+    """Item and pair counts of the sessions inside a sliding window."""
+
+    def __init__(self, num_items):
+        self.num_items = num_items
+        self.num_sessions = 0
+        self.item_counts = np.zeros(num_items, dtype=np.int64)
+        # Pairs a < b in the window as sorted keys a * num_items + b, and their counts
+        self.pair_keys = np.empty(0, dtype=np.int64)
+        self.pair_values = np.empty(0, dtype=np.int64)
+
+    def add(self, codes):
+        """Count one session with the given (distinct) exercise codes."""
+        self.add_sessions(codes, [len(codes)])
+
+    def remove(self, codes):
+        """Drop a session previously added with add()."""
+        self.remove_sessions(codes, [len(codes)])
+
+    def add_sessions(self, indices, lengths):
+        """Count several sessions at once: their codes concatenated, and each session's length."""
+        self.move(indices, lengths, [], [])
+
+    def remove_sessions(self, indices, lengths):
+        """Drop several sessions previously added."""
+        self.move([], [], indices, lengths)
+
+    def move(self, add_indices, add_lengths, remove_indices, remove_lengths):
+        """Add some sessions and drop others in one update of the pair counts."""
+        add_keys = self._session_pairs(add_indices, add_lengths, 1)
+        remove_keys = self._session_pairs(remove_indices, remove_lengths, -1)
+        keys, inverse = np.unique(np.concatenate([add_keys, remove_keys]), return_inverse=True)
+        deltas = np.bincount(inverse, weights=np.repeat([1.0, -1.0], [len(add_keys), len(remove_keys)]),
+                             minlength=len(keys)).astype(np.int64)
+        changed = deltas != 0
+        self._merge(keys[changed], deltas[changed])
+
+    def _session_pairs(self, indices, lengths, sign):
+        """Update the session and item counts and return the pair keys a < b of the sessions."""
+        indices = np.asarray(indices, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        if not len(lengths):
+            return np.empty(0, dtype=np.int64)
+        self.num_sessions += sign * len(lengths)
+        self.item_counts += sign * np.bincount(indices, minlength=self.num_items)
+        # Every (entry, entry of the same session) pair: the m x m block of each session
+        row_start = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        row_len = np.repeat(lengths, lengths)
+        left = np.repeat(indices, row_len)
+        offset = np.arange(len(left)) - np.repeat(np.cumsum(row_len) - row_len, row_len)
+        right = indices[np.repeat(row_start, row_len) + offset]
+        upper = left < right
+        return left[upper] * self.num_items + right[upper]
+
+    def _merge(self, keys, deltas):
+        """Add deltas to the counts of the sorted pair keys, inserting new pairs and dropping emptied ones."""
+        pos = np.searchsorted(self.pair_keys, keys)
+        found = pos < len(self.pair_keys)
+        found[found] = self.pair_keys[pos[found]] == keys[found]
+        self.pair_values[pos[found]] += deltas[found]
+        if not found.all():
+            self.pair_keys = np.insert(self.pair_keys, pos[~found], keys[~found])
+            self.pair_values = np.insert(self.pair_values, pos[~found], deltas[~found])
+        empty = self.pair_values == 0
+        if empty.any():
+            self.pair_keys = self.pair_keys[~empty]
+            self.pair_values = self.pair_values[~empty]
+
+    def pair_count(self, a, b):
+        """Sessions in the window with both items a[i] and b[i] (the item count when a[i] == b[i])."""
+        a = np.asarray(a, dtype=np.int64)
+        b = np.asarray(b, dtype=np.int64)
+        keys = np.minimum(a, b) * self.num_items + np.maximum(a, b)
+        pos = np.minimum(np.searchsorted(self.pair_keys, keys), max(len(self.pair_keys) - 1, 0))
+        both = np.zeros(len(keys), dtype=np.int64)
+        if len(self.pair_keys):
+            hit = self.pair_keys[pos] == keys
+            both[hit] = self.pair_values[pos[hit]]
+        same = a == b
+        both[same] = self.item_counts[a[same]]
+        return both
+
+    def pair_counts(self):
+        """The window's pairs as session_matrix.PairCounts triplets."""
+        left, right = np.divmod(self.pair_keys, self.num_items)
+        return PairCounts(left, right, self.pair_values.copy())
+
+    def rule_metrics(self, antecedents, consequents):
+        """support / confidence / lift of the rules antecedents[i] -> consequents[i] (item codes)."""
+        n = self.num_sessions
+        antecedents = np.asarray(antecedents, dtype=np.int64)
+        consequents = np.asarray(consequents, dtype=np.int64)
+        if not n:
+            nan = np.full(len(antecedents), np.nan)
+            return {'support': nan, 'confidence': nan, 'lift': nan}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            metrics = _rule_metrics(self.item_counts[antecedents] / n, self.item_counts[consequents] / n,
+                                    self.pair_count(antecedents, consequents) / n)
+        return {name: metrics[name] for name in ('support', 'confidence', 'lift')}
+
+
+def window_ends(dates, step_days=DEFAULT_STEP_DAYS):
+    """Window end dates from the first to (at least) the last session date, step_days apart."""
+    first, last = dates.min(), dates.max()
+    steps = -(-int((last - first) / np.timedelta64(1, 'D')) // step_days)
+    return first + np.arange(steps + 1) * np.timedelta64(step_days, 'D')
+
+
+def iter_windows(matrix, window_weeks=DEFAULT_WINDOW_WEEKS, step_days=DEFAULT_STEP_DAYS):
+    """
+    Slide a window of window_weeks weeks over the sessions of a SessionMatrix.
+    Yields (window start, window end, RollingCooccurrence) with the window
+    covering start < date <= end; the counts object is updated in place
+    between positions.
+    """
+    if not len(matrix):
+        return
+    dates = matrix.dates.astype('datetime64[D]')
+    order = np.argsort(dates, kind='stable')
+    dates = dates[order]
+    # Rows in date order, so each move adds and drops contiguous slices
+    lengths = np.diff(matrix.indptr)[order]
+    starts = np.repeat(matrix.indptr[:-1][order], lengths)
+    indices = matrix.indices[starts + np.arange(len(starts)) - np.repeat(np.cumsum(lengths) - lengths, lengths)]
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    width = np.timedelta64(7 * window_weeks, 'D')
+
+    counts = RollingCooccurrence(matrix.shape[1])
+    entered = expired = 0
+    for end in window_ends(dates, step_days):
+        start = end - width
+        stop = np.searchsorted(dates, end, side='right')
+        enter = max(entered, stop)
+        drop = max(min(np.searchsorted(dates, start, side='right'), enter), expired)
+        counts.move(indices[indptr[entered]:indptr[enter]], lengths[entered:enter],
+                    indices[indptr[expired]:indptr[drop]], lengths[expired:drop])
+        entered, expired = enter, drop
+        yield start, end, counts
+
+
+def rule_timeline(matrix, rules, window_weeks=DEFAULT_WINDOW_WEEKS, step_days=DEFAULT_STEP_DAYS):
+    """
+    support / confidence / lift of each (antecedent, consequent) exercise pair
+    in rules at every window position, as a long frame with columns
+    window_start, window_end, sessions, antecedent, consequent, support,
+    confidence, lift. Windows without the exercises give NaN metrics.
+    """
+    position = {name: i for i, name in enumerate(matrix.vocabulary)}
+    missing = [name for rule in rules for name in rule if name not in position]
+    if missing:
+        raise ValueError(f"Unknown exercise(s): {', '.join(sorted(set(missing)))}")
+    antecedents = [position[a] for a, _ in rules]
+    consequents = [position[c] for _, c in rules]
+
+    frames = []
+    for start, end, counts in iter_windows(matrix, window_weeks, step_days):
+        metrics = counts.rule_metrics(antecedents, consequents)
+        frames.append(pd.DataFrame({
+            'window_start': start + np.timedelta64(1, 'D'),
+            'window_end': end,
+            'sessions': counts.num_sessions,
+            'antecedent': [a for a, _ in rules],
+            'consequent': [c for _, c in rules],
+            **metrics,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['window_start', 'window_end', 'sessions', 'antecedent',
+                                     'consequent', 'support', 'confidence', 'lift'])
+    timeline = pd.concat(frames, ignore_index=True)
+    for col in ('window_start', 'window_end'):
+        timeline[col] = pd.to_datetime(timeline[col])
+    return timeline
+
+
+def window_rules(counts, vocabulary, min_support=MIN_SUPPORT, min_confidence=MIN_CONFIDENCE,
+                 min_lift=MIN_LIFT):
+    """Every pair rule of the current window, like SessionMatrix.pair_rules() on its sessions."""
+    return pair_rules_from_counts(counts.item_counts, counts.pair_counts(), counts.num_sessions, vocabulary,
+                                  min_support, min_confidence, min_lift)
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main(argv=None):
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Track exercise pair rules over a sliding window of weeks.")
+    parser.add_argument("path", nargs="?", type=Path, default=DATA_DIR / "training_sets.csv",
+                        help="training_sets file (.csv, .parquet or .feather)")
+    parser.add_argument("--window-weeks", type=int, default=DEFAULT_WINDOW_WEEKS,
+                        help=f"Window length in weeks (default: {DEFAULT_WINDOW_WEEKS})")
+    parser.add_argument("--step-days", type=int, default=DEFAULT_STEP_DAYS,
+                        help=f"Days between window positions (default: {DEFAULT_STEP_DAYS})")
+    parser.add_argument("--rule", nargs=2, action="append", metavar=("ANTECEDENT", "CONSEQUENT"),
+                        help="Rule to follow (repeatable; default: the top rules by lift over the whole history)")
+    parser.add_argument("--output", type=Path, default=None, help="Write the full timeline to this CSV")
+    args = parser.parse_args(argv)
+    if args.window_weeks < 1 or args.step_days < 1:
+        parser.error("--window-weeks and --step-days must be at least 1")
+
+    matrix, _ = load_session_matrix(args.path)
+    rules = [tuple(rule) for rule in args.rule or []]
+    if not rules:
+        top = matrix.pair_rules().sort_values('lift', ascending=False, kind='stable').head(DEFAULT_TOP_RULES)
+        rules = [(next(iter(a)), next(iter(c))) for a, c in zip(top['antecedents'], top['consequents'])]
+    try:
+        timeline = rule_timeline(matrix, rules, args.window_weeks, args.step_days)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    print("=" * 60)
+    print(f"ROLLING RULES ({args.window_weeks}-week window, every {args.step_days} days)")
+    print("=" * 60)
+    print(f"Sessions: {len(matrix)} | Window positions: {timeline['window_end'].nunique()}")
+    for (antecedent, consequent), rows in timeline.groupby(['antecedent', 'consequent'], sort=False):
+        lift = rows['lift']
+        print(f"\n{antecedent} -> {consequent}")
+        if lift.notna().any():
+            peak = rows.loc[lift.idxmax()]
+            print(f"  Lift: min {lift.min():.2f} | median {lift.median():.2f} | max {lift.max():.2f} "
+                  f"(window ending {peak['window_end'].date()})")
+            print(f"  Confidence: min {rows['confidence'].min():.3f} | max {rows['confidence'].max():.3f}")
+        print(f"  Windows with both exercises: {int((rows['support'] > 0).sum())} of {len(rows)}")
+
+    if args.output:
+        timeline.to_csv(args.output, index=False)
+        print(f"\nTimeline written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
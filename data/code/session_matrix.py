@@ -0,0 +1,259 @@
+"""
+Session x Exercise Matrix
+Binary CSR matrix of which exercises were performed in which session, built
+once from training_sets and shared by the mining stages.
+
+Rows are sessions (date, workout_type, and athlete_id when the sets have
+one), in the order build_training_sessions_df groups them; columns are the
+distinct exercise_standard names, sorted (the vocabulary, like
+TransactionEncoder.columns_). The matrix is stored as plain
+CSR arrays (indptr, indices) with sorted column indices per row, so:
+
+  - item counts are one np.bincount over indices
+  - pair counts X^T X come from the upper-triangle column pairs of each row,
+    gathered for all rows of the same length at once (no per-session Python
+    loop) and counted with one np.unique into sparse (a, b, count) triplets,
+    so memory follows the pairs that occur, not n_exercises^2
+  - rule mining packs the same (row, column) pairs into the bitsets used by
+    association_mining, without rebuilding transactions from strings
+
+The matrix is cached next to the sets file as <name>.matrix.npz, in the
+layout scipy.sparse.save_npz writes (indices, indptr, data, shape, format)
+plus the vocabulary and session keys, so scipy.sparse.load_npz can read it
+directly. The cache stores the SHA-256 of the sets file and is rebuilt when
+the file changes. scipy is only needed for to_scipy().
+"""
+
+import os
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from association_mining import (MIN_CONFIDENCE, MIN_LIFT, MIN_SUPPORT, RULE_METRICS,
+                                TransactionBitsets, _rule_metrics)
+from training_io import file_content_hash, iter_table_chunks
+
+# Bump when the cached layout changes
+MATRIX_CACHE_VERSION = 2
+
+MATRIX_COLUMNS = ['date', 'workout_type', 'exercise_standard']
+
+# Upper triangle of X^T X as sparse triplets: exercise codes left < right,
+# sorted by (left, right), and the sessions containing both
+PairCounts = namedtuple('PairCounts', ['left', 'right', 'count'])
+
+
+def _require_scipy():
+    """Import scipy.sparse or explain how to get it."""
+    try:
+        import scipy.sparse
+    except ImportError:
+        raise ImportError("Converting to a scipy sparse matrix requires scipy (pip install scipy)") from None
+    return scipy.sparse
+
+
+class SessionMatrix:
+    """Binary CSR session x exercise matrix with its vocabulary and session keys."""
+
+    def __init__(self, indptr, indices, vocabulary, dates, workout_types):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.vocabulary = list(vocabulary)
+        self.dates = np.asarray(dates, dtype=str)
+        self.workout_types = np.asarray(workout_types, dtype=str)
+
+    @property
+    def shape(self):
+        return (len(self.indptr) - 1, len(self.vocabulary))
+
+    @property
+    def nnz(self):
+        return len(self.indices)
+
+    def __len__(self):
+        return self.shape[0]
+
+    @classmethod
+    def from_sets(cls, sets_df):
+        """Build from a training_sets frame (only date, workout_type and exercise_standard are used)."""
+        sets_df = sets_df.dropna(subset=['exercise_standard'])
+        dates = sets_df['date']
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            dates = dates.dt.strftime('%Y-%m-%d')
+        keys = pd.DataFrame({'date': dates.astype(str).to_numpy(),
+                             'workout_type': sets_df['workout_type'].astype(str).to_numpy()})
+        # Multi-athlete tables (read_partitioned) key sessions by athlete too
+        key_columns = ['date', 'workout_type']
+        if 'athlete_id' in sets_df.columns:
+            keys.insert(0, 'athlete_id', sets_df['athlete_id'].astype(str).to_numpy())
+            key_columns.insert(0, 'athlete_id')
+        session_ids = keys.groupby(key_columns, sort=True).ngroup().to_numpy()
+        exercise_codes, vocabulary = pd.factorize(sets_df['exercise_standard'].astype(str), sort=True)
+
+        # One entry per (session, exercise), sorted by session then column
+        pairs = np.unique(session_ids.astype(np.int64) * len(vocabulary) + exercise_codes)
+        rows, indices = np.divmod(pairs, len(vocabulary))
+        num_sessions = int(session_ids.max()) + 1 if len(session_ids) else 0
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=num_sessions))])
+
+        _, first = np.unique(session_ids, return_index=True)
+        return cls(indptr, indices, vocabulary,
+                   keys['date'].to_numpy()[first], keys['workout_type'].to_numpy()[first])
+
+    # ------------------------------------------------------------------
+    # Linear algebra
+    # ------------------------------------------------------------------
+
+    def row_ids(self):
+        """Row number of every stored entry (the COO row array)."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.indptr))
+
+    def item_counts(self):
+        """Sessions per exercise: the column sums of X."""
+        return np.bincount(self.indices, minlength=self.shape[1])
+
+    def pair_counts(self):
+        """
+        The off-diagonal upper triangle of X^T X as PairCounts triplets: every
+        pair of exercises done in the same session at least once, with the
+        number of such sessions. The diagonal is item_counts().
+        """
+        n = self.shape[1]
+        lengths = np.diff(self.indptr)
+        keys = []
+        for length in np.unique(lengths[lengths >= 2]):
+            rows = np.flatnonzero(lengths == length)
+            block = self.indices[self.indptr[rows, None] + np.arange(length)].astype(np.int64)
+            i, j = np.triu_indices(length, k=1)
+            keys.append((block[:, i] * n + block[:, j]).ravel())
+        keys, counts = np.unique(np.concatenate(keys) if keys else np.empty(0, dtype=np.int64),
+                                 return_counts=True)
+        left, right = np.divmod(keys, max(n, 1))
+        return PairCounts(left, right, counts.astype(np.int64))
+
+    def top_pairs(self, n=12):
+        """The n most frequent exercise pairs as (exercise a, exercise b, sessions), a < b."""
+        pairs = self.pair_counts()
+        top = np.argsort(-pairs.count, kind='stable')[:n]
+        return [(self.vocabulary[pairs.left[k]], self.vocabulary[pairs.right[k]], int(pairs.count[k]))
+                for k in top]
+
+    def pair_rules(self, min_support=MIN_SUPPORT, min_confidence=MIN_CONFIDENCE, min_lift=MIN_LIFT):
+        """
+        One-to-one rules a -> b straight from X^T X, with the columns and
+        values association_mining.association_rules gives for 2-itemsets.
+        """
+        return pair_rules_from_counts(self.item_counts(), self.pair_counts(), len(self), self.vocabulary,
+                                      min_support, min_confidence, min_lift)
+
+    # ------------------------------------------------------------------
+    # Conversions
+    # ------------------------------------------------------------------
+
+    def to_bitsets(self):
+        """The matrix as association_mining.TransactionBitsets, ready for apriori()."""
+        return TransactionBitsets.from_codes(self.row_ids(), self.indices, self.vocabulary, len(self))
+
+    def transactions(self):
+        """Exercise name lists per session (sorted), for code that wants plain lists."""
+        names = np.asarray(self.vocabulary, dtype=object)[self.indices].tolist()
+        bounds = self.indptr.tolist()
+        return [names[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def to_scipy(self):
+        """The matrix as a scipy.sparse.csr_matrix of int8 ones."""
+        sparse = _require_scipy()
+        data = np.ones(self.nnz, dtype=np.int8)
+        return sparse.csr_matrix((data, self.indices, self.indptr), shape=self.shape)
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def save(self, path, content_hash=''):
+        """Write to path (.npz, scipy.sparse.save_npz layout plus metadata), atomically."""
+        path = Path(path)
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, indices=self.indices, indptr=self.indptr,
+                     data=np.ones(self.nnz, dtype=np.int8),
+                     shape=np.array(self.shape), format=np.array('csr'),
+                     vocabulary=np.array(self.vocabulary, dtype=str),
+                     dates=self.dates, workout_types=self.workout_types,
+                     version=np.array(MATRIX_CACHE_VERSION), content_hash=np.array(content_hash))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, content_hash=None):
+        """
+        Read a matrix written by save(). Returns None if the file is missing,
+        unreadable, from another cache version, or (when content_hash is
+        given) built from a different sets file.
+        """
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                if int(npz['version']) != MATRIX_CACHE_VERSION:
+                    return None
+                if content_hash is not None and str(npz['content_hash']) != content_hash:
+                    return None
+                return cls(npz['indptr'], npz['indices'], npz['vocabulary'].tolist(),
+                           npz['dates'], npz['workout_types'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def pair_rules_from_counts(item_counts, pairs, num_sessions, vocabulary, min_support=MIN_SUPPORT,
+                           min_confidence=MIN_CONFIDENCE, min_lift=MIN_LIFT):
+    """
+    Rules a -> b from item counts and PairCounts triplets over num_sessions
+    sessions: both directions of every pair with enough support, a -> b
+    first, pairs in itemset order.
+    """
+    n = max(num_sessions, 1)
+    support = np.asarray(item_counts) / n
+    keep = pairs.count / n >= min_support
+    a, b, both = pairs.left[keep], pairs.right[keep], pairs.count[keep]
+    ante = np.column_stack([a, b]).ravel()
+    cons = np.column_stack([b, a]).ravel()
+    metrics = _rule_metrics(support[ante], support[cons], np.repeat(both, 2) / n)
+    keep = (metrics['confidence'] >= min_confidence) & (metrics['lift'] >= min_lift)
+    rules = pd.DataFrame({
+        'antecedents': [frozenset([vocabulary[i]]) for i in ante[keep]],
+        'consequents': [frozenset([vocabulary[i]]) for i in cons[keep]],
+        'antecedent support': support[ante][keep],
+        'consequent support': support[cons][keep],
+    })
+    for name in RULE_METRICS:
+        rules[name] = metrics[name][keep]
+    return rules
+
+
+def matrix_cache_path(sets_path):
+    """Default cache location: <sets file name>.matrix.npz next to it."""
+    sets_path = Path(sets_path)
+    return sets_path.with_name(sets_path.name + '.matrix.npz')
+
+
+def load_session_matrix(sets_path, cache_path=None, use_cache=True):
+    """
+    The SessionMatrix for a training_sets file (.csv, .parquet or .feather),
+    read from the .npz cache when it matches the file's contents and built
+    (and cached) otherwise. Returns (matrix, from_cache).
+    """
+    content_hash = file_content_hash(sets_path)
+    cache_path = matrix_cache_path(sets_path) if cache_path is None else Path(cache_path)
+    if use_cache:
+        matrix = SessionMatrix.load(cache_path, content_hash)
+        if matrix is not None:
+            return matrix, True
+
+    # Combined multi-athlete files key sessions by athlete too (see from_sets)
+    first = next(iter_table_chunks(sets_path, chunksize=1), None)
+    columns = (['athlete_id'] if first is not None and 'athlete_id' in first.columns else []) + MATRIX_COLUMNS
+    sets_df = pd.concat(iter_table_chunks(sets_path, columns=columns), ignore_index=True)
+    matrix = SessionMatrix.from_sets(sets_df)
+    if use_cache:
+        matrix.save(cache_path, content_hash)
+    return matrix, False
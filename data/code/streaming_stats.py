@@ -0,0 +1,310 @@
+"""
+Streaming Statistics
+One-pass, mergeable summaries of numeric columns for data that does not fit in memory.
+
+RunningStats keeps count/min/max and Welford's running mean and sum of
+squared deviations (M2); two summaries merge with Chan et al.'s parallel
+update, so per-shard results combine into exactly the statistics of the
+concatenated data (up to float rounding).
+
+QuantileSketch answers quantile queries. It keeps every value until it has
+seen more than exact_limit of them, so small tables get exact quantiles
+(identical to Series.quantile(), linear interpolation). Past the limit it
+becomes a KLL sketch (Karnin, Lang & Liberty 2016): a stack of compactors
+where level h holds items of weight 2^h and a full level is sorted and
+every other item (random offset) promoted to the next level. Sketches
+merge level by level, so per-lifter shards can be summarized separately and
+combined.
+
+Error bound: with k=200 (the default) the returned quantile has a
+normalized rank error of at most about 1.65% of n with 99% confidence; that
+is, the value reported for q is the true q' quantile for some
+|q - q'| <= 0.0165. The error shrinks roughly as 1/k and does not grow
+with n. Memory is O(k) values per sketch regardless of n.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Values kept exactly before switching to the KLL sketch
+EXACT_LIMIT = 100_000
+
+# KLL accuracy parameter (top compactor capacity)
+DEFAULT_K = 200
+
+# Capacity ratio between consecutive KLL levels
+KLL_C = 2 / 3
+
+
+# ============================================================================
+# RUNNING MOMENTS
+# ============================================================================
+
+class RunningStats:
+    """count, min, max, mean and variance of a stream of values (Welford / Chan)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, values):
+        """Fold an array of values into the summary (NaNs are skipped)."""
+        values = np.asarray(values)
+        if values.dtype.kind == 'f':
+            values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        batch = RunningStats()
+        batch.n = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min = values.min()
+        batch.max = values.max()
+        return self.merge(batch)
+
+    def merge(self, other):
+        """Combine another summary into this one (in place) and return self."""
+        if not other.n:
+            return self
+        if not self.n:
+            self.n, self.mean, self.m2 = other.n, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1, like Series.var())."""
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.n > 1 else math.nan
+
+    def to_dict(self):
+        return {'n': self.n, 'mean': self.mean, 'm2': self.m2,
+                'min': _plain(self.min), 'max': _plain(self.max)}
+
+    @classmethod
+    def from_dict(cls, d):
+        stats = cls()
+        stats.n, stats.mean, stats.m2 = d['n'], d['mean'], d['m2']
+        stats.min, stats.max = d['min'], d['max']
+        return stats
+
+
+def _plain(value):
+    """NumPy scalar -> Python scalar for JSON."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+# ============================================================================
+# QUANTILE SKETCH
+# ============================================================================
+
+class QuantileSketch:
+    """Mergeable quantile sketch: exact up to exact_limit values, KLL beyond."""
+
+    def __init__(self, k=DEFAULT_K, exact_limit=EXACT_LIMIT, seed=0):
+        self.k = k
+        self.exact_limit = exact_limit
+        self.n = 0
+        self.exact = []          # arrays of raw values while exact
+        self.levels = None       # KLL compactors once past exact_limit
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def is_exact(self):
+        return self.levels is None
+
+    def update(self, values):
+        """Add an array of values (NaNs are skipped)."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        if self.is_exact:
+            self.exact.append(values)
+            if self.n > self.exact_limit:
+                self._start_kll()
+        else:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """Combine another sketch into this one (in place) and return self."""
+        if not other.n:
+            return self
+        self.n += other.n
+        if self.is_exact and other.is_exact and self.n <= self.exact_limit:
+            self.exact.extend(other.exact)
+            return self
+        if self.is_exact:
+            self._start_kll(compress=False)
+        other_levels = other.levels if not other.is_exact else [np.concatenate(other.exact)]
+        for h, items in enumerate(other_levels):
+            if h < len(self.levels):
+                self.levels[h] = np.concatenate([self.levels[h], items])
+            else:
+                self.levels.append(items.copy())
+        self._compress()
+        return self
+
+    def _start_kll(self, compress=True):
+        values = np.concatenate(self.exact) if self.exact else np.empty(0)
+        self.exact = []
+        self.levels = [values]
+        if compress:
+            self._compress()
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * KLL_C ** depth)))
+
+    def _compress(self):
+        """Compact full levels until every level is within its capacity."""
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # Keep one item back when the count is odd so weights stay exact
+                keep = items[:1] if len(items) % 2 else items[:0]
+                pairs = items[len(keep):]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                # Adding a level shrinks the lower capacities; recheck from the bottom
+                h = 0
+                continue
+            h += 1
+
+    def quantile(self, q):
+        """Value at quantile q (0 <= q <= 1)."""
+        if not self.n:
+            return math.nan
+        if self.is_exact:
+            return float(np.quantile(np.concatenate(self.exact), q))
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** h, dtype=np.int64)
+                                  for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, cum = values[order], np.cumsum(weights[order])
+        rank = q * (cum[-1] - 1)
+        return float(values[np.searchsorted(cum, rank, side='right')])
+
+    def to_dict(self):
+        if self.is_exact:
+            values = np.concatenate(self.exact) if self.exact else np.empty(0)
+            return {'k': self.k, 'exact_limit': self.exact_limit, 'n': self.n, 'exact': values.tolist()}
+        return {'k': self.k, 'exact_limit': self.exact_limit, 'n': self.n,
+                'levels': [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls(k=d['k'], exact_limit=d['exact_limit'])
+        sketch.n = d['n']
+        if 'exact' in d:
+            sketch.exact = [np.asarray(d['exact'], dtype=float)]
+        else:
+            sketch.levels = [np.asarray(items, dtype=float) for items in d['levels']]
+        return sketch
+
+
+# ============================================================================
+# COLUMN SUMMARIES
+# ============================================================================
+
+class ColumnSummary:
+    """
+    RunningStats + QuantileSketch + zero/negative counts for one column.
+    min()/max()/mean()/median()/std()/quantile() mirror the Series methods.
+    """
+
+    def __init__(self, k=DEFAULT_K, exact_limit=EXACT_LIMIT):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(k=k, exact_limit=exact_limit)
+        self.zeros = 0
+        self.negatives = 0
+
+    def update(self, series):
+        values = pd.to_numeric(series, errors='coerce').to_numpy()
+        self.stats.update(values)
+        self.sketch.update(values)
+        self.zeros += int((values == 0).sum())
+        self.negatives += int((values < 0).sum())
+        return self
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        self.zeros += other.zeros
+        self.negatives += other.negatives
+        return self
+
+    def min(self):
+        return self.stats.min
+
+    def max(self):
+        return self.stats.max
+
+    def mean(self):
+        return self.stats.mean if self.stats.n else math.nan
+
+    def std(self):
+        return self.stats.std
+
+    def median(self):
+        return self.sketch.quantile(0.5)
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def to_dict(self):
+        return {'stats': self.stats.to_dict(), 'sketch': self.sketch.to_dict(),
+                'zeros': self.zeros, 'negatives': self.negatives}
+
+    @classmethod
+    def from_dict(cls, d):
+        summary = cls()
+        summary.stats = RunningStats.from_dict(d['stats'])
+        summary.sketch = QuantileSketch.from_dict(d['sketch'])
+        summary.zeros, summary.negatives = d['zeros'], d['negatives']
+        return summary
+
+
+def summarize_chunks(chunks, columns, k=DEFAULT_K, exact_limit=EXACT_LIMIT):
+    """ColumnSummary per column over an iterable of DataFrame chunks."""
+    summaries = {col: ColumnSummary(k=k, exact_limit=exact_limit) for col in columns}
+    for chunk in chunks:
+        for col in columns:
+            summaries[col].update(chunk[col])
+    return summaries
+
+
+def merge_summaries(parts):
+    """Merge {column: ColumnSummary} dicts from several shards into one."""
+    merged = {}
+    for part in parts:
+        for col, summary in part.items():
+            if col in merged:
+                merged[col].merge(summary)
+            else:
+                merged[col] = ColumnSummary.from_dict(summary.to_dict())
+    return merged
@@ -0,0 +1,271 @@
+"""
+Training Data I/O
+Read and write training_sets / training_sessions tables as CSV, Parquet or Feather.
+
+The columnar formats store proper types (dates as date32, exercise and
+workout type as categoricals, flags as bool), so loading them needs no
+string parsing. Parquet and Feather require pyarrow.
+
+Multi-athlete tables are written Hive-partitioned, one file per athlete and
+year: <root>/athlete_id=<id>/year=<yyyy>/part-0.<ext>. The partition values
+live in the directory names, not in the files, so one athlete's partitions
+can be rewritten or read without touching anyone else's.
+"""
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+OUTPUT_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# Columns stored as categoricals in the columnar formats
+CATEGORICAL_COLUMNS = ['athlete_id', 'day_of_week', 'workout_type', 'exercise_standard']
+
+# Columns stored as booleans in the columnar formats
+BOOL_COLUMNS = ['has_extender', 'is_synthetic', 'date_is_estimated']
+
+
+def _require_pyarrow(fmt):
+    """Import pyarrow or explain how to get it."""
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(f"Writing/reading {fmt} files requires pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+def to_arrow_table(df):
+    """
+    Convert a training_sets / training_sessions frame to an Arrow table with
+    date32 dates, dictionary-encoded categoricals and bool flags.
+    """
+    pa = _require_pyarrow('columnar')
+
+    df = df.reset_index(drop=True).copy()
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date']).dt.date
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in BOOL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(bool)
+    if 'machine_position' in df.columns:
+        # All-empty today; keep it a string column rather than an Arrow null column
+        df['machine_position'] = df['machine_position'].astype('string')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if 'date' in table.column_names:
+        idx = table.column_names.index('date')
+        table = table.set_column(idx, 'date', table.column('date').cast(pa.date32()))
+    return table
+
+
+def write_table(df, path_stem, fmt='csv'):
+    """
+    Write df to path_stem + the extension for fmt ('csv', 'parquet' or 'feather').
+    Returns the written path.
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {fmt!r} (expected one of {sorted(OUTPUT_FORMATS)})")
+    path = Path(f"{path_stem}{OUTPUT_FORMATS[fmt]}")
+
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+    elif fmt == 'parquet':
+        pa = _require_pyarrow(fmt)
+        pa.parquet.write_table(to_arrow_table(df), path)
+    else:
+        pa = _require_pyarrow(fmt)
+        pa.feather.write_feather(to_arrow_table(df), path)
+    return path
+
+
+def read_table(path, parse_dates=True):
+    """
+    Read a training table written by write_table; the format is taken from the extension.
+
+    Columnar files come back typed with date as datetime64 (a cast from
+    date32, not a parse). For CSV the date column is parsed only when
+    parse_dates is True, otherwise it stays as the raw YYYY-MM-DD strings.
+    """
+    path = Path(path)
+    ext = path.suffix.lower()
+
+    if ext == '.csv':
+        return pd.read_csv(path, parse_dates=['date'] if parse_dates else None)
+    if ext == '.parquet':
+        pa = _require_pyarrow('parquet')
+        return pa.parquet.read_table(path).to_pandas(date_as_object=False)
+    if ext == '.feather':
+        pa = _require_pyarrow('feather')
+        return pa.feather.read_table(path).to_pandas(date_as_object=False)
+    raise ValueError(f"Unsupported file type {ext!r} for {path}")
+
+
+def iter_table_chunks(path, chunksize=100_000, columns=None):
+    """
+    Yield a training table in DataFrames of at most chunksize rows without
+    loading it whole: read_csv(chunksize=...) for CSV, Arrow record batches
+    for Parquet/Feather. Chunks carry the row numbers of the whole file as
+    their index; dates are left unparsed in CSV chunks.
+    """
+    path = Path(path)
+    ext = path.suffix.lower()
+
+    if ext == '.csv':
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns)
+        return
+    if ext == '.parquet':
+        pa = _require_pyarrow('parquet')
+        batches = pa.parquet.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns)
+    elif ext == '.feather':
+        pa = _require_pyarrow('feather')
+        # Feather (Arrow IPC) files are memory-mapped, so slicing them reads lazily
+        table = pa.feather.read_table(path, columns=columns, memory_map=True)
+        batches = table.to_batches(max_chunksize=chunksize)
+    else:
+        raise ValueError(f"Unsupported file type {ext!r} for {path}")
+
+    start = 0
+    for batch in batches:
+        chunk = batch.to_pandas(date_as_object=False)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+def file_content_hash(filepath):
+    """SHA-256 of a file's raw bytes."""
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def find_table(directory, name):
+    """
+    Return the path of name.parquet, name.feather or name.csv in directory,
+    preferring the typed formats. Returns None if none exist.
+    """
+    for ext in ('.parquet', '.feather', '.csv'):
+        path = Path(directory) / f"{name}{ext}"
+        if os.path.exists(path):
+            return path
+    return None
+
+
+# ============================================================================
+# HIVE-PARTITIONED TABLES
+# ============================================================================
+
+# File name inside each partition directory (plus the format's extension)
+PARTITION_FILE = 'part-0'
+
+
+def athlete_partition_dir(root, athlete_id):
+    """root/athlete_id=<id>, with the id escaped the way Hive escapes partition values."""
+    return Path(root) / f"athlete_id={quote(str(athlete_id), safe='')}"
+
+
+def _partition_years(dates):
+    """Year of each date, for YYYY-MM-DD strings or datetimes."""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates.dt.year.astype(str)
+    return dates.astype(str).str[:4]
+
+
+def write_athlete_partitions(df, root, athlete_id, formats=('csv',)):
+    """
+    Replace one athlete's partitions under root with df split by year, one
+    file per year in each of formats (athlete_id and year are dropped from
+    the files; they are the directory names). The new partitions are
+    written to a staging directory and swapped in with two renames: the old
+    partitions are moved aside first and deleted only once the new ones are
+    in place, so readers never see a half-written athlete and a crash
+    between the renames leaves the old partitions to be restored by the
+    next write. Returns the written paths.
+    """
+    for fmt in formats:
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format {fmt!r} (expected one of {sorted(OUTPUT_FORMATS)})")
+    target = athlete_partition_dir(root, athlete_id)
+    staging = target.with_name(f".{target.name}.tmp")
+    retired = target.with_name(f".{target.name}.old")
+    if retired.exists():
+        # Left by a write interrupted between the renames
+        if target.exists():
+            shutil.rmtree(retired)
+        else:
+            os.replace(retired, target)
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    data = df.drop(columns=['athlete_id'], errors='ignore')
+    written = []
+    for year, part in data.groupby(_partition_years(data['date']), sort=True):
+        year_dir = staging / f"year={year}"
+        year_dir.mkdir()
+        part = part.reset_index(drop=True)
+        for fmt in formats:
+            written.append(write_table(part, year_dir / PARTITION_FILE, fmt))
+
+    if target.exists():
+        os.replace(target, retired)
+    os.replace(staging, target)
+    if retired.exists():
+        shutil.rmtree(retired)
+    return [target / path.relative_to(staging) for path in written]
+
+
+def list_partitions(root, athlete_ids=None, years=None):
+    """
+    (athlete_id, year, path) for the partition files under root, sorted,
+    optionally limited to some athletes and/or years. Only the matching
+    directories are listed. A partition written in several formats is
+    listed once, preferring Parquet, then Feather, then CSV.
+    """
+    root = Path(root)
+    if athlete_ids is None:
+        athlete_dirs = sorted(root.glob('athlete_id=*'))
+    else:
+        athlete_dirs = [athlete_partition_dir(root, a) for a in athlete_ids]
+    partitions = []
+    for athlete_dir in athlete_dirs:
+        athlete_id = unquote(athlete_dir.name.split('=', 1)[1])
+        year_dirs = (sorted(athlete_dir.glob('year=*')) if years is None
+                     else [athlete_dir / f"year={y}" for y in years])
+        for year_dir in year_dirs:
+            # One file per partition, typed formats first (like find_table)
+            path = find_table(year_dir, PARTITION_FILE)
+            if path is not None:
+                partitions.append((athlete_id, int(year_dir.name.split('=', 1)[1]), path))
+    return partitions
+
+
+def read_partitioned(root, athlete_ids=None, years=None, parse_dates=True):
+    """
+    Read a Hive-partitioned table back into one frame, restoring the
+    athlete_id column (year is implied by date). athlete_ids / years limit
+    the read to those partitions; files of other athletes are not opened.
+    """
+    frames = []
+    for athlete_id, _, path in list_partitions(root, athlete_ids, years):
+        part = read_table(path, parse_dates=parse_dates)
+        part.insert(0, 'athlete_id', athlete_id)
+        frames.append(part)
+    if not frames:
+        return pd.DataFrame(columns=['athlete_id'])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,490 @@
+"""
+Training Workload
+Acute:chronic workload ratio (ACWR) per athlete and muscle group.
+
+Set volume is summed per day into one dense daily series per athlete and
+muscle group (plus a 'total' series per athlete), from the athlete's first
+to last training day with rest days as zeros. On those series:
+
+  - rolling ACWR: acute = mean daily volume over the last ACUTE_DAYS days,
+    chronic = mean over the last CHRONIC_DAYS days (the acute week included),
+    acwr = acute / chronic, NaN until CHRONIC_DAYS days of history. Window
+    sums are differences of one cumulative sum, O(n) for all series at once.
+  - EWMA ACWR (Williams et al. 2017): exponentially weighted daily volume with
+    lambda = 2 / (N + 1) for N = ACUTE_DAYS and CHRONIC_DAYS, starting from
+    0. The recurrence is solved in blocks of EWMA_BLOCK days with a scaled
+    cumulative sum per block, then a short loop carries each block's end
+    value into the next, instead of a Python loop per day.
+
+Exercises map to a primary muscle group by MUSCLE_GROUP_RULES (ordered
+keyword rules, first match wins); a JSON file of exercise -> group
+overrides can be layered on top (--muscle-map).
+
+WorkloadTracker holds, per athlete and group, the last CHRONIC_DAYS daily
+volumes and the two EWMA values, so adding a session is O(groups x
+CHRONIC_DAYS) however long the history is. Sessions can arrive late (a
+backdated day adjusts the window and EWMAs it still affects). Its state is
+saved as JSON (workload_state.json by default) and gives the same numbers as
+recomputing the full series.
+
+Usage:
+    python workload.py [SETS_FILE] [--muscle-map JSON] [--athlete ID] [--state JSON] [--output CSV]
+    python workload.py --new NEW_SETS_FILE [--state JSON] [--muscle-map JSON]
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from training_io import iter_table_chunks
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+
+STATE_VERSION = 1
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+
+# Days solved together by the blocked EWMA
+EWMA_BLOCK = 64
+
+# ACWR bands (Gabbett 2016): below is undertraining, above the spike zone
+SWEET_SPOT = (0.8, 1.3)
+DANGER_ZONE = 1.5
+
+TOTAL = 'total'
+OTHER = 'other'
+
+# (pattern, muscle group), checked in order on the lowercased exercise name
+MUSCLE_GROUP_RULES = [
+    (r'calf|calves', 'calves'),
+    (r'shrug', 'traps'),
+    (r'\bab\b|crunch|plank|leg raise|oblique|sit-?up|hip flexor', 'core'),
+    (r'leg curl|hamstring|romanian|\brdl\b|good morning|nordic', 'hamstrings'),
+    (r'hip thrust|glute|abductor|adductor|kickback', 'glutes'),
+    (r'squat|leg press|pendulum|leg extension|lunge|hack|step-?up|sissy', 'quads'),
+    (r'deadlift', 'back'),
+    (r'tricep|pushdown|skull crusher|overhead extension|\bjm press|close grip (bench|press)|\bdip', 'triceps'),
+    (r'wrist|forearm', 'forearms'),
+    (r'curl', 'biceps'),
+    (r'lateral raise|front raise|overhead press|shoulder press|military|deltoid|rear delt|face pull|upright row|'
+     r'behind the neck|klokov|smith press', 'shoulders'),
+    (r'bench|chest press|\bfly\b|flye|pec|push-?up|incline', 'chest'),
+    (r'row|pulldown|pull-?up|chin|pullover|\blat\b', 'back'),
+]
+
+_COMPILED_RULES = [(re.compile(pattern), group) for pattern, group in MUSCLE_GROUP_RULES]
+
+SET_COLUMNS = ['date', 'exercise_standard', 'volume']
+
+TIMELINE_COLUMNS = ['date', 'muscle_group', 'volume', 'acute', 'chronic', 'acwr',
+                    'ewma_acute', 'ewma_chronic', 'ewma_acwr']
+
+
+def muscle_group(exercise, overrides=None):
+    """Primary muscle group of an exercise name ('other' if no rule matches)."""
+    if overrides and exercise in overrides:
+        return overrides[exercise]
+    name = str(exercise).lower()
+    for pattern, group in _COMPILED_RULES:
+        if pattern.search(name):
+            return group
+    return OTHER
+
+
+def load_muscle_map(path):
+    """exercise -> muscle group overrides from a JSON file ({} if it does not exist)."""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        overrides = json.load(f)
+    if not isinstance(overrides, dict):
+        raise ValueError(f"Muscle map {path} must be a JSON object of exercise -> muscle group")
+    return overrides
+
+
+def muscle_groups(exercises, overrides=None):
+    """muscle_group() of a Series of exercise names, classifying each distinct name once."""
+    codes, names = pd.factorize(exercises.astype(str))
+    groups = np.array([muscle_group(name, overrides) for name in names], dtype=object)
+    return pd.Series(groups[codes] if len(names) else np.array([], dtype=object), index=exercises.index)
+
+
+def _lambda(days):
+    return 2.0 / (days + 1)
+
+
+# ============================================================================
+# O(n) KERNELS
+# ============================================================================
+
+def segment_starts(starts):
+    """Position of the start of each position's segment, given a bool array marking segment starts."""
+    return np.maximum.accumulate(np.where(starts, np.arange(len(starts)), 0))
+
+
+def rolling_sum(values, starts, window):
+    """Sum of the last window values of each position's segment (fewer near its start)."""
+    totals = np.concatenate([[0.0], np.cumsum(values)])
+    positions = np.arange(len(values))
+    first = np.maximum(segment_starts(starts), positions - window + 1)
+    return totals[positions + 1] - totals[first]
+
+
+def ewma(values, starts, days, block=EWMA_BLOCK):
+    """
+    e[t] = lambda * x[t] + (1 - lambda) * e[t-1], restarting from 0 at each
+    segment start, with lambda = 2 / (days + 1). Within a block of block
+    positions, e[t] = lambda * a^t * sum(x[i] * a^-i) is one cumulative sum
+    (a = 1 - lambda, offsets from the block start); a loop over blocks then
+    adds each block's carried-in value.
+    """
+    n = len(values)
+    if not n:
+        return np.zeros(0)
+    lam = _lambda(days)
+    a = 1.0 - lam
+    num_blocks = -(-n // block)
+    x = np.zeros(num_blocks * block)
+    x[:n] = values
+    reset = np.zeros(num_blocks * block, dtype=bool)
+    reset[:n] = starts
+    x, reset = x.reshape(num_blocks, block), reset.reshape(num_blocks, block)
+
+    offset = np.arange(block)
+    scaled = np.cumsum(x * a ** -offset, axis=1)
+    # Last segment start at or before each position within its block (-1: none)
+    last_reset = np.maximum.accumulate(np.where(reset, offset, -1), axis=1)
+    rows = np.arange(num_blocks)[:, None]
+    before = np.where(last_reset > 0, scaled[rows, np.maximum(last_reset - 1, 0)], 0.0)
+    local = lam * a ** offset * (scaled - before)
+    continues = last_reset < 0
+
+    # Carry the value at the end of each block into the next
+    carried = np.zeros(num_blocks)
+    decay = a ** block
+    end = 0.0
+    for k in range(num_blocks):
+        carried[k] = end
+        end = local[k, -1] + (decay * end if continues[k, -1] else 0.0)
+    result = local + np.where(continues, a ** (offset + 1) * carried[:, None], 0.0)
+    return result.reshape(-1)[:n]
+
+
+def _ratio(acute, chronic):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(chronic > 0, acute / chronic, np.nan)
+
+
+# ============================================================================
+# DAILY SERIES
+# ============================================================================
+
+def workload_timeline(sets_df, overrides=None):
+    """
+    Daily volume, rolling and EWMA acute / chronic load and ACWR for every
+    athlete (when sets_df has athlete_id), muscle group and day, as a long
+    frame ([athlete_id,] TIMELINE_COLUMNS), one row per series per day.
+    """
+    athlete_ids = sets_df['athlete_id'].astype(str) if 'athlete_id' in sets_df.columns else None
+    days = pd.to_datetime(sets_df['date'], errors='coerce').to_numpy().astype('datetime64[D]')
+    valid = ~np.isnat(days)
+    volume = pd.to_numeric(sets_df['volume'], errors='coerce').fillna(0).to_numpy(dtype=float)[valid]
+    days = days[valid].astype(np.int64)
+    groups = muscle_groups(sets_df['exercise_standard'][valid], overrides).to_numpy()
+    athletes = (athlete_ids[valid].to_numpy() if athlete_ids is not None else np.zeros(len(days), dtype=object))
+    columns = (['athlete_id'] if athlete_ids is not None else []) + TIMELINE_COLUMNS
+    if not len(days):
+        return pd.DataFrame(columns=columns)
+
+    # Every set counts towards its group and the athlete's total
+    athlete_codes, athlete_names = pd.factorize(athletes)
+    group_codes, group_names = pd.factorize(np.concatenate([groups, np.full(len(groups), TOTAL, dtype=object)]))
+    athlete_codes = np.tile(athlete_codes, 2)
+    days, volume = np.tile(days, 2), np.tile(volume, 2)
+    series_codes, series = pd.factorize(pd.MultiIndex.from_arrays([athlete_codes, group_codes]), sort=True)
+    series_athlete = series.get_level_values(0).to_numpy()
+
+    # One segment of consecutive days per series, spanning its athlete's first to last day
+    first = np.full(len(athlete_names), np.iinfo(np.int64).max)
+    last = np.full(len(athlete_names), np.iinfo(np.int64).min)
+    np.minimum.at(first, athlete_codes, days)
+    np.maximum.at(last, athlete_codes, days)
+    lengths = (last - first + 1)[series_athlete]
+    seg_start = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    positions = seg_start[series_codes] + days - first[athlete_codes]
+    daily = np.bincount(positions, weights=volume, minlength=int(lengths.sum()))
+    starts = np.zeros(len(daily), dtype=bool)
+    starts[seg_start] = True
+
+    acute = rolling_sum(daily, starts, ACUTE_DAYS) / ACUTE_DAYS
+    chronic = rolling_sum(daily, starts, CHRONIC_DAYS) / CHRONIC_DAYS
+    history = np.arange(len(daily)) - segment_starts(starts) + 1
+    ewma_acute = ewma(daily, starts, ACUTE_DAYS)
+    ewma_chronic = ewma(daily, starts, CHRONIC_DAYS)
+
+    owner = np.repeat(np.arange(len(series)), lengths)
+    day = first[series_athlete][owner] + np.arange(len(daily)) - seg_start[owner]
+    timeline = pd.DataFrame({
+        'date': pd.to_datetime(day.astype('datetime64[D]')),
+        'muscle_group': np.asarray(group_names, dtype=object)[series.get_level_values(1).to_numpy()][owner],
+        'volume': daily,
+        'acute': acute,
+        'chronic': chronic,
+        'acwr': np.where(history >= CHRONIC_DAYS, _ratio(acute, chronic), np.nan),
+        'ewma_acute': ewma_acute,
+        'ewma_chronic': ewma_chronic,
+        'ewma_acwr': _ratio(ewma_acute, ewma_chronic),
+    })
+    if athlete_ids is not None:
+        timeline.insert(0, 'athlete_id', np.asarray(athlete_names, dtype=object)[series_athlete][owner])
+    return timeline
+
+
+# ============================================================================
+# INCREMENTAL TRACKER
+# ============================================================================
+
+class WorkloadTracker:
+    """Latest CHRONIC_DAYS daily volumes and EWMAs per athlete and muscle group, updated per session."""
+
+    def __init__(self, overrides=None):
+        self.overrides = overrides or {}
+        # athlete_id or None -> {'first_day', 'last_day', 'series': {group: {'window', 'ewma_acute', 'ewma_chronic'}}}
+        self.athletes = {}
+
+    def add_session(self, date, volumes, athlete_id=None):
+        """
+        Count one session: volumes maps muscle group -> volume (the athlete's
+        total is added automatically). The date may be earlier than sessions
+        already counted.
+        """
+        day = int(np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64))
+        state = self.athletes.get(athlete_id)
+        if state is None:
+            state = self.athletes[athlete_id] = {'first_day': day, 'last_day': day, 'series': {}}
+        if day > state['last_day']:
+            self._advance(state, day)
+        if day < state['first_day']:
+            raise ValueError(f"Session on {date} is before the first tracked day of athlete {athlete_id}; "
+                             "rebuild the tracker from all sets")
+        volumes = dict(volumes)
+        volumes[TOTAL] = sum(volumes.values())
+        age = state['last_day'] - day
+        for group, volume in volumes.items():
+            series = state['series'].get(group)
+            if series is None:
+                series = state['series'][group] = {'window': [0.0] * CHRONIC_DAYS,
+                                                   'ewma_acute': 0.0, 'ewma_chronic': 0.0}
+            if age < CHRONIC_DAYS:
+                series['window'][-1 - age] += volume
+            # A day's volume enters each EWMA as lambda * x, then decays by (1 - lambda) per day
+            for key, days in (('ewma_acute', ACUTE_DAYS), ('ewma_chronic', CHRONIC_DAYS)):
+                series[key] += _lambda(days) * (1 - _lambda(days)) ** age * volume
+
+    def _advance(self, state, day):
+        gap = day - state['last_day']
+        for series in state['series'].values():
+            series['window'] = (series['window'] + [0.0] * min(gap, CHRONIC_DAYS))[-CHRONIC_DAYS:]
+            series['ewma_acute'] *= (1 - _lambda(ACUTE_DAYS)) ** gap
+            series['ewma_chronic'] *= (1 - _lambda(CHRONIC_DAYS)) ** gap
+        state['last_day'] = day
+
+    def add_sets(self, sets_df):
+        """Count the sets of sets_df, one add_session per athlete and day, in date order."""
+        if not len(sets_df):
+            return
+        frame = pd.DataFrame({
+            'athlete_id': sets_df['athlete_id'].astype(str) if 'athlete_id' in sets_df.columns else '',
+            'date': pd.to_datetime(sets_df['date'], errors='coerce'),
+            'muscle_group': muscle_groups(sets_df['exercise_standard'], self.overrides),
+            'volume': pd.to_numeric(sets_df['volume'], errors='coerce').fillna(0),
+        }).dropna(subset=['date'])
+        daily = frame.groupby(['athlete_id', 'date', 'muscle_group'], sort=True)['volume'].sum()
+        has_athletes = 'athlete_id' in sets_df.columns
+        for (athlete, date), volumes in daily.groupby(level=[0, 1], sort=True):
+            self.add_session(date, dict(zip(volumes.index.get_level_values(2), volumes.to_numpy())),
+                             athlete if has_athletes else None)
+
+    def snapshot(self, as_of=None):
+        """
+        Current acute / chronic load and ACWR of every athlete and group (as
+        of the athlete's last session, or as_of if later), as a frame with the
+        workload_timeline columns minus volume.
+        """
+        rows = []
+        for athlete, state in self.athletes.items():
+            day = state['last_day']
+            if as_of is not None:
+                day = max(day, int(np.datetime64(pd.Timestamp(as_of).date(), 'D').astype(np.int64)))
+            gap = day - state['last_day']
+            history = day - state['first_day'] + 1
+            for group, series in sorted(state['series'].items()):
+                window = (series['window'] + [0.0] * min(gap, CHRONIC_DAYS))[-CHRONIC_DAYS:]
+                acute = sum(window[-ACUTE_DAYS:]) / ACUTE_DAYS
+                chronic = sum(window) / CHRONIC_DAYS
+                ewma_acute = series['ewma_acute'] * (1 - _lambda(ACUTE_DAYS)) ** gap
+                ewma_chronic = series['ewma_chronic'] * (1 - _lambda(CHRONIC_DAYS)) ** gap
+                rows.append({
+                    'athlete_id': athlete,
+                    'date': pd.Timestamp(np.datetime64(day, 'D')),
+                    'muscle_group': group,
+                    'acute': acute,
+                    'chronic': chronic,
+                    'acwr': acute / chronic if chronic > 0 and history >= CHRONIC_DAYS else math.nan,
+                    'ewma_acute': ewma_acute,
+                    'ewma_chronic': ewma_chronic,
+                    'ewma_acwr': ewma_acute / ewma_chronic if ewma_chronic > 0 else math.nan,
+                })
+        columns = ['athlete_id'] + [col for col in TIMELINE_COLUMNS if col != 'volume']
+        snapshot = pd.DataFrame(rows, columns=columns)
+        if not any(athlete is not None for athlete in self.athletes):
+            snapshot = snapshot.drop(columns='athlete_id')
+        return snapshot
+
+    @classmethod
+    def from_timeline(cls, timeline, overrides=None):
+        """Tracker positioned at the end of a workload_timeline() frame, without replaying it."""
+        tracker = cls(overrides)
+        has_athletes = 'athlete_id' in timeline.columns
+        keys = ['athlete_id', 'muscle_group'] if has_athletes else ['muscle_group']
+        for key, rows in timeline.groupby(keys, sort=True):
+            athlete = key[0] if has_athletes else None
+            group = key[-1]
+            days = rows['date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+            state = tracker.athletes.setdefault(athlete, {'first_day': int(days[0]), 'last_day': int(days[-1]),
+                                                          'series': {}})
+            window = rows['volume'].to_numpy()[-CHRONIC_DAYS:].tolist()
+            state['series'][group] = {
+                'window': [0.0] * (CHRONIC_DAYS - len(window)) + window,
+                'ewma_acute': float(rows['ewma_acute'].iloc[-1]),
+                'ewma_chronic': float(rows['ewma_chronic'].iloc[-1]),
+            }
+        return tracker
+
+    def to_dict(self):
+        return {
+            'version': STATE_VERSION,
+            'athletes': [{'athlete_id': athlete, **state} for athlete, state in self.athletes.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, d, overrides=None):
+        tracker = cls(overrides)
+        for entry in d['athletes']:
+            entry = dict(entry)
+            tracker.athletes[entry.pop('athlete_id')] = entry
+        return tracker
+
+    def save(self, path):
+        """Write the tracker state as JSON, atomically."""
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, overrides=None):
+        """Read a state written by save(), or None if it is missing, unreadable or from another version."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                d = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if d.get('version') != STATE_VERSION:
+            return None
+        return cls.from_dict(d, overrides)
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def load_sets(path):
+    """The columns workload needs from a training_sets file, read in chunks."""
+    first = next(iter_table_chunks(path, chunksize=1), None)
+    if first is None:
+        return pd.DataFrame(columns=SET_COLUMNS)
+    columns = (['athlete_id'] if 'athlete_id' in first.columns else []) + SET_COLUMNS
+    return pd.concat(iter_table_chunks(path, columns=columns), ignore_index=True)
+
+
+def acwr_band(value):
+    """Label of an ACWR value: low, sweet spot, high or danger."""
+    if value != value:
+        return ''
+    if value < SWEET_SPOT[0]:
+        return 'low'
+    if value <= SWEET_SPOT[1]:
+        return 'sweet spot'
+    return 'high' if value <= DANGER_ZONE else 'DANGER'
+
+
+def print_snapshot(snapshot, athlete=None):
+    """Latest loads per muscle group, total first."""
+    if 'athlete_id' in snapshot.columns and athlete is not None:
+        snapshot = snapshot[snapshot['athlete_id'] == athlete]
+    for keys, rows in snapshot.groupby('athlete_id', sort=True) if 'athlete_id' in snapshot.columns \
+            else [(None, snapshot)]:
+        header = f"Athlete {keys}, " if keys is not None else ""
+        print(f"\n{header}as of {rows['date'].max():%Y-%m-%d}")
+        print(f"  {'group':<12} {'acute':>9} {'chronic':>9} {'ACWR':>6} {'EWMA ACWR':>10}")
+        order = rows.assign(first=rows['muscle_group'] != TOTAL).sort_values(['first', 'chronic'],
+                                                                              ascending=[True, False])
+        for row in order.itertuples(index=False):
+            print(f"  {row.muscle_group:<12} {row.acute:>9,.0f} {row.chronic:>9,.0f} {row.acwr:>6.2f} "
+                  f"{row.ewma_acwr:>10.2f}  {acwr_band(row.ewma_acwr)}")
+
+
+def main(argv=None):
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Acute:chronic workload ratio per athlete and muscle group.")
+    parser.add_argument("path", nargs="?", type=Path, default=DATA_DIR / "training_sets.csv",
+                        help="training_sets file (.csv, .parquet or .feather)")
+    parser.add_argument("--muscle-map", type=Path, default=None,
+                        help="JSON file of exercise -> muscle group overrides")
+    parser.add_argument("--state", type=Path, default=DATA_DIR / "workload_state.json",
+                        help="Tracker state written by a full run and updated by --new")
+    parser.add_argument("--new", type=Path, default=None,
+                        help="Add the sessions in this sets file to the saved tracker instead of recomputing")
+    parser.add_argument("--athlete", default=None, help="Only print this athlete")
+    parser.add_argument("--output", type=Path, default=None, help="Write the daily timeline to this CSV")
+    args = parser.parse_args(argv)
+    overrides = load_muscle_map(args.muscle_map)
+
+    print("=" * 60)
+    print(f"WORKLOAD ({ACUTE_DAYS}-day acute : {CHRONIC_DAYS}-day chronic)")
+    print("=" * 60)
+    if args.new:
+        tracker = WorkloadTracker.load(args.state, overrides)
+        if tracker is None:
+            parser.error(f"No tracker state at {args.state}; run without --new first")
+        try:
+            tracker.add_sets(load_sets(args.new))
+        except ValueError as exc:
+            parser.error(str(exc))
+        tracker.save(args.state)
+        print_snapshot(tracker.snapshot(), args.athlete)
+        return 0
+
+    timeline = workload_timeline(load_sets(args.path), overrides)
+    tracker = WorkloadTracker.from_timeline(timeline, overrides)
+    tracker.save(args.state)
+    print(f"Days x series: {len(timeline):,} | Tracker state written to {args.state}")
+    print_snapshot(tracker.snapshot(), args.athlete)
+    if args.output:
+        timeline.to_csv(args.output, index=False)
+        print(f"\nTimeline written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())